@@ -0,0 +1,553 @@
+"""
+Module for backtesting the bot's MA-crossover/RSI strategy over stored bars.
+
+The rules are those of TradingBot.check_buy_signal and check_sell_signal: buy when
+the fast moving average crosses above the slow one or RSI is oversold, sell when it
+crosses below or RSI is overbought. Like the bot, the strategy runs on TIMEFRAME bars,
+resampled from the stored 1-minute bars from the 09:30 open. Many symbols are tested at once: their bars are
+laid out left-aligned in a (symbols x bars) matrix, indicators and signals are
+computed for the whole matrix with NumPy, and positions are simulated one trade at a
+time across all symbols instead of one bar at a time. A buy or sell signal at a bar's
+close fills at the next bar's open; while long, a stop-loss or take-profit is filled
+inside the first bar whose range reaches it.
+
+Example:
+    >>> results = run_backtest(Database(), ['AAPL', 'MSFT'], start_date=datetime(2024, 1, 1))
+    >>> results['AAPL']['total_return_pct']
+"""
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+from datetime import datetime
+import argparse
+import numpy as np
+import pandas as pd
+from config import (
+    BACKTEST_BATCH_SIZE, MOVING_AVERAGE_FAST, MOVING_AVERAGE_SLOW, QUANTITY, RSI_OVERBOUGHT, RSI_OVERSOLD,
+    RSI_PERIOD, STOP_LOSS_PERCENTAGE, TAKE_PROFIT_PERCENTAGE, TIMEFRAME
+)
+from bar_series import BarSeries
+from database import BAR_FIELDS, Database, Symbol, init_schema
+from resample import resample_bars, timeframe_minutes
+
+STRATEGY_NAME = 'ma_crossover_rsi'
+
+# Why a trade was closed
+EXIT_SIGNAL, EXIT_STOP_LOSS, EXIT_TAKE_PROFIT, EXIT_END = 0, 1, 2, 3
+
+# Most bar prices gathered at once while scanning for stop-losses and take-profits
+SCAN_BUDGET = 1 << 22
+
+class StrategyParameters(NamedTuple):
+    """Parameters of the strategy, defaulting to those the bot trades with."""
+    ma_fast: int = MOVING_AVERAGE_FAST
+    ma_slow: int = MOVING_AVERAGE_SLOW
+    rsi_period: int = RSI_PERIOD
+    rsi_overbought: float = RSI_OVERBOUGHT
+    rsi_oversold: float = RSI_OVERSOLD
+    stop_loss_percentage: float = STOP_LOSS_PERCENTAGE
+    take_profit_percentage: float = TAKE_PROFIT_PERCENTAGE
+    quantity: float = QUANTITY
+
+class BarMatrix(NamedTuple):
+    """Bars of many symbols, one row per symbol, left-aligned and padded with NaN/NaT."""
+    symbols: List[str]
+    lengths: np.ndarray
+    start_time: np.ndarray
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+
+def bar_matrix(arrays: Dict[str, np.ndarray], names: Dict[int, str]) -> BarMatrix:
+    """
+    Lay out bar arrays of many symbols as a (symbols x bars) matrix.
+
+    Args:
+        arrays (Dict[str, np.ndarray]): Bar arrays keyed by BAR_FIELDS, ordered by symbol id, then start time
+        names (Dict[int, str]): Symbol of every symbol id
+
+    Returns:
+        BarMatrix: Row i holds the bars of the i-th symbol id in its first lengths[i] columns
+    """
+    ids, first, lengths = np.unique(arrays['symbol_id'], return_index=True, return_counts=True)
+    rows = np.repeat(np.arange(len(ids)), lengths)
+    cols = np.arange(len(rows)) - np.repeat(first, lengths)
+    width = int(lengths.max()) if len(lengths) else 0
+
+    def scatter(values, fill):
+        matrix = np.full((len(ids), width), fill, dtype=values.dtype)
+        matrix[rows, cols] = values
+        return matrix
+
+    return BarMatrix(
+        symbols=[names[symbol_id] for symbol_id in ids.tolist()],
+        lengths=lengths,
+        start_time=scatter(arrays['start_time'], np.datetime64('NaT')),
+        open=scatter(arrays['open'].astype(np.float64), np.nan),
+        high=scatter(arrays['high'].astype(np.float64), np.nan),
+        low=scatter(arrays['low'].astype(np.float64), np.nan),
+        close=scatter(arrays['close'].astype(np.float64), np.nan)
+    )
+
+def rolling_mean(matrix: np.ndarray, window: int) -> np.ndarray:
+    """
+    Mean of every row's last window values, NaN until a full window is seen, like pandas rolling().mean().
+
+    Sums come from a running total of each row's offset from its first value, which
+    keeps the rounding error of long rows small.
+    """
+    result = np.empty(matrix.shape)
+    result[:, :window - 1] = np.nan
+    if matrix.shape[1] < window:
+        return result
+    base = matrix[:, :1]
+    totals = np.subtract(matrix, base)
+    np.cumsum(totals, axis=1, out=totals)
+    result[:, window - 1] = totals[:, window - 1]
+    np.subtract(totals[:, window:], totals[:, :-window], out=result[:, window:])
+    result[:, window - 1:] /= window
+    result[:, window - 1:] += base
+    return result
+
+def _shift(matrix: np.ndarray) -> np.ndarray:
+    """Return the matrix shifted one bar to the right, NaN in the first column."""
+    shifted = np.empty_like(matrix)
+    shifted[:, 0] = np.nan
+    shifted[:, 1:] = matrix[:, :-1]
+    return shifted
+
+def indicators(close: np.ndarray, params: StrategyParameters = StrategyParameters()) -> Dict[str, np.ndarray]:
+    """
+    Compute the bot's indicators for every bar of every row.
+
+    Args:
+        close (np.ndarray): (symbols x bars) closing prices
+        params (StrategyParameters): Strategy parameters
+
+    Returns:
+        Dict[str, np.ndarray]: MA_fast, MA_slow and RSI matrices, as in TradingBot.calculate_indicators
+    """
+    # As with pandas' where(), the undefined first change counts as no gain and no loss
+    delta = np.diff(close, axis=1)
+    moves = np.zeros(close.shape)
+    np.maximum(delta, 0, out=moves[:, 1:])
+    gain = rolling_mean(moves, params.rsi_period)
+    np.minimum(delta, 0, out=moves[:, 1:])
+    np.negative(moves, out=moves)
+    loss = rolling_mean(moves, params.rsi_period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = np.divide(gain, loss, out=gain)
+    rsi += 1
+    np.divide(100, rsi, out=rsi)
+    np.subtract(100, rsi, out=rsi)
+    return {
+        'MA_fast': rolling_mean(close, params.ma_fast),
+        'MA_slow': rolling_mean(close, params.ma_slow),
+        'RSI': rsi
+    }
+
+def signals(
+    close: np.ndarray,
+    lengths: np.ndarray,
+    params: StrategyParameters = StrategyParameters()
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Evaluate check_buy_signal and check_sell_signal at the close of every bar.
+
+    Args:
+        close (np.ndarray): (symbols x bars) closing prices
+        lengths (np.ndarray): Number of bars of every row; later columns are padding
+        params (StrategyParameters): Strategy parameters
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Boolean buy and sell matrices
+    """
+    values = indicators(close, params)
+    fast, slow, rsi = values['MA_fast'], values['MA_slow'], values['RSI']
+    prev_fast, prev_slow = _shift(fast), _shift(slow)
+    bars = np.arange(close.shape[1])
+    # The bot needs ma_slow bars of history before it trades at all
+    tradable = (bars < lengths[:, None]) & (bars >= params.ma_slow - 1)
+    buy = tradable & (((prev_fast <= prev_slow) & (fast > slow)) | (rsi < params.rsi_oversold))
+    sell = tradable & (((prev_fast >= prev_slow) & (fast < slow)) | (rsi > params.rsi_overbought))
+    return buy, sell
+
+def _next_true(mask: np.ndarray) -> np.ndarray:
+    """For every column, the first column at or after it where the row's mask is set; width if none."""
+    width = mask.shape[1]
+    columns = np.where(mask, np.arange(width), width)
+    result = np.full((mask.shape[0], width + 1), width)
+    result[:, :width] = np.minimum.accumulate(columns[:, ::-1], axis=1)[:, ::-1]
+    return result
+
+def _first_stop(
+    bars: BarMatrix,
+    rows: np.ndarray,
+    start: np.ndarray,
+    limit: np.ndarray,
+    stop: np.ndarray,
+    target: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Find the first bar from start to limit whose low reaches stop or whose high reaches target.
+
+    Windows of bars are checked for all rows at once, each twice as wide as the last,
+    so a trade costs about as much as the bars it is held for. At most SCAN_BUDGET
+    prices are gathered at once.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Bar of every row, or -1 if none, and EXIT_STOP_LOSS
+            or EXIT_TAKE_PROFIT; a stop-loss wins if both are reached in one bar
+    """
+    found = np.full(len(rows), -1)
+    reason = np.full(len(rows), EXIT_STOP_LOSS)
+    low, high = bars.low.ravel(), bars.high.ravel()
+    stride = bars.low.shape[1]
+    pending = np.arange(len(rows))
+    offset = start.copy()
+    block = 8
+    while pending.size:
+        width = max(1, min(block, SCAN_BUDGET // pending.size))
+        columns = offset[pending, None] + np.arange(width)
+        inside = columns <= limit[pending, None]
+        columns = np.minimum(columns, limit[pending, None])
+        flat = columns + (rows[pending] * stride)[:, None]
+        stopped = (low.take(flat) <= stop[pending, None]) & inside
+        hit = stopped | ((high.take(flat) >= target[pending, None]) & inside)
+        any_hit = hit.any(axis=1)
+        first = hit.argmax(axis=1)[any_hit]
+        done = pending[any_hit]
+        found[done] = columns[any_hit, first]
+        reason[done] = np.where(stopped[any_hit, first], EXIT_STOP_LOSS, EXIT_TAKE_PROFIT)
+        offset[pending] += width
+        pending = pending[~any_hit & (offset[pending] <= limit[pending])]
+        block *= 2
+    return found, reason
+
+def _exits(
+    bars: BarMatrix,
+    rows: np.ndarray,
+    entry: np.ndarray,
+    next_sell: np.ndarray,
+    params: StrategyParameters
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Find where trades entered at the open of the given bars exit.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]: Entry price, exit bar,
+            exit price and exit reason of every trade
+    """
+    last = bars.lengths[rows] - 1
+    entry_price = bars.open[rows, entry]
+    stop = entry_price * (1 - params.stop_loss_percentage / 100)
+    target = entry_price * (1 + params.take_profit_percentage / 100)
+
+    # A sell signal only closes the position if a bar follows to fill on
+    signal_bar = next_sell[rows, entry]
+    by_signal = signal_bar < last
+    stop_bar, stop_reason = _first_stop(bars, rows, entry, np.where(by_signal, signal_bar, last), stop, target)
+    stopped = stop_bar >= 0
+
+    exit_bar = np.where(stopped, stop_bar, np.where(by_signal, signal_bar + 1, last))
+    reason = np.where(stopped, stop_reason, np.where(by_signal, EXIT_SIGNAL, EXIT_END))
+    exit_open = bars.open[rows, exit_bar]
+    exit_price = np.where(reason == EXIT_STOP_LOSS, np.minimum(exit_open, stop),
+                          np.where(reason == EXIT_TAKE_PROFIT, np.maximum(exit_open, target),
+                                   np.where(reason == EXIT_SIGNAL, exit_open, bars.close[rows, exit_bar])))
+    return entry_price, exit_bar, exit_price, reason
+
+def simulate(
+    bars: BarMatrix,
+    buy: np.ndarray,
+    sell: np.ndarray,
+    params: StrategyParameters = StrategyParameters()
+) -> Dict[str, np.ndarray]:
+    """
+    Simulate long-only trading of every row on its buy and sell signals.
+
+    A row is either flat, when a buy signal opens a position at the next bar's open,
+    or long, when a sell signal closes it at the next bar's open. A stop-loss or
+    take-profit reached before the sell signal's bar closes the position at its price,
+    or at the bar's open if the price gapped through it. A position still open after
+    the last bar is closed at the last close.
+
+    Where a trade exits depends only on where it was entered, so exits are found for
+    many possible entries at once: first after every run of buy signals starts, then
+    after every signal an exit found so far leads to, until no new entries turn up.
+    The trades actually taken are then followed from each row's first entry, the loop
+    running once per trade of the busiest row with a single lookup per iteration.
+
+    Args:
+        bars (BarMatrix): Bars to trade
+        buy (np.ndarray): Boolean buy signals at each bar's close
+        sell (np.ndarray): Boolean sell signals at each bar's close
+        params (StrategyParameters): Strategy parameters
+
+    Returns:
+        Dict[str, np.ndarray]: Arrays of every trade: row, entry_bar, exit_bar,
+            entry_price, exit_price and reason (an EXIT_* code), ordered by row and entry
+    """
+    lengths = bars.lengths
+    stride = buy.shape[1] + 1
+    next_buy, next_sell = _next_true(buy), _next_true(sell)
+
+    # A flat row enters after the first buy signal at or after the bar it exited on, so
+    # inside a run of buy signals only the first one, or one right after an exit, is traded
+    run_start = buy.copy()
+    run_start[:, 1:] &= ~buy[:, :-1]
+    rows, entry = np.nonzero(run_start)
+    keys = rows * stride + entry + 1
+    keys = keys[entry + 1 < lengths[rows]]
+    found = []
+    known = np.empty(0, dtype=np.int64)
+    while keys.size:
+        rows, entry = np.divmod(keys, stride)
+        entry_price, exit_bar, exit_price, reason = _exits(bars, rows, entry, next_sell, params)
+        found.append((rows, entry, exit_bar, entry_price, exit_price, reason))
+        known = np.union1d(known, keys)
+
+        # Flat again by the exit bar's close, where the next buy signal opens the next trade
+        following = next_buy[rows, exit_bar] + 1
+        reentry = (reason != EXIT_END) & (following < lengths[rows])
+        keys = np.setdiff1d(rows[reentry] * stride + following[reentry], known)
+
+    fields = ('row', 'entry_bar', 'exit_bar', 'entry_price', 'exit_price', 'reason')
+    if not found:
+        dtypes = (np.int64, np.int64, np.int64, np.float64, np.float64, np.int64)
+        return {field: np.empty(0, dtype=dtype) for field, dtype in zip(fields, dtypes)}
+    columns = [np.concatenate(values) for values in zip(*found)]
+    order = np.argsort(columns[0] * stride + columns[1])
+    columns = [values[order] for values in columns]
+    rows, entry, exit_bar, _, _, reason = columns
+    keys = rows * stride + entry
+
+    # Follow every row's chain of trades; all entries it reaches were resolved above
+    following_entry = next_buy[rows, exit_bar] + 1
+    following = np.searchsorted(keys, rows * stride + following_entry)
+    following[(reason == EXIT_END) | (following_entry >= lengths[rows])] = -1
+    first_entry = next_buy[:, 0] + 1
+    starts = np.flatnonzero(first_entry < lengths)
+    current = np.searchsorted(keys, starts * stride + first_entry[starts])
+    taken = [np.empty(0, dtype=np.int64)]
+    while current.size:
+        taken.append(current)
+        current = following[current]
+        current = current[current >= 0]
+    taken = np.sort(np.concatenate(taken))
+    return {field: values[taken] for field, values in zip(fields, columns)}
+
+def performance_metrics(
+    bars: BarMatrix,
+    trades: Dict[str, np.ndarray],
+    params: StrategyParameters = StrategyParameters()
+) -> List[Dict]:
+    """
+    Summarize every row's trades.
+
+    Returns:
+        List[Dict]: Per row, the number of trades, wins, win rate, compounded and average
+            return, P&L of params.quantity shares, maximum drawdown of the compounded
+            closed-trade equity, share of bars in the market, exits by reason and the
+            buy-and-hold return over the same bars
+    """
+    count = len(bars.lengths)
+    row = trades['row']
+    returns = trades['exit_price'] / trades['entry_price'] - 1
+    n_trades = np.bincount(row, minlength=count)
+    wins = np.bincount(row, weights=returns > 0, minlength=count)
+    return_sum = np.bincount(row, weights=returns, minlength=count)
+    total_return = np.expm1(np.bincount(row, weights=np.log1p(returns), minlength=count))
+    pnl = np.bincount(row, weights=(trades['exit_price'] - trades['entry_price']) * params.quantity, minlength=count)
+    held = np.bincount(row, weights=trades['exit_bar'] - trades['entry_bar'], minlength=count)
+    reasons = {
+        reason: np.bincount(row[trades['reason'] == code], minlength=count)
+        for reason, code in (('signal_exits', EXIT_SIGNAL), ('stop_losses', EXIT_STOP_LOSS),
+                             ('take_profits', EXIT_TAKE_PROFIT), ('open_at_end', EXIT_END))
+    }
+    last_close = bars.close[np.arange(count), bars.lengths - 1]
+    buy_and_hold = last_close / bars.close[:, 0] - 1
+
+    # Drawdown of each row's compounded equity, which starts at 1 before its first trade
+    bounds = np.concatenate(([0], np.cumsum(n_trades)))
+    max_drawdown = np.zeros(count)
+    for i in np.flatnonzero(n_trades):
+        equity = np.cumprod(np.concatenate(([1.0], 1 + returns[bounds[i]:bounds[i + 1]])))
+        max_drawdown[i] = np.max(1 - equity / np.maximum.accumulate(equity))
+
+    return [
+        {
+            'bars': int(bars.lengths[i]),
+            'trades': int(n_trades[i]),
+            'wins': int(wins[i]),
+            'win_rate': float(wins[i] / n_trades[i]) if n_trades[i] else 0.0,
+            'total_return_pct': float(total_return[i] * 100),
+            'avg_trade_return_pct': float(return_sum[i] / n_trades[i] * 100) if n_trades[i] else 0.0,
+            'pnl': float(pnl[i]),
+            'max_drawdown_pct': float(max_drawdown[i] * 100),
+            'exposure_pct': float(held[i] / bars.lengths[i] * 100),
+            **{reason: int(counts[i]) for reason, counts in reasons.items()},
+            'buy_and_hold_return_pct': float(buy_and_hold[i] * 100)
+        }
+        for i in range(count)
+    ]
+
+def backtest_bars(
+    bars: BarMatrix,
+    params: StrategyParameters = StrategyParameters()
+) -> Tuple[Dict[str, np.ndarray], List[Dict]]:
+    """
+    Backtest the strategy on a bar matrix.
+
+    Returns:
+        Tuple[Dict[str, np.ndarray], List[Dict]]: The trades, as from simulate(), and
+            the performance metrics of every row
+    """
+    buy, sell = signals(bars.close, bars.lengths, params)
+    trades = simulate(bars, buy, sell, params)
+    return trades, performance_metrics(bars, trades, params)
+
+def _batches(chunks: Iterator[Dict[str, np.ndarray]], batch_size: int) -> Iterator[Dict[str, np.ndarray]]:
+    """Regroup streamed bar chunks, ordered by symbol id, into batches of batch_size whole symbols."""
+    buffer = []
+    ids = np.empty(0, dtype=np.int64)  # Symbol ids in the buffer
+    for chunk in chunks:
+        if not len(chunk['symbol_id']):
+            continue
+        buffer.append(chunk)
+        ids = np.union1d(ids, chunk['symbol_id'])
+        # Once a later symbol has started, the first batch_size symbols are complete
+        while len(ids) > batch_size:
+            arrays = {field: np.concatenate([part[field] for part in buffer]) for field in BAR_FIELDS}
+            split = np.searchsorted(arrays['symbol_id'], ids[batch_size])
+            yield {field: values[:split] for field, values in arrays.items()}
+            buffer = [{field: values[split:] for field, values in arrays.items()}]
+            ids = ids[batch_size:]
+    if buffer:
+        yield {field: np.concatenate([part[field] for part in buffer]) for field in BAR_FIELDS}
+
+def resample_batch(arrays: Dict[str, np.ndarray], ticker_time: int) -> Dict[str, np.ndarray]:
+    """
+    Resample the 1-minute bars of every symbol in a batch with resample_bars.
+
+    Args:
+        arrays (Dict[str, np.ndarray]): Bar arrays keyed by BAR_FIELDS, ordered by symbol id, then start time
+        ticker_time (int): Bar length in minutes
+
+    Returns:
+        Dict[str, np.ndarray]: The resampled bars, keyed and ordered the same way
+    """
+    ids, first = np.unique(arrays['symbol_id'], return_index=True)
+    parts = []
+    for symbol_id, start, stop in zip(ids, first, np.append(first[1:], len(arrays['symbol_id']))):
+        bars = resample_bars(BarSeries.from_arrays({
+            field: values[start:stop] for field, values in arrays.items()
+        }), ticker_time)
+        parts.append({
+            'id': bars.id,
+            'symbol_id': np.full(len(bars), symbol_id, dtype=arrays['symbol_id'].dtype),
+            'start_time': bars.timestamp.view('datetime64[ns]'),
+            'open': bars.open,
+            'high': bars.high,
+            'low': bars.low,
+            'close': bars.close,
+            'volume': bars.volume
+        })
+    return {field: np.concatenate([part[field] for part in parts]) for field in BAR_FIELDS}
+
+def run_backtest(
+    db: Database,
+    symbols: Optional[List[str]] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    params: StrategyParameters = StrategyParameters(),
+    batch_size: int = BACKTEST_BATCH_SIZE,
+    save: bool = True,
+    timeframe: str = TIMEFRAME
+) -> Dict[str, Dict]:
+    """
+    Backtest the strategy on the stored bars of many symbols.
+
+    Bars are streamed from the database and simulated batch_size symbols at a time,
+    so memory stays bounded however many symbols are tested. Each batch's 1-minute
+    bars are first resampled to timeframe, the bars the bot trades on.
+
+    Args:
+        db (Database): Database holding the bars
+        symbols (List[str]): Symbols to test, or None for every symbol with bars
+        start_date (datetime): Only use bars starting at or after this time
+        end_date (datetime): Only use bars ending at or before this time
+        params (StrategyParameters): Strategy parameters
+        batch_size (int): Symbols simulated together
+        save (bool): Save every symbol's metrics with save_analysis_result, committing once per batch
+        timeframe (str): Bar length to test on, e.g. '1m' or '1h' (default: TIMEFRAME)
+
+    Returns:
+        Dict[str, Dict]: Performance metrics of every symbol that has bars
+    """
+    if batch_size < 1:
+        raise ValueError("batch_size must be at least 1")
+    ticker_time = timeframe_minutes(timeframe)
+    if symbols is None:
+        names = dict(db.session.query(Symbol.id, Symbol.symbol).all())
+    else:
+        names = {symbol_id: symbol for symbol, symbol_id in db.get_symbol_ids(symbols).items()}
+        if not names:
+            return {}
+
+    chunks = db.stream_time_intervals(
+        start_date=start_date,
+        end_date=end_date,
+        symbols=list(names.values()) if symbols is not None else None
+    )
+    results = {}
+    for arrays in _batches(chunks, batch_size):
+        if ticker_time > 1:
+            arrays = resample_batch(arrays, ticker_time)
+        bars = bar_matrix(arrays, names)
+        _, metrics = backtest_bars(bars, params)
+        for i, (symbol, symbol_metrics) in enumerate(zip(bars.symbols, metrics)):
+            results[symbol] = symbol_metrics
+            if save:
+                first, last = bars.start_time[i, [0, bars.lengths[i] - 1]]
+                db.save_analysis_result(
+                    symbol,
+                    pd.Timestamp(first).to_pydatetime(),
+                    pd.Timestamp(last).to_pydatetime(),
+                    STRATEGY_NAME,
+                    params._asdict(),
+                    symbol_metrics,
+                    commit=False
+                )
+        if save:
+            db.session.commit()
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backtest the bot's MA-crossover/RSI strategy on stored bars")
+    parser.add_argument('symbols', nargs='*', help="Symbols to test, every symbol with bars if none are given")
+    parser.add_argument('--start', type=pd.Timestamp, help="First day to test, e.g. 2024-01-02")
+    parser.add_argument('--end', type=pd.Timestamp, help="Last time to test")
+    parser.add_argument('--timeframe', default=TIMEFRAME, help="Bar length to test on, e.g. 1m or 1h")
+    parser.add_argument('--batch-size', type=int, default=BACKTEST_BATCH_SIZE, help="Symbols simulated together")
+    parser.add_argument('--no-save', action='store_true', help="Do not store the results in analysis_results")
+    args = parser.parse_args()
+
+    init_schema()
+    db = Database()
+    try:
+        results = run_backtest(
+            db,
+            args.symbols or None,
+            start_date=args.start.to_pydatetime() if args.start is not None else None,
+            end_date=args.end.to_pydatetime() if args.end is not None else None,
+            batch_size=args.batch_size,
+            save=not args.no_save,
+            timeframe=args.timeframe
+        )
+    finally:
+        db.close()
+
+    print(f"{'Symbol':<8}{'Trades':>8}{'Win rate':>10}{'Return %':>10}{'Max DD %':>10}{'B&H %':>10}")
+    for symbol, metrics in sorted(results.items()):
+        print(f"{symbol:<8}{metrics['trades']:>8}{metrics['win_rate']:>10.1%}{metrics['total_return_pct']:>10.2f}"
+              f"{metrics['max_drawdown_pct']:>10.2f}{metrics['buy_and_hold_return_pct']:>10.2f}")
@@ -0,0 +1,162 @@
+"""
+Module for the live bot's rolling per-symbol bar cache.
+
+The bot used to download a month of hourly bars for every symbol on every loop,
+although at most the latest bar had changed. BarCache downloads that history once
+per symbol, keeps it in a fixed-capacity BarRing, and afterwards only requests
+bars from the start of the latest cached bar onwards: the still-forming bar is
+revised and any newly opened bar appended. The payload and latency of a refresh
+no longer depend on how much history the strategy looks at.
+"""
+from typing import Dict, Iterable, Optional
+import numpy as np
+import pandas as pd
+from bar_series import BarSeries
+from config import BAR_CACHE_SIZE, BAR_CACHE_WARMUP_PERIOD, TIMEFRAME
+from providers import DataProvider, YFinanceProvider, call_with_retry, get_rate_limiter
+
+class BarRing:
+    """
+    Fixed-capacity ring buffer of bars, ordered by start time.
+
+    Columns are preallocated once; merging new bars writes them in place and drops
+    the oldest ones when the ring is full.
+    """
+
+    def __init__(self, capacity: int):
+        if capacity < 1:
+            raise ValueError("Capacity must be at least 1")
+        self.capacity = capacity
+        self.columns = {
+            column: np.empty(capacity, dtype=dtype)
+            for column, dtype in zip(BarSeries.COLUMNS, BarSeries.DTYPES)
+        }
+        self.start = 0
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def last_timestamp(self) -> Optional[int]:
+        """Start time of the latest bar as epoch nanoseconds, or None if the ring is empty."""
+        if not self.size:
+            return None
+        return int(self.columns['timestamp'][(self.start + self.size - 1) % self.capacity])
+
+    def merge(self, bars: BarSeries) -> int:
+        """
+        Merge bars ordered by start time into the ring.
+
+        A bar starting at the latest bar's start time replaces it, later bars are
+        appended, and earlier bars are ignored.
+
+        Returns:
+            int: Number of bars appended
+        """
+        last = self.last_timestamp
+        if last is not None:
+            bars = bars[np.searchsorted(bars.timestamp, last, side='left'):]
+            if len(bars) and bars.timestamp[0] == last:
+                position = (self.start + self.size - 1) % self.capacity
+                for column, values in self.columns.items():
+                    values[position] = bars.column(column)[0]
+                bars = bars[1:]
+
+        new = bars[-self.capacity:]
+        positions = (self.start + self.size + np.arange(len(new))) % self.capacity
+        for column, values in self.columns.items():
+            values[positions] = new.column(column)
+        size = min(self.size + len(new), self.capacity)
+        self.start = (self.start + self.size + len(new) - size) % self.capacity
+        self.size = size
+        return len(bars)
+
+    def series(self) -> BarSeries:
+        """Return a copy of the cached bars, oldest first."""
+        positions = (self.start + np.arange(self.size)) % self.capacity
+        return BarSeries(**{column: values[positions] for column, values in self.columns.items()})
+
+class BarCache:
+    """
+    Rolling bar history per symbol, warmed once and then refreshed from the latest bar.
+
+    Example:
+        >>> cache = BarCache(YFinanceProvider(), capacity=200, interval='1h')
+        >>> cache.warm(['AAPL', 'MSFT'])
+        >>> df = cache.get_dataframe('AAPL')  # only requests bars since the latest cached one
+    """
+
+    def __init__(
+        self,
+        provider: Optional[DataProvider] = None,
+        capacity: int = BAR_CACHE_SIZE,
+        period: str = BAR_CACHE_WARMUP_PERIOD,
+        interval: str = TIMEFRAME
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            provider (DataProvider): Where to fetch bars from (default: Yahoo Finance)
+            capacity (int): Most bars kept per symbol
+            period (str): History period fetched when a symbol is warmed
+            interval (str): Bar interval, e.g. '1h'
+        """
+        self.provider = provider or YFinanceProvider()
+        self.capacity = capacity
+        self.period = period
+        self.interval = interval
+        self.rings: Dict[str, BarRing] = {}
+        self.limiter = get_rate_limiter(self.provider)
+
+    def _fetch(self, symbol: str, start=None) -> BarSeries:
+        data = call_with_retry(self.provider.fetch_bars, symbol, self.period, self.interval, start=start,
+                               limiter=self.limiter)
+        return BarSeries.from_dataframe(data)
+
+    def warm(self, symbols: Iterable[str]) -> None:
+        """Fetch the full history period of every symbol not cached yet."""
+        for symbol in symbols:
+            if symbol in self.rings:
+                continue
+            try:
+                self.refresh(symbol)
+            except Exception as e:
+                print(f"Error warming bar cache for {symbol}: {e}")
+
+    def refresh(self, symbol: str) -> BarSeries:
+        """
+        Bring a symbol's bars up to date and return them.
+
+        The first refresh fetches the whole history period. Later ones only request
+        bars from the start of the latest cached bar.
+
+        Raises:
+            Exception: The provider's error once its retries have failed
+        """
+        ring = self.rings.get(symbol)
+        if ring is None or not len(ring):
+            bars = self._fetch(symbol)
+            ring = self.rings[symbol] = BarRing(self.capacity)
+        else:
+            start = pd.Timestamp(ring.last_timestamp).to_pydatetime()
+            bars = self._fetch(symbol, start=start)
+        ring.merge(bars)
+        return ring.series()
+
+    def push(self, symbol: str, bars: BarSeries) -> BarSeries:
+        """Merge bars received from a feed into a symbol's history without fetching, and return the history."""
+        ring = self.rings.get(symbol)
+        if ring is None:
+            ring = self.rings[symbol] = BarRing(self.capacity)
+        ring.merge(bars)
+        return ring.series()
+
+    def get_dataframe(self, symbol: str) -> Optional[pd.DataFrame]:
+        """Refresh a symbol and return its bars as a yfinance-style DataFrame, or None on error."""
+        try:
+            return self.refresh(symbol).to_dataframe()
+        except Exception as e:
+            print(f"Error fetching data for {symbol}: {e}")
+            return None
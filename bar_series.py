@@ -0,0 +1,166 @@
+"""
+Module for BarSeries, the compact OHLCV container shared by the bot, indicators and scanner.
+
+A BarSeries is a struct of arrays: int64 ids, int64 epoch-nanosecond start times,
+float64 open/high/low/close and int64 volume. Slicing returns views of the same
+arrays, so windows of a long history cost nothing to take, and columns go straight
+into NumPy and pandas without building a Python object per bar.
+"""
+from typing import Iterable, Sequence
+import numpy as np
+import pandas as pd
+from market_calendar import exchange_wall_clock
+
+class BarSeries:
+    """
+    OHLCV bars as parallel NumPy arrays, ordered by start time.
+
+    Columns are read by name, and sliced or indexed by position:
+
+    Example:
+        >>> bars = BarSeries.from_dataframe(yf.Ticker('AAPL').history(period='1d', interval='1m'))
+        >>> bars['close'][-1]
+        189.5
+        >>> last_hour = bars[-60:]  # zero-copy view
+        >>> last_hour.to_dataframe()
+
+    Timestamps are wall-clock times, as stored in time_intervals: a tz-aware index
+    keeps its local time of day rather than being converted to UTC.
+    """
+
+    COLUMNS = ('id', 'timestamp', 'open', 'high', 'low', 'close', 'volume')
+    DTYPES = (np.int64, np.int64, np.float64, np.float64, np.float64, np.float64, np.int64)
+
+    __slots__ = COLUMNS
+
+    def __init__(self, timestamp, open, high, low, close, volume, id=None):
+        """
+        Initialize the series from column arrays, without copying arrays of the right dtype.
+
+        Args:
+            timestamp (np.ndarray): Start times as int64 epoch nanoseconds or datetime64
+            open, high, low, close (np.ndarray): Prices
+            volume (np.ndarray): Volumes
+            id (np.ndarray): Interval ids, defaults to positions 0..n-1
+        """
+        timestamp = np.asarray(timestamp)
+        if np.issubdtype(timestamp.dtype, np.datetime64):
+            timestamp = timestamp.astype('datetime64[ns]').view(np.int64)
+        self.timestamp = np.asarray(timestamp, dtype=np.int64)
+        self.open = np.asarray(open, dtype=np.float64)
+        self.high = np.asarray(high, dtype=np.float64)
+        self.low = np.asarray(low, dtype=np.float64)
+        self.close = np.asarray(close, dtype=np.float64)
+        self.volume = np.asarray(volume, dtype=np.int64)
+        self.id = np.arange(len(self.timestamp), dtype=np.int64) if id is None else np.asarray(id, dtype=np.int64)
+
+        if len({len(getattr(self, column)) for column in self.COLUMNS}) != 1:
+            raise ValueError("BarSeries columns must all have the same length")
+
+    @classmethod
+    def empty(cls) -> 'BarSeries':
+        """Create a series with no bars."""
+        return cls(*(np.empty(0, dtype=dtype) for dtype in cls.DTYPES[1:]), id=np.empty(0, dtype=np.int64))
+
+    @classmethod
+    def from_arrays(cls, arrays: dict) -> 'BarSeries':
+        """Create a series from a dict of arrays keyed by 'id', 'start_time' and the lowercase OHLCV names."""
+        return cls(arrays['start_time'], arrays['open'], arrays['high'], arrays['low'],
+                   arrays['close'], arrays['volume'], id=arrays.get('id'))
+
+    @classmethod
+    def from_dataframe(cls, data: pd.DataFrame) -> 'BarSeries':
+        """
+        Create a series from a yfinance-style DataFrame with Open, High, Low, Close and Volume columns.
+
+        Rows with missing prices are dropped, as when saving bars to the database.
+        """
+        data = data.dropna(subset=['Open', 'High', 'Low', 'Close', 'Volume'])
+        index = exchange_wall_clock(data.index)
+        return cls(
+            index.values,
+            data['Open'].to_numpy(),
+            data['High'].to_numpy(),
+            data['Low'].to_numpy(),
+            data['Close'].to_numpy(),
+            data['Volume'].to_numpy()
+        )
+
+    @classmethod
+    def from_rows(cls, rows: Sequence) -> 'BarSeries':
+        """
+        Create a series from TimeInterval-like objects or (id, start_time, open, high, low, close, volume) tuples.
+        """
+        if len(rows) and hasattr(rows[0], 'start_time'):
+            rows = [(row.id, row.start_time, row.open, row.high, row.low, row.close, row.volume) for row in rows]
+        if not len(rows):
+            return cls.empty()
+        ids, start_times, opens, highs, lows, closes, volumes = zip(*rows)
+        return cls(np.array(start_times, dtype='datetime64[ns]'), opens, highs, lows, closes, volumes, id=ids)
+
+    @classmethod
+    def concat(cls, series: Iterable['BarSeries']) -> 'BarSeries':
+        """Join several series end to end."""
+        series = list(series)
+        if not series:
+            return cls.empty()
+        columns = {column: np.concatenate([bars.column(column) for bars in series]) for column in cls.COLUMNS}
+        return cls(**columns)
+
+    def append(self, other: 'BarSeries') -> 'BarSeries':
+        """Return a new series with other's bars after these."""
+        return BarSeries.concat([self, other])
+
+    def column(self, name: str) -> np.ndarray:
+        """Return a column array by name; 'start_time' is a datetime64[ns] view of 'timestamp'."""
+        if name == 'start_time':
+            return self.timestamp.view('datetime64[ns]')
+        if name not in self.COLUMNS:
+            raise KeyError(name)
+        return getattr(self, name)
+
+    @property
+    def start_time(self) -> np.ndarray:
+        """Start times as a datetime64[ns] view of the timestamps."""
+        return self.timestamp.view('datetime64[ns]')
+
+    def __len__(self) -> int:
+        return len(self.timestamp)
+
+    def __getitem__(self, key):
+        """
+        Column by name, or a sub-series by position.
+
+        Slices return views of the same arrays; integer arrays and boolean masks copy.
+        """
+        if isinstance(key, str):
+            return self.column(key)
+        if isinstance(key, (int, np.integer)):
+            key = slice(key, key + 1 or None)
+        elif not isinstance(key, slice):
+            key = np.asarray(key)
+            if key.dtype != bool:
+                key = key.astype(np.intp)
+        return BarSeries(
+            self.timestamp[key], self.open[key], self.high[key], self.low[key],
+            self.close[key], self.volume[key], id=self.id[key]
+        )
+
+    def take(self, indices) -> 'BarSeries':
+        """Return the bars at the given positions."""
+        return self[np.asarray(indices, dtype=np.intp)]
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """Return the bars as a yfinance-style DataFrame indexed by start time."""
+        return pd.DataFrame({
+            'Open': self.open,
+            'High': self.high,
+            'Low': self.low,
+            'Close': self.close,
+            'Volume': self.volume
+        }, index=pd.DatetimeIndex(self.start_time, name='start_time'), copy=False)
+
+    def __repr__(self) -> str:
+        if not len(self):
+            return "BarSeries(0 bars)"
+        return f"BarSeries({len(self)} bars, {self.start_time[0]} to {self.start_time[-1]})"
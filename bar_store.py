@@ -0,0 +1,274 @@
+"""
+Module for a local, memory-mapped columnar store of 1-minute bars.
+
+Research and backtests read the same history over and over; loading it through
+PostgreSQL and SQLAlchemy every time is slow. BarStore keeps one directory per
+symbol and trading day holding a raw .npy file per BarSeries column:
+
+    <root>/index.json
+    <root>/AAPL/2024-01-02/{id,timestamp,open,high,low,close,volume}.npy
+
+Files are opened with np.load(mmap_mode='r'), so a day is read as zero-copy views
+of the page cache. index.json records every day's row count and first/last
+timestamp, so time-range reads only open the days they need.
+"""
+from typing import Dict, Iterator, List, Optional
+from datetime import date, datetime
+import argparse
+import json
+import os
+import numpy as np
+import pandas as pd
+from bar_series import BarSeries
+from database import Database, Symbol
+
+BAR_STORE_PATH = os.getenv('BAR_STORE_PATH', 'bar_store')
+INDEX_FILE = 'index.json'
+NS_PER_DAY = 86_400_000_000_000
+
+def _to_ns(value) -> Optional[int]:
+    """Convert a datetime-like bound to wall-clock epoch nanoseconds."""
+    if value is None:
+        return None
+    timestamp = pd.Timestamp(value)
+    if timestamp.tz is not None:
+        timestamp = timestamp.tz_localize(None)
+    return timestamp.value
+
+class BarStore:
+    """
+    Per-symbol, per-day .npy bar files with an index for time-range lookups.
+
+    Example:
+        >>> store = BarStore('bar_store')
+        >>> store.write_dataframe('AAPL', yf.Ticker('AAPL').history(period='5d', interval='1m'))
+        >>> bars = store.read('AAPL', start='2024-01-02', end='2024-01-03')
+    """
+
+    def __init__(self, root: str = BAR_STORE_PATH):
+        """
+        Open a store, creating its directory if needed.
+
+        Args:
+            root (str): Directory holding the store (default: BAR_STORE_PATH or ./bar_store)
+        """
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self.index = self._load_index()
+
+    def _load_index(self) -> Dict:
+        path = os.path.join(self.root, INDEX_FILE)
+        if not os.path.exists(path):
+            return {'symbols': {}}
+        with open(path) as file:
+            return json.load(file)
+
+    def _save_index(self) -> None:
+        """Write the index atomically so readers never see a partial file."""
+        path = os.path.join(self.root, INDEX_FILE)
+        with open(path + '.tmp', 'w') as file:
+            json.dump(self.index, file, indent=1, sort_keys=True)
+        os.replace(path + '.tmp', path)
+
+    def _day_dir(self, symbol: str, day: str) -> str:
+        return os.path.join(self.root, symbol, day)
+
+    def symbols(self) -> List[str]:
+        """Return every symbol in the store."""
+        return sorted(self.index['symbols'])
+
+    def days(self, symbol: str) -> List[str]:
+        """Return the ISO dates stored for a symbol, oldest first."""
+        return sorted(self.index['symbols'].get(symbol, {}))
+
+    def read_day(self, symbol: str, day: str) -> BarSeries:
+        """
+        Memory-map one stored day of a symbol.
+
+        Returns:
+            BarSeries: Read-only views of the day's files
+        """
+        directory = self._day_dir(symbol, day)
+        columns = {
+            column: np.load(os.path.join(directory, f'{column}.npy'), mmap_mode='r')
+            for column in BarSeries.COLUMNS
+        }
+        return BarSeries(**columns)
+
+    def read_days(self, symbol: str, start=None, end=None) -> Iterator[BarSeries]:
+        """
+        Yield a symbol's bars day by day as memory-mapped views, trimmed to [start, end).
+
+        Args:
+            symbol (str): Stock symbol
+            start: Only bars starting at or after this time
+            end: Only bars starting before this time
+        """
+        start_ns, end_ns = _to_ns(start), _to_ns(end)
+        entries = self.index['symbols'].get(symbol, {})
+        for day in sorted(entries):
+            entry = entries[day]
+            if start_ns is not None and entry['last'] < start_ns:
+                continue
+            if end_ns is not None and entry['first'] >= end_ns:
+                break
+            bars = self.read_day(symbol, day)
+            first = 0 if start_ns is None else np.searchsorted(bars.timestamp, start_ns, side='left')
+            last = len(bars) if end_ns is None else np.searchsorted(bars.timestamp, end_ns, side='left')
+            yield bars[first:last]
+
+    def read(self, symbol: str, start=None, end=None) -> BarSeries:
+        """
+        Read a symbol's bars in [start, end) as one series.
+
+        A range within a single day is returned as zero-copy views; longer ranges are
+        concatenated into new arrays.
+        """
+        days = list(self.read_days(symbol, start, end))
+        if len(days) == 1:
+            return days[0]
+        return BarSeries.concat(days)
+
+    def write(self, symbol: str, bars: BarSeries) -> int:
+        """
+        Merge bars into a symbol's day files.
+
+        Bars already stored at the same timestamp are replaced, as with
+        Database.upsert_time_intervals.
+
+        Args:
+            symbol (str): Stock symbol
+            bars (BarSeries): Bars to store, in any order
+
+        Returns:
+            int: Number of bars written
+        """
+        if not len(bars):
+            return 0
+
+        bars = bars.take(np.argsort(bars.timestamp, kind='stable'))
+        day_numbers = bars.timestamp // NS_PER_DAY
+        starts = np.flatnonzero(np.concatenate(([True], day_numbers[1:] != day_numbers[:-1])))
+        ends = np.concatenate((starts[1:], [len(bars)]))
+
+        entries = self.index['symbols'].setdefault(symbol, {})
+        for start, end in zip(starts, ends):
+            day = str(np.datetime64(int(day_numbers[start]), 'D'))
+            self._write_day(symbol, day, bars[start:end], entries)
+
+        self._save_index()
+        return len(bars)
+
+    def _write_day(self, symbol: str, day: str, bars: BarSeries, entries: Dict) -> None:
+        """Merge one day's bars with the stored ones and rewrite the day's files."""
+        if day in entries:
+            stored = self.read_day(symbol, day)
+            bars = BarSeries.concat([stored, _keep_stored_ids(stored, bars)])
+            # Keep the last bar for every timestamp, in time order
+            reversed_timestamps = bars.timestamp[::-1]
+            _, last = np.unique(reversed_timestamps, return_index=True)
+            bars = bars.take(len(bars) - 1 - last)
+
+        directory = self._day_dir(symbol, day)
+        os.makedirs(directory, exist_ok=True)
+        for column in BarSeries.COLUMNS:
+            path = os.path.join(directory, f'{column}.npy')
+            # np.save appends .npy to names without it, so the temporary name keeps the suffix
+            temporary = os.path.join(directory, f'{column}.tmp.npy')
+            np.save(temporary, np.ascontiguousarray(bars[column]))
+            os.replace(temporary, path)
+
+        entries[day] = {
+            'rows': len(bars),
+            'first': int(bars.timestamp[0]),
+            'last': int(bars.timestamp[-1])
+        }
+
+    def write_dataframe(self, symbol: str, data: pd.DataFrame) -> int:
+        """
+        Store a yfinance-style OHLCV DataFrame, the input save_time_interval takes.
+
+        Bars from a DataFrame have no interval id yet, so new bars are stored with id -1
+        and bars replacing stored ones keep the stored ids.
+        """
+        bars = BarSeries.from_dataframe(data)
+        bars.id = np.full(len(bars), -1, dtype=np.int64)
+        return self.write(symbol, bars)
+
+def _keep_stored_ids(stored: BarSeries, bars: BarSeries) -> BarSeries:
+    """Give bars without an id (-1) the id of the stored bar at the same timestamp, if any."""
+    missing = np.flatnonzero(bars.id < 0)
+    if not len(missing):
+        return bars
+    positions = np.minimum(np.searchsorted(stored.timestamp, bars.timestamp[missing]), len(stored) - 1)
+    matched = stored.timestamp[positions] == bars.timestamp[missing]
+    ids = bars.id.copy()
+    ids[missing[matched]] = stored.id[positions[matched]]
+    bars.id = ids
+    return bars
+
+def sync_from_database(
+    db: Database,
+    store: BarStore,
+    symbols: Optional[List[str]] = None,
+    start_date: Optional[datetime] = None,
+    chunk_size: int = 100000
+) -> Dict[str, int]:
+    """
+    Export bars from the time_intervals table into a bar store.
+
+    Bars are streamed in chunks, so the export runs in bounded memory however large
+    the table is. Days that are already stored are merged, not duplicated.
+
+    Args:
+        db (Database): Database to export from
+        store (BarStore): Store to write to
+        symbols (List[str]): Symbols to export (default: all)
+        start_date (datetime): Only export bars starting at or after this time
+        chunk_size (int): Number of bars read per chunk
+
+    Returns:
+        Dict[str, int]: Number of bars written per symbol
+    """
+    names = dict(db.session.query(Symbol.id, Symbol.symbol).all())
+    written = {}
+
+    for chunk in db.stream_time_intervals(start_date=start_date, chunk_size=chunk_size, symbols=symbols or None):
+        symbol_ids = chunk['symbol_id']
+        starts = np.flatnonzero(np.concatenate(([True], symbol_ids[1:] != symbol_ids[:-1])))
+        ends = np.concatenate((starts[1:], [len(symbol_ids)]))
+        bars = BarSeries.from_arrays(chunk)
+        for start, end in zip(starts, ends):
+            symbol = names[int(symbol_ids[start])]
+            written[symbol] = written.get(symbol, 0) + store.write(symbol, bars[start:end])
+
+    return written
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Memory-mapped columnar bar store")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    sync_parser = subparsers.add_parser('sync', help="Export bars from the database into the store")
+    sync_parser.add_argument('--root', default=BAR_STORE_PATH, help="Store directory")
+    sync_parser.add_argument('--symbol', action='append', help="Symbol to export, repeatable (default: all)")
+    sync_parser.add_argument('--since', type=date.fromisoformat, help="Only export bars from this date (YYYY-MM-DD)")
+
+    list_parser = subparsers.add_parser('list', help="List stored symbols and days")
+    list_parser.add_argument('--root', default=BAR_STORE_PATH, help="Store directory")
+
+    args = parser.parse_args()
+    store = BarStore(args.root)
+    if args.command == 'sync':
+        db = Database()
+        try:
+            since = datetime.combine(args.since, datetime.min.time()) if args.since else None
+            written = sync_from_database(db, store, args.symbol, since)
+            for symbol, count in sorted(written.items()):
+                print(f"{symbol}: {count} bars")
+            print(f"Synced {sum(written.values())} bars into {args.root}")
+        finally:
+            db.close()
+    else:
+        for symbol in store.symbols():
+            days = store.days(symbol)
+            print(f"{symbol}: {len(days)} days, {days[0]} to {days[-1]}")
@@ -0,0 +1,20 @@
+from database import Database, Symbol, ROLLUP_TIMEFRAMES, init_schema
+
+def build_rollups():
+    """Rebuild the interval_rollups table from all stored 1-minute bars"""
+    db = Database()
+    try:
+        print(f"Building {', '.join(f'{minutes}m' for minutes in ROLLUP_TIMEFRAMES)} rollups...")
+        
+        for symbol in db.session.query(Symbol).order_by(Symbol.symbol).all():
+            count = db.update_rollups(symbol.id)
+            print(f"{symbol.symbol}: {count} rollup bars")
+        
+        print("Rollup build complete!")
+        
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    init_schema()
+    build_rollups()
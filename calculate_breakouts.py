@@ -1,16 +1,344 @@
 """
 Module for calculating volume breakouts based on adjusted volume SMA.
 """
-from typing import List, Dict
-from datetime import datetime
+from typing import List, Dict, Optional, Tuple
+from datetime import date, datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import numpy as np
 import pandas as pd
-from database import Database, TimeInterval, Symbol
+from sqlalchemy import func
+from bar_series import BarSeries
+from config import SCAN_REVISION_GRACE_SECONDS
+from database import Breakout, Database, ROLLUP_TIMEFRAMES, TimeInterval, Symbol, init_schema
+from indicators import IndicatorEngine, load_rollup_bars, load_symbol_bars
+from resample import resample_bars
 from tests.utils.test_utils import TechnicalAnalysis
 
-def find_volume_breakouts(
+# Where scans read bars from, see find_volume_breakouts
+BAR_SOURCES = ('minute', 'rollup', 'resample')
+
+def default_bar_source(ticker_time: int) -> str:
+    """Scan the interval_rollups bars where they are kept, else sample 1-minute bars."""
+    return 'rollup' if ticker_time in ROLLUP_TIMEFRAMES else 'minute'
+
+def _breakout_indices(
+    bars: BarSeries,
+    ticker_time: int,
+    lookback_period: int,
+    volume_ratio_threshold: float,
+    first_candidate: int,
+    presampled: bool = False
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Locate breakout bars with whole-array operations.
+    
+    Returns:
+        Tuple of (indices of breakout bars, adjusted volume SMA, volume ratio)
+    """
+    adjusted_volume_sma = IndicatorEngine(bars, presampled).adjusted_sma(
+        'V', lookback_period, ticker_time
+    ).to_numpy()
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        volume_ratio = bars['volume'] / adjusted_volume_sma
+    
+    # Bars before first_candidate are warm-up only, and bars without a usable SMA are skipped
+    mask = np.zeros(len(volume_ratio), dtype=bool)
+    mask[first_candidate:] = True
+    mask &= ~np.isnan(adjusted_volume_sma) & (adjusted_volume_sma != 0)
+    mask &= volume_ratio > volume_ratio_threshold
+    
+    return np.flatnonzero(mask), adjusted_volume_sma, volume_ratio
+
+def _breakout_dicts(
+    symbol: str,
+    bars: BarSeries,
+    adjusted_volume_sma: np.ndarray,
+    volume_ratio: np.ndarray
+) -> List[Dict]:
+    """Build the breakout report dicts for bars that are all breakouts."""
+    breakouts = []
+    start_times = bars['start_time'].astype('datetime64[us]').tolist()
+    for i, start_time in enumerate(start_times):
+        breakouts.append({
+            'Symbol': symbol,
+            'Date': start_time.strftime('%Y-%m-%d'),
+            'Time': start_time.strftime('%H:%M'),
+            'Volume': int(bars['volume'][i]),
+            'Vol SMA': round(float(adjusted_volume_sma[i]), 2),
+            'Vol Ratio': round(float(volume_ratio[i]), 2),
+            'Open': round(float(bars['open'][i]), 2),
+            'High': round(float(bars['high'][i]), 2),
+            'Low': round(float(bars['low'][i]), 2),
+            'Close': round(float(bars['close'][i]), 2)
+        })
+    return breakouts
+
+def scan_symbol_breakouts(
+    symbol: str,
+    bars: BarSeries,
     ticker_time: int = 5,
     lookback_period: int = 20,
     volume_ratio_threshold: float = 10.0
+) -> List[Dict]:
+    """
+    Find volume breakouts in one symbol's bars with whole-array operations.
+    
+    Args:
+        symbol (str): Stock symbol the bars belong to
+        bars (BarSeries): Bars as returned by indicators.load_symbol_bars
+        ticker_time (int): Time interval in minutes (default: 5)
+        lookback_period (int): Number of bars to look back (default: 20)
+        volume_ratio_threshold (float): Minimum ratio of current volume to adjusted SMA (default: 10.0)
+    
+    Returns:
+        List[Dict]: Breakout information for every matching bar, in time order
+    """
+    indices, adjusted_volume_sma, volume_ratio = _breakout_indices(
+        bars, ticker_time, lookback_period, volume_ratio_threshold, first_candidate=lookback_period
+    )
+    return _breakout_dicts(symbol, bars.take(indices), adjusted_volume_sma[indices], volume_ratio[indices])
+
+def scan_breakouts_incremental(
+    ticker_time: int = 5,
+    lookback_period: int = 20,
+    volume_ratio_threshold: float = 10.0,
+    db: Optional[Database] = None,
+    workers: int = 1
+) -> List[Dict]:
+    """
+    Scan only the bars added or revised since the last run and store new breakouts in the breakouts table.
+    
+    Each symbol keeps a watermark per parameter set. A run loads the bars written since the
+    watermark plus the ticker_time * lookback_period minutes of warm-up the adjusted SMA
+    needs, so the result is the same as a full rescan while the work grows with new data only.
+    
+    Args:
+        ticker_time (int): Time interval in minutes (default: 5)
+        lookback_period (int): Number of bars to look back (default: 20)
+        volume_ratio_threshold (float): Minimum ratio of current volume to adjusted SMA (default: 10.0)
+        db (Database): Database to scan, a new connection is opened if not given
+        workers (int): Number of processes to shard the symbols across (default: 1)
+    
+    Returns:
+        List[Dict]: Breakouts found in this run, in the same format as find_volume_breakouts
+    """
+    owns_db = db is None
+    if owns_db:
+        db = Database()
+    
+    try:
+        return _run_scan(db, ticker_time, lookback_period, volume_ratio_threshold,
+                         incremental=True, workers=workers, bar_source='minute')
+    
+    finally:
+        if owns_db:
+            db.close()
+
+def scan_symbol_incremental(
+    db: Database,
+    symbol_id: int,
+    ticker_time: int,
+    lookback_period: int,
+    volume_ratio_threshold: float
+) -> Tuple[BarSeries, np.ndarray, np.ndarray]:
+    """
+    Scan one symbol from its watermark, persist breakouts and advance the watermark.
+    
+    New bars are found by the time they were written as well as by start time: every
+    upsert stamps the bars it inserts or rewrites with updated_at, so bars stored behind
+    the last scanned time, e.g. backfilled gaps, and revised bars, e.g. the forming bar
+    of each refresh, are picked up and the symbol is rescanned from the earliest of them.
+    Bars written up to SCAN_REVISION_GRACE_SECONDS before the watermark are rescanned
+    too, so a writer that commits after a later one is not missed.
+    
+    Returns:
+        Tuple of (breakout bars, their adjusted volume SMA, their volume ratio), only
+        those not already stored with the same volume
+    """
+    watermark = db.get_scan_watermark(symbol_id, lookback_period, ticker_time, volume_ratio_threshold)
+    scanned_at = datetime.utcnow()
+    replace_from = None
+    stored = {}
+    
+    if watermark:
+        earliest_changed, last_updated_at = db.session.query(
+            func.min(TimeInterval.start_time), func.max(TimeInterval.updated_at)
+        ).filter(
+            TimeInterval.symbol_id == symbol_id,
+            TimeInterval.updated_at > watermark.last_updated_at - timedelta(seconds=SCAN_REVISION_GRACE_SECONDS)
+        ).one()
+        if earliest_changed is None:
+            return BarSeries.empty(), np.empty(0), np.empty(0)
+        
+        if earliest_changed > watermark.last_start_time:
+            scan_from, side = watermark.last_start_time, 'right'
+            bars_before = watermark.bars_scanned
+        else:
+            # Bars were stored or rewritten behind the watermark; rescan from the earliest
+            # and replace the breakouts stored since then, whose volume or SMA they change
+            scan_from, side = earliest_changed, 'left'
+            replace_from = earliest_changed
+            bars_before = db.session.query(TimeInterval.id).filter(
+                TimeInterval.symbol_id == symbol_id,
+                TimeInterval.start_time < earliest_changed
+            ).count()
+            stored = dict(db.session.query(Breakout.interval_id, Breakout.volume).filter(
+                Breakout.symbol_id == symbol_id,
+                Breakout.lookback_period == lookback_period,
+                Breakout.ticker_time == ticker_time,
+                Breakout.volume_ratio_threshold == volume_ratio_threshold,
+                Breakout.start_time >= replace_from
+            ).all())
+        warmup_start = scan_from - timedelta(minutes=ticker_time * lookback_period)
+        bars = load_symbol_bars(db, symbol_id, start_time=warmup_start)
+        new_start = int(np.searchsorted(bars['start_time'], np.datetime64(scan_from, 'ns'), side=side))
+    else:
+        bars = load_symbol_bars(db, symbol_id)
+        new_start = 0
+        bars_before = 0
+        last_updated_at = db.session.query(func.max(TimeInterval.updated_at)).filter(
+            TimeInterval.symbol_id == symbol_id
+        ).scalar()
+    
+    new_bars = len(bars) - new_start
+    if new_bars <= 0:
+        return bars[:0], np.empty(0), np.empty(0)
+    
+    # The full scan never considers the first lookback_period bars of a symbol's history
+    first_candidate = new_start + max(0, lookback_period - bars_before)
+    indices, adjusted_volume_sma, volume_ratio = _breakout_indices(
+        bars, ticker_time, lookback_period, volume_ratio_threshold, first_candidate
+    )
+    
+    db.save_breakouts(
+        symbol_id, lookback_period, ticker_time, volume_ratio_threshold,
+        _breakout_rows(bars, indices, adjusted_volume_sma, volume_ratio),
+        # Bars stored before updated_at existed have none; later writes are stamped after scanned_at
+        last_updated_at=last_updated_at or scanned_at,
+        last_start_time=bars['start_time'][-1].astype('datetime64[us]').item(),
+        bars_scanned=bars_before + new_bars,
+        replace_from=replace_from
+    )
+    
+    if stored:
+        found = np.array([stored.get(interval_id) != volume for interval_id, volume
+                          in zip(bars['id'][indices].tolist(), bars['volume'][indices].tolist())], dtype=bool)
+        indices = indices[found]
+    return bars.take(indices), adjusted_volume_sma[indices], volume_ratio[indices]
+
+def scan_symbol_day(
+    db: Database,
+    symbol_id: int,
+    trading_day: date,
+    ticker_time: int,
+    lookback_period: int,
+    volume_ratio_threshold: float
+) -> Tuple[BarSeries, np.ndarray, np.ndarray]:
+    """
+    Scan one symbol's bars for a single day and store the breakouts found.
+    
+    The day is scanned with the same warm-up and history rules as a full scan, so
+    per-day scans of every day add up to exactly the full scan's breakouts.
+    
+    Returns:
+        Tuple of (breakout bars, their adjusted volume SMA, their volume ratio)
+    """
+    day_start = datetime.combine(trading_day, datetime.min.time())
+    warmup_start = day_start - timedelta(minutes=ticker_time * lookback_period)
+    bars = load_symbol_bars(db, symbol_id, start_time=warmup_start, end_time=day_start + timedelta(days=1))
+    
+    # Bars before the warm-up count towards the lookback_period bars a full scan skips
+    earlier_bars = db.session.query(TimeInterval.id).filter(
+        TimeInterval.symbol_id == symbol_id,
+        TimeInterval.start_time < warmup_start
+    ).count()
+    day_first = int(np.searchsorted(bars['start_time'], np.datetime64(day_start, 'ns'), side='left'))
+    first_candidate = max(day_first, lookback_period - earlier_bars)
+    
+    indices, adjusted_volume_sma, volume_ratio = _breakout_indices(
+        bars, ticker_time, lookback_period, volume_ratio_threshold, first_candidate
+    )
+    db.insert_breakouts(symbol_id, lookback_period, ticker_time, volume_ratio_threshold,
+                        _breakout_rows(bars, indices, adjusted_volume_sma, volume_ratio))
+    
+    return bars.take(indices), adjusted_volume_sma[indices], volume_ratio[indices]
+
+def _breakout_rows(
+    bars: BarSeries,
+    indices: np.ndarray,
+    adjusted_volume_sma: np.ndarray,
+    volume_ratio: np.ndarray
+) -> List[Dict]:
+    """Build breakouts table rows for the given bar indices."""
+    start_times = bars['start_time'][indices].astype('datetime64[us]').tolist()
+    return [
+        {
+            'interval_id': int(bars['id'][i]),
+            'start_time': start_time,
+            'volume': int(bars['volume'][i]),
+            'volume_sma': float(adjusted_volume_sma[i]),
+            'volume_ratio': float(volume_ratio[i]),
+            'open': float(bars['open'][i]),
+            'high': float(bars['high'][i]),
+            'low': float(bars['low'][i]),
+            'close': float(bars['close'][i])
+        }
+        for i, start_time in zip(indices, start_times)
+    ]
+
+def load_stored_breakouts(
+    ticker_time: int = 5,
+    lookback_period: int = 20,
+    volume_ratio_threshold: float = 10.0,
+    db: Optional[Database] = None
+) -> List[Dict]:
+    """
+    Load every stored breakout for a parameter set in the find_volume_breakouts format.
+    
+    Args:
+        ticker_time (int): Time interval in minutes (default: 5)
+        lookback_period (int): Number of bars to look back (default: 20)
+        volume_ratio_threshold (float): Minimum ratio of current volume to adjusted SMA (default: 10.0)
+        db (Database): Database to read, a new connection is opened if not given
+    
+    Returns:
+        List[Dict]: Stored breakout information ordered by symbol and time
+    """
+    owns_db = db is None
+    if owns_db:
+        db = Database()
+    
+    try:
+        return [
+            {
+                'Symbol': symbol,
+                'Date': breakout.start_time.strftime('%Y-%m-%d'),
+                'Time': breakout.start_time.strftime('%H:%M'),
+                'Volume': breakout.volume,
+                'Vol SMA': round(breakout.volume_sma, 2),
+                'Vol Ratio': round(breakout.volume_ratio, 2),
+                'Open': round(breakout.open, 2),
+                'High': round(breakout.high, 2),
+                'Low': round(breakout.low, 2),
+                'Close': round(breakout.close, 2)
+            }
+            for breakout, symbol in db.get_breakouts(lookback_period, ticker_time, volume_ratio_threshold)
+        ]
+    
+    finally:
+        if owns_db:
+            db.close()
+
+def find_volume_breakouts(
+    ticker_time: int = 5,
+    lookback_period: int = 20,
+    volume_ratio_threshold: float = 10.0,
+    vectorized: bool = True,
+    db: Optional[Database] = None,
+    workers: int = 1,
+    bar_source: Optional[str] = None
 ) -> List[Dict]:
     """
     Find stocks with significant volume breakouts based on adjusted volume SMA.
@@ -19,70 +347,204 @@ def find_volume_breakouts(
         ticker_time (int): Time interval in minutes (default: 5)
         lookback_period (int): Number of bars to look back (default: 20)
         volume_ratio_threshold (float): Minimum ratio of current volume to adjusted SMA (default: 10.0)
+        vectorized (bool): Load each symbol's bars with one query and scan them as arrays.
+            False runs the original per-bar scan through TechnicalAnalysis (default: True)
+        db (Database): Database to scan, a new connection is opened if not given
+        workers (int): Number of processes to shard the symbols across, each with its
+            own database connection (default: 1)
+        bar_source (str): 'minute' samples 1-minute bars at multiples of ticker_time,
+            'rollup' scans the aggregated ticker_time bars in interval_rollups and
+            'resample' aggregates 1-minute bars into ticker_time bars from the session
+            open in memory, for any ticker_time. Defaults to 'rollup' for ticker_time in
+            ROLLUP_TIMEFRAMES and 'minute' otherwise; the per-bar scan always samples 1-minute bars
     
     Returns:
         List[Dict]: List of dictionaries containing breakout information for each matching symbol
     """
-    db = Database()
-    ta = TechnicalAnalysis()
+    if bar_source is None:
+        bar_source = default_bar_source(ticker_time) if vectorized else 'minute'
+    if bar_source not in BAR_SOURCES:
+        raise ValueError(f"Unknown bar source {bar_source}")
+    
+    owns_db = db is None
+    if owns_db:
+        db = Database()
     
     try:
-        # Get all unique symbols from the database
-        symbols = db.session.query(TimeInterval.symbol_id).distinct().all()
-        breakouts = []
+        if not vectorized:
+            if workers > 1 or bar_source != 'minute':
+                raise ValueError("The per-bar scan only supports 1-minute bars in a single process")
+            return _find_volume_breakouts_per_bar(db, ticker_time, lookback_period, volume_ratio_threshold)
         
-        for (symbol_id,) in symbols:
-            # Get symbol name
-            symbol = db.session.query(Symbol).filter(Symbol.id == symbol_id).first()
-            if not symbol:
-                continue
-                
-            # Get all time intervals for this symbol, ordered by time
-            intervals = db.session.query(TimeInterval).filter(
-                TimeInterval.symbol_id == symbol_id
-            ).order_by(TimeInterval.start_time.asc()).all()
+        return _run_scan(db, ticker_time, lookback_period, volume_ratio_threshold,
+                         incremental=False, workers=workers, bar_source=bar_source)
+    
+    finally:
+        if owns_db:
+            db.close()
+
+def _scan_symbol(
+    db: Database,
+    symbol_id: int,
+    ticker_time: int,
+    lookback_period: int,
+    volume_ratio_threshold: float,
+    incremental: bool,
+    bar_source: str
+) -> Tuple[BarSeries, np.ndarray, np.ndarray]:
+    """
+    Scan one symbol's full history, or from its watermark when incremental.
+    
+    Returns:
+        Tuple of (breakout bars, their adjusted volume SMA, their volume ratio)
+    """
+    if incremental:
+        return scan_symbol_incremental(db, symbol_id, ticker_time, lookback_period, volume_ratio_threshold)
+    
+    if bar_source == 'rollup':
+        bars = load_rollup_bars(db, symbol_id, ticker_time)
+    elif bar_source == 'resample':
+        bars = resample_bars(load_symbol_bars(db, symbol_id), ticker_time)
+    else:
+        bars = load_symbol_bars(db, symbol_id)
+    indices, adjusted_volume_sma, volume_ratio = _breakout_indices(
+        bars, ticker_time, lookback_period, volume_ratio_threshold,
+        first_candidate=lookback_period, presampled=bar_source != 'minute'
+    )
+    return bars.take(indices), adjusted_volume_sma[indices], volume_ratio[indices]
+
+def _scan_shard(
+    db_url: str,
+    shard: List[int],
+    ticker_time: int,
+    lookback_period: int,
+    volume_ratio_threshold: float,
+    incremental: bool,
+    bar_source: str
+) -> List[Tuple[int, Tuple[BarSeries, np.ndarray, np.ndarray]]]:
+    """Worker process entry point: scan a shard of symbol ids with its own database connection."""
+    db = Database(db_url)
+    try:
+        return [
+            (symbol_id, _scan_symbol(db, symbol_id, ticker_time, lookback_period,
+                                     volume_ratio_threshold, incremental, bar_source))
+            for symbol_id in shard
+        ]
+    finally:
+        db.close()
+
+def _run_scan(
+    db: Database,
+    ticker_time: int,
+    lookback_period: int,
+    volume_ratio_threshold: float,
+    incremental: bool,
+    workers: int,
+    bar_source: str
+) -> List[Dict]:
+    """
+    Scan every symbol with bars, serially or sharded across a process pool.
+    
+    Workers return compact arrays holding only their breakout rows, and the results
+    are merged in symbol id order so the output does not depend on the worker count.
+    """
+    symbols = db.session.query(Symbol.id, Symbol.symbol).filter(
+        Symbol.id.in_(db.session.query(TimeInterval.symbol_id).distinct())
+    ).order_by(Symbol.id).all()
+    
+    if workers <= 1 or len(symbols) <= 1:
+        results = {
+            symbol_id: _scan_symbol(db, symbol_id, ticker_time, lookback_period,
+                                    volume_ratio_threshold, incremental, bar_source)
+            for symbol_id, _ in symbols
+        }
+    else:
+        url = db.engine.url
+        if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+            raise ValueError("An in-memory SQLite database cannot be shared with worker processes")
+        
+        # Interleave symbols so shards get a similar mix of long and short histories
+        symbol_ids = [symbol_id for symbol_id, _ in symbols]
+        shards = [symbol_ids[i::workers] for i in range(workers)]
+        db_url = url.render_as_string(hide_password=False)
+        
+        results = {}
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(_scan_shard, db_url, shard, ticker_time, lookback_period,
+                                volume_ratio_threshold, incremental, bar_source)
+                for shard in shards if shard
+            ]
+            for future in futures:
+                results.update(future.result())
+    
+    breakouts = []
+    for symbol_id, symbol in symbols:
+        breakouts.extend(_breakout_dicts(symbol, *results[symbol_id]))
+    return breakouts
+
+def _find_volume_breakouts_per_bar(
+    db: Database,
+    ticker_time: int,
+    lookback_period: int,
+    volume_ratio_threshold: float
+) -> List[Dict]:
+    """Original per-bar scan, kept as the reference the vectorized scanner is tested against."""
+    ta = TechnicalAnalysis(db, use_rollups=False)
+    
+    # Get all unique symbols from the database
+    symbols = db.session.query(TimeInterval.symbol_id).distinct().order_by(TimeInterval.symbol_id).all()
+    breakouts = []
+    
+    for (symbol_id,) in symbols:
+        # Get symbol name
+        symbol = db.session.query(Symbol).filter(Symbol.id == symbol_id).first()
+        if not symbol:
+            continue
+            
+        # Get all time intervals for this symbol, ordered by time
+        intervals = db.session.query(TimeInterval).filter(
+            TimeInterval.symbol_id == symbol_id
+        ).order_by(TimeInterval.start_time.asc()).all()
+        
+        if not intervals:
+            continue
+        
+        # Process each interval (except the first lookback_period ones)
+        for i in range(lookback_period, len(intervals)):
+            current_interval = intervals[i]
             
-            if not intervals:
+            # Calculate adjusted volume SMA for the lookback period
+            adjusted_volume_sma = ta.calculate_adjusted_sma(
+                type='V',
+                period=lookback_period,
+                ticker_time=ticker_time,
+                timeinterval_id=current_interval.id
+            )
+            
+            if not adjusted_volume_sma or adjusted_volume_sma == 0:
                 continue
             
-            # Process each interval (except the first lookback_period ones)
-            for i in range(lookback_period, len(intervals)):
-                current_interval = intervals[i]
-                
-                # Calculate adjusted volume SMA for the lookback period
-                adjusted_volume_sma = ta.calculate_adjusted_sma(
-                    type='V',
-                    period=lookback_period,
-                    ticker_time=ticker_time,
-                    timeinterval_id=current_interval.id
-                )
-                
-                if not adjusted_volume_sma or adjusted_volume_sma == 0:
-                    continue
-                
-                # Calculate volume ratio
-                volume_ratio = current_interval.volume / adjusted_volume_sma
-                
-                # Check if the volume ratio exceeds the threshold
-                if volume_ratio > volume_ratio_threshold:
-                    breakout_info = {
-                        'Symbol': symbol.symbol,
-                        'Date': current_interval.start_time.strftime('%Y-%m-%d'),
-                        'Time': current_interval.start_time.strftime('%H:%M'),
-                        'Volume': round(current_interval.volume, 2),
-                        'Vol SMA': round(adjusted_volume_sma, 2),
-                        'Vol Ratio': round(volume_ratio, 2),
-                        'Open': round(current_interval.open, 2),
-                        'High': round(current_interval.high, 2),
-                        'Low': round(current_interval.low, 2),
-                        'Close': round(current_interval.close, 2)
-                    }
-                    breakouts.append(breakout_info)
-        
-        return breakouts
+            # Calculate volume ratio
+            volume_ratio = current_interval.volume / adjusted_volume_sma
+            
+            # Check if the volume ratio exceeds the threshold
+            if volume_ratio > volume_ratio_threshold:
+                breakout_info = {
+                    'Symbol': symbol.symbol,
+                    'Date': current_interval.start_time.strftime('%Y-%m-%d'),
+                    'Time': current_interval.start_time.strftime('%H:%M'),
+                    'Volume': round(current_interval.volume, 2),
+                    'Vol SMA': round(adjusted_volume_sma, 2),
+                    'Vol Ratio': round(volume_ratio, 2),
+                    'Open': round(current_interval.open, 2),
+                    'High': round(current_interval.high, 2),
+                    'Low': round(current_interval.low, 2),
+                    'Close': round(current_interval.close, 2)
+                }
+                breakouts.append(breakout_info)
     
-    finally:
-        db.close()
+    return breakouts
 
 def export_breakouts_to_excel(breakouts: List[Dict], output_file: str = 'volume_breakouts.xlsx'):
     """
@@ -151,10 +613,37 @@ def export_breakouts_to_excel(breakouts: List[Dict], output_file: str = 'volume_
                 worksheet.set_row(row, None, workbook.add_format({'bg_color': '#F2F2F2'}))
 
 if __name__ == "__main__":
-    # Find breakouts
-    breakouts = find_volume_breakouts()
+    parser = argparse.ArgumentParser(description="Find volume breakouts and export them to Excel")
+    parser.add_argument('--ticker-time', type=int, default=5, help="Time interval in minutes")
+    parser.add_argument('--lookback', type=int, default=20, help="Number of bars to look back")
+    parser.add_argument('--threshold', type=float, default=10.0, help="Minimum volume to adjusted SMA ratio")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Only scan bars newer than the last run and store breakouts in the database")
+    parser.add_argument('--bar-source', choices=BAR_SOURCES,
+                        help="Sample 1-minute bars, scan rollup bars or resample 1-minute bars in memory "
+                             "(default: rollup bars where they are kept, else 1-minute bars)")
+    parser.add_argument('--workers', type=int, default=1, help="Number of processes to scan symbols with")
+    parser.add_argument('--output', default='volume_breakouts.xlsx', help="Excel file to write")
+    args = parser.parse_args()
+    if args.incremental and args.bar_source not in (None, 'minute'):
+        parser.error("--incremental only supports --bar-source minute")
+    
+    init_schema()
+    
+    if args.incremental:
+        # Scan new bars, then export everything stored for these parameters
+        new_breakouts = scan_breakouts_incremental(
+            args.ticker_time, args.lookback, args.threshold, workers=args.workers
+        )
+        print(f"Found {len(new_breakouts)} new volume breakouts.")
+        breakouts = load_stored_breakouts(args.ticker_time, args.lookback, args.threshold)
+    else:
+        # Find breakouts
+        breakouts = find_volume_breakouts(
+            args.ticker_time, args.lookback, args.threshold, workers=args.workers, bar_source=args.bar_source
+        )
     
     # Export to Excel
-    export_breakouts_to_excel(breakouts)
+    export_breakouts_to_excel(breakouts, args.output)
     
-    print(f"Found {len(breakouts)} volume breakouts. Results exported to 'volume_breakouts.xlsx'") 
\ No newline at end of file
+    print(f"Found {len(breakouts)} volume breakouts. Results exported to '{args.output}'")
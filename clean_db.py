@@ -1,5 +1,5 @@
 from database import Database, Symbol, TimeInterval
-from sqlalchemy import func
+from sqlalchemy import func, text
 from datetime import datetime
 
 def clean_database():
@@ -34,6 +34,14 @@ def clean_database():
         # Commit the changes
         db.session.commit()
         
+        # Databases created before the unique constraint existed need it for bulk upserts
+        db.session.execute(text(
+            "CREATE UNIQUE INDEX IF NOT EXISTS uq_symbol_start_time "
+            "ON time_intervals (symbol_id, start_time)"
+        ))
+        db.session.commit()
+        print("Ensured unique index on (symbol_id, start_time)")
+        
         # Print final counts
         total_symbols = db.session.query(Symbol).count()
         total_intervals = db.session.query(TimeInterval).count()
@@ -11,14 +11,51 @@ RSI_OVERSOLD = 30
 # Trading Parameters
 TIMEFRAME = '1h'  # Trading timeframe
 QUANTITY = 1  # Number of shares per trade
+BAR_CACHE_SIZE = 500  # Bars of history kept in memory per symbol
+BAR_CACHE_WARMUP_PERIOD = '1mo'  # History fetched once per symbol at startup
+CYCLE_INTERVAL_SECONDS = 60  # Time between the starts of two evaluation cycles
+CYCLE_DEADLINE_SECONDS = 45  # Symbols not evaluated this long after the cycle starts are skipped
+SYMBOL_TIMEOUT_SECONDS = 20  # Longest one symbol's evaluation may take before its signal is dropped
+EVALUATION_WORKERS = 16  # Symbols evaluated concurrently
+POSITION_BOOK_MAX_AGE_SECONDS = 120  # Stop trading if positions have not been refreshed for this long
+ORDER_WORKERS = 4  # Threads submitting orders to the broker
+ORDER_QUEUE_SIZE = 100  # Orders waiting for submission before new ones are rejected
+ORDER_MAX_RETRIES = 3  # Retries of a failed order submission, with the same client order id
+
+# Metrics
+METRICS_ENABLED = False  # Time the bot's stages; when False the timers cost a single flag check
+METRICS_PROMETHEUS_PORT = 9100  # Serve http://localhost:PORT/metrics, None to disable
+METRICS_JSON_PATH = 'metrics.json'  # File the metrics are flushed to, None to disable
+METRICS_FLUSH_SECONDS = 60  # Seconds between JSON flushes
 
 # Risk Management
 MAX_POSITION_SIZE = 1000  # Maximum position size in USD
 STOP_LOSS_PERCENTAGE = 2.0  # Stop loss percentage
 TAKE_PROFIT_PERCENTAGE = 4.0  # Take profit percentage
 
+# Backtesting
+BACKTEST_BATCH_SIZE = 50  # Symbols simulated together in one (symbols x bars) matrix
+
+# Breakout Scanning
+SCAN_REVISION_GRACE_SECONDS = 60  # Incremental scans also rescan bars written this long before their watermark
+
+# Data Ingestion
+INGEST_MAX_WORKERS = 8  # Symbols fetched concurrently
+PROVIDER_REQUESTS_PER_SECOND = 2.0  # Sustained request rate per data provider host
+PROVIDER_BURST = 5  # Requests allowed back to back before the rate limit applies
+PROVIDER_MAX_RETRIES = 3  # Retries of a failed fetch
+PROVIDER_BACKOFF_SECONDS = 1.0  # First retry delay, doubled on each retry
+SYMBOL_METADATA_TTL_DAYS = 7  # Company metadata older than this is fetched again
+SCHEDULER_SHARDS = 4  # Worker processes the symbol universe is split across
+SCHEDULER_MAX_CONCURRENCY = 16  # Requests in flight at once, across all shards
+SCHEDULER_REQUESTS_PER_SECOND = 2.0  # Sustained request rate, across all shards
+SCHEDULER_BAR_MINUTES = 1  # Refresh after every bar of this many minutes closes
+SCHEDULER_SETTLE_SECONDS = 5  # Wait after a bar closes so the provider has published it
+SCHEDULER_BACKFILL_CYCLES = 30  # Look for gaps in recent history every this many cycles, and once per session
+
 # API Configuration
 PAPER_TRADING = True  # Set to False for live trading
+ALPACA_DATA_FEED = 'iex'  # Market data feed for event mode: 'iex' (free) or 'sip'
 
 # Database Configuration
 DB_USER = 'admin'
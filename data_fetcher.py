@@ -1,59 +1,144 @@
-import yfinance as yf
-from datetime import datetime, timedelta
-from database import Database
+from datetime import timedelta
+from database import Database, init_schema
+from market_calendar import NYSECalendar, find_short_buckets
+from providers import YFinanceProvider, fetch_symbol, fetch_symbols
+from config import INGEST_MAX_WORKERS, SYMBOL_METADATA_TTL_DAYS
+
+def plan_fetch_windows(db, symbols, calendar=None, now=None, lookback_days=7, min_gap_minutes=5, max_windows=10,
+                       bucket_minutes=60, gaps=True, latest=None):
+    """
+    Work out which bars each symbol is missing
+    
+    The latest stored bar of every symbol is read in one query, and every symbol's
+    bar counts per session-aligned bucket over the last lookback_days in another.
+    A symbol then needs the window from just after its latest bar up to now, plus
+    every bucket missing at least min_gap_minutes trading minutes; a gap is
+    re-fetched whole buckets at a time. Without gaps, only the windows after the
+    latest bars are planned and the bucket query is skipped.
+    
+    Parameters:
+    - db: Database to check
+    - symbols: Symbols to plan for
+    - calendar: MarketCalendar of expected trading minutes (default: NYSE)
+    - now: Current exchange-local time (default: the calendar's clock)
+    - lookback_days: How far back to look for gaps
+    - min_gap_minutes: Shorter runs of missing minutes are treated as minutes without trades
+    - max_windows: Past this many ranges, one window from the first gap to now is fetched instead
+    - bucket_minutes: Length of the buckets bars are counted in
+    - gaps: Also plan the gaps in recent history
+    - latest: Latest start times from db.get_latest_start_times(symbols), read here if not given
+    
+    Returns:
+    - dict of symbol -> list of (start, end) windows, end exclusive; symbols with no
+      stored bars are left out so their whole period is fetched
+    """
+    calendar = calendar or NYSECalendar()
+    now = now or calendar.now()
+    if latest is None:
+        latest = db.get_latest_start_times(symbols)
+    counts = {}
+    if gaps and latest:
+        counts = db.get_bar_counts(list(latest), bucket_minutes, start_date=now - timedelta(days=lookback_days))
+    
+    windows = {}
+    for symbol in symbols:
+        if symbol not in latest:
+            continue
+        next_bar = latest[symbol] + timedelta(minutes=1)
+        
+        # Only look from the first stored bar: minutes before it were never fetched, not lost
+        stored = counts.get(symbol, {})
+        ranges = []
+        if stored:
+            first_stored = stored[min(stored)][1]
+            bucket_counts = {bucket: count for bucket, (count, _) in stored.items()}
+            ranges = find_short_buckets(bucket_counts, calendar, first_stored, next_bar, bucket_minutes,
+                                        min_gap_minutes)
+        if len(calendar.trading_minutes(next_bar, now)):
+            ranges.append((next_bar, now))
+        
+        if len(ranges) > max_windows:
+            ranges = [(ranges[0][0], now)]
+        windows[symbol] = ranges
+    return windows
 
 class DataFetcher:
-    def __init__(self):
-        self.db = Database()
+    def __init__(self, provider=None, db=None, calendar=None, limiter=None):
+        """
+        Parameters:
+        - provider: DataProvider to fetch from (default: Yahoo Finance)
+        - db: Database to write to (default: a new connection)
+        - calendar: MarketCalendar used to find missing bars (default: NYSE)
+        - limiter: RateLimiter for every request (default: the provider host's)
+        """
+        self.provider = provider or YFinanceProvider()
+        self.db = db if db is not None else Database()
+        self.calendar = calendar or NYSECalendar()
+        self.limiter = limiter
     
     def fetch_intraday_data(self, symbol, period='7d'):
         """
-        Fetch 1-minute intraday data from Yahoo Finance
+        Fetch 1-minute intraday data from the data provider
         
         Parameters:
         - symbol: Stock symbol (e.g., 'AAPL')
         - period: Time period ('1d', '5d', '7d', '1mo', '3mo', '6mo', '1y', '2y', '5y', '10y', 'ytd', 'max')
         """
+        stale = self.db.get_stale_symbols([symbol], timedelta(days=SYMBOL_METADATA_TTL_DAYS))
+        return self._save(fetch_symbol(self.provider, symbol, period, self.limiter, fetch_metadata=symbol in stale))
+    
+    def fetch_multiple_symbols(self, symbols, period='7d', max_workers=INGEST_MAX_WORKERS, incremental=False,
+                               windows=None):
+        """
+        Fetch data for multiple symbols
+        
+        Symbols are fetched concurrently by up to max_workers threads, rate limited per
+        provider host; each result is written here, on the calling thread, as it arrives.
+        With incremental, symbols that already have bars only fetch the windows
+        plan_fetch_windows finds missing, instead of the whole period; callers that
+        planned the windows themselves pass them as windows. Company names are only
+        fetched for symbols whose metadata is older than SYMBOL_METADATA_TTL_DAYS.
+        """
+        if windows is None and incremental:
+            windows = plan_fetch_windows(self.db, symbols, self.calendar)
+        stale = self.db.get_stale_symbols(symbols, timedelta(days=SYMBOL_METADATA_TTL_DAYS))
+        self.db.get_symbol_ids(symbols)
+        results = {}
+        for result in fetch_symbols(self.provider, symbols, period, max_workers, self.limiter,
+                                    windows=windows, metadata_symbols=stale):
+            results[result.symbol] = self._save(result)
+        return {symbol: results[symbol] for symbol in symbols}
+    
+    def _save(self, result):
+        """Save a fetched symbol and its bars, returning the bars or None on error"""
+        if result.error:
+            print(f"Error fetching data for {result.symbol}: {result.error}")
+            return None
         try:
-            # Fetch data from Yahoo Finance
-            stock = yf.Ticker(symbol)
-            data = stock.history(period=period, interval='1m')
-            
-            # Save symbol info
-            info = stock.info
-            self.db.save_symbol(
-                symbol=symbol,
-                company_name=info.get('longName'),
-                sector=info.get('sector'),
-                industry=info.get('industry')
-            )
+            # Save symbol info, only if it is new or its metadata was refreshed
+            if result.company_name is not None or result.symbol not in self.db.symbol_ids:
+                self.db.upsert_symbols({result.symbol: result.company_name})
             
             # Save time intervals
-            self.db.save_time_interval(symbol, data)
+            self.db.upsert_time_intervals(result.symbol, result.data)
             
-            return data
+            return result.data
         except Exception as e:
-            print(f"Error fetching data for {symbol}: {str(e)}")
+            self.db.session.rollback()
+            print(f"Error saving data for {result.symbol}: {str(e)}")
             return None
     
-    def fetch_multiple_symbols(self, symbols, period='7d'):
-        """Fetch data for multiple symbols"""
-        results = {}
-        for symbol in symbols:
-            data = self.fetch_intraday_data(symbol, period)
-            results[symbol] = data
-        return results
-    
     def close(self):
         """Close database connection"""
         self.db.close()
 
 # Example usage
 if __name__ == "__main__":
+    init_schema()
     fetcher = DataFetcher()
     
     # Example: Fetch data for some popular stocks
     symbols = ['AAPL', 'MSFT', 'GOOGL', 'AMZN']
     data = fetcher.fetch_multiple_symbols(symbols, period='7d')
     
-    fetcher.close() 
\ No newline at end of file
+    fetcher.close()
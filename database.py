@@ -1,9 +1,20 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, ForeignKey, Enum, Index, Boolean
+from sqlalchemy import create_engine, cast, func, inspect, select, text, BigInteger, Column, Integer, String, Float, DateTime, Date, Text, ForeignKey, Enum, Index, Boolean, UniqueConstraint, JSON
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import make_url
+from contextlib import contextmanager
 from datetime import datetime, timedelta
+import csv
 import enum
-from db_config import DATABASE_URL
+import io
+import os
+import threading
+import numpy as np
+import pandas as pd
+from market_calendar import exchange_wall_clock
+from resample import SESSION_OPEN
+from db_config import DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_PRE_PING, DB_STATEMENT_TIMEOUT_MS
 
 Base = declarative_base()
 
@@ -16,6 +27,7 @@ class Symbol(Base):
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    metadata_fetched_at = Column(DateTime)  # When company_name was last fetched from the data provider
     
     # Relationship to TimeInterval
     intervals = relationship("TimeInterval", back_populates="symbol")
@@ -35,21 +47,337 @@ class TimeInterval(Base):
     close = Column(Float, nullable=False)
     volume = Column(Integer, nullable=False)
     
+    # Time of the last insert or update, so rewritten bars can be found again
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
     # Relationship to Symbol
     symbol = relationship("Symbol", back_populates="intervals")
     
     # Create composite index for efficient querying
     __table_args__ = (
+        UniqueConstraint('symbol_id', 'start_time', name='uq_symbol_start_time'),
         Index('idx_symbol_time', 'symbol_id', 'start_time'),
         Index('idx_time_range', 'start_time', 'end_time'),
+        Index('idx_symbol_updated', 'symbol_id', 'updated_at'),
+    )
+
+class IntervalRollup(Base):
+    __tablename__ = 'interval_rollups'
+    
+    id = Column(Integer, primary_key=True)
+    symbol_id = Column(Integer, ForeignKey('symbols.id'), nullable=False)
+    ticker_time = Column(Integer, nullable=False)  # Bar length in minutes, one of ROLLUP_TIMEFRAMES
+    start_time = Column(DateTime, nullable=False)
+    end_time = Column(DateTime, nullable=False)
+    
+    # Aggregated price data: first open, max high, min low, last close, summed volume
+    open = Column(Float, nullable=False)
+    high = Column(Float, nullable=False)
+    low = Column(Float, nullable=False)
+    close = Column(Float, nullable=False)
+    volume = Column(Integer, nullable=False)
+    bar_count = Column(Integer, nullable=False)  # Number of 1-minute bars aggregated
+    
+    __table_args__ = (
+        UniqueConstraint('symbol_id', 'ticker_time', 'start_time', name='uq_rollup_symbol_time'),
+    )
+
+# Timeframes in minutes kept up to date in interval_rollups, each divides an hour
+ROLLUP_TIMEFRAMES = (5, 15, 30, 60)
+
+def _session_bucket(start_time, minutes):
+    """Return the start of the bucket of a bar, counting buckets of minutes from the day's session open"""
+    session_open = datetime.combine(start_time.date(), SESSION_OPEN)
+    return session_open + (start_time - session_open) // timedelta(minutes=minutes) * timedelta(minutes=minutes)
+
+class Breakout(Base):
+    __tablename__ = 'breakouts'
+    
+    id = Column(Integer, primary_key=True)
+    symbol_id = Column(Integer, ForeignKey('symbols.id'), nullable=False)
+    interval_id = Column(Integer, ForeignKey('time_intervals.id'), nullable=False)
+    start_time = Column(DateTime, nullable=False)
+    
+    # Scan parameters that produced this breakout
+    lookback_period = Column(Integer, nullable=False)
+    ticker_time = Column(Integer, nullable=False)
+    volume_ratio_threshold = Column(Float, nullable=False)
+    
+    # Breakout data
+    volume = Column(Integer, nullable=False)
+    volume_sma = Column(Float, nullable=False)
+    volume_ratio = Column(Float, nullable=False)
+    open = Column(Float, nullable=False)
+    high = Column(Float, nullable=False)
+    low = Column(Float, nullable=False)
+    close = Column(Float, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    symbol = relationship("Symbol")
+    
+    __table_args__ = (
+        UniqueConstraint('interval_id', 'lookback_period', 'ticker_time', 'volume_ratio_threshold',
+                         name='uq_breakout_params'),
+        Index('idx_breakout_time', 'start_time'),
+    )
+
+class ScanWatermark(Base):
+    __tablename__ = 'scan_watermarks'
+    
+    id = Column(Integer, primary_key=True)
+    symbol_id = Column(Integer, ForeignKey('symbols.id'), nullable=False)
+    lookback_period = Column(Integer, nullable=False)
+    ticker_time = Column(Integer, nullable=False)
+    volume_ratio_threshold = Column(Float, nullable=False)
+    
+    # Latest bar write and latest bar the scanner has processed, and how many bars it has seen so far.
+    # Upserts stamp every bar they insert or rewrite, so bars stored behind last_start_time and
+    # revised bars are both found by their updated_at.
+    last_updated_at = Column(DateTime, nullable=False)
+    last_start_time = Column(DateTime, nullable=False)
+    bars_scanned = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        UniqueConstraint('symbol_id', 'lookback_period', 'ticker_time', 'volume_ratio_threshold',
+                         name='uq_watermark_params'),
+    )
+
+class ScanJob(Base):
+    __tablename__ = 'scan_jobs'
+    
+    id = Column(Integer, primary_key=True)
+    job_type = Column(String(20), nullable=False)
+    symbol_id = Column(Integer, ForeignKey('symbols.id'), nullable=False)
+    trading_day = Column(Date)  # None scans the symbol incrementally from its watermark
+    
+    # Scan parameters
+    lookback_period = Column(Integer, nullable=False)
+    ticker_time = Column(Integer, nullable=False)
+    volume_ratio_threshold = Column(Float, nullable=False)
+    
+    # Lease state: pending -> running -> done/failed, running jobs with an expired lease are reclaimed
+    status = Column(String(10), nullable=False, default='pending')
+    lease_owner = Column(String(100))
+    lease_expires_at = Column(DateTime)
+    heartbeat_at = Column(DateTime)
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        Index('idx_scan_job_status', 'status', 'lease_expires_at'),
+    )
+
+class AnalysisResult(Base):
+    __tablename__ = 'analysis_results'
+    
+    id = Column(Integer, primary_key=True)
+    symbol_id = Column(Integer, ForeignKey('symbols.id'), nullable=False)
+    start_date = Column(DateTime, nullable=False)
+    end_date = Column(DateTime, nullable=False)
+    
+    # Strategy that was run, the parameters it ran with and the metrics it achieved
+    strategy_name = Column(String(50), nullable=False)
+    parameters = Column(JSON)
+    performance_metrics = Column(JSON)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    symbol = relationship("Symbol")
+    
+    __table_args__ = (
+        Index('idx_analysis_strategy', 'strategy_name', 'symbol_id'),
+    )
+
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+def _dialect_insert(engine):
+    """Return the dialect-specific insert() that supports ON CONFLICT clauses"""
+    dialect = engine.dialect.name
+    if dialect == 'postgresql':
+        return postgresql.insert
+    if dialect == 'sqlite':
+        return sqlite.insert
+    raise ValueError(f"Upserts are not supported for {dialect}")
+
+# Column arrays of a bar chunk, in select order
+BAR_FIELDS = ('id', 'symbol_id', 'start_time', 'open', 'high', 'low', 'close', 'volume')
+BAR_DTYPES = (np.int64, np.int64, 'datetime64[ns]', np.float64, np.float64, np.float64, np.float64, np.int64)
+
+def bar_arrays(rows, fields=BAR_FIELDS):
+    """Convert result rows of bar columns into a dict of NumPy arrays, one per field"""
+    columns = list(zip(*rows)) if rows else [[]] * len(fields)
+    dtypes = dict(zip(BAR_FIELDS, BAR_DTYPES))
+    return {field: np.asarray(column, dtype=dtypes[field]) for field, column in zip(fields, columns)}
+
+def _bar_frame(arrays):
+    """Convert bar arrays into a yfinance-style OHLCV DataFrame indexed by start time"""
+    return pd.DataFrame({
+        'symbol_id': arrays['symbol_id'],
+        'Open': arrays['open'],
+        'High': arrays['high'],
+        'Low': arrays['low'],
+        'Close': arrays['close'],
+        'Volume': arrays['volume']
+    }, index=pd.DatetimeIndex(arrays['start_time'], name='start_time'))
+
+def interval_columns(data):
+    """
+    Convert a yfinance-style OHLCV DataFrame into time_intervals column lists, dropping unusable rows
+    
+    Bar times are stored as naive exchange-local wall-clock times, so a tz-aware index,
+    in any time zone, is converted to the exchange's time zone first.
+    """
+    data = data.dropna(subset=PRICE_COLUMNS)
+    data = data[~data.index.duplicated(keep='last')]
+    index = exchange_wall_clock(data.index)
+    
+    return {
+        'start_time': list(index.to_pydatetime()),
+        'end_time': list((index + pd.Timedelta(minutes=1)).to_pydatetime()),
+        'open': data['Open'].astype(float).tolist(),
+        'high': data['High'].astype(float).tolist(),
+        'low': data['Low'].astype(float).tolist(),
+        'close': data['Close'].astype(float).tolist(),
+        'volume': data['Volume'].astype('int64').tolist()
+    }
+
+def _column_records(symbol_id, columns):
+    """Zip interval_columns output into time_intervals row dicts"""
+    names = list(columns)
+    return [
+        dict(zip(names, values), symbol_id=symbol_id)
+        for values in zip(*(columns[name] for name in names))
+    ]
+
+def _interval_records(symbol_id, data):
+    """Convert a yfinance-style OHLCV DataFrame into time_intervals row dicts"""
+    return _column_records(symbol_id, interval_columns(data))
+
+# Process-wide engines and session factories, keyed by database URL
+_engines = {}
+_engines_lock = threading.Lock()
+
+def _is_memory_url(url):
+    """In-memory SQLite databases are private to their engine, so they are never shared"""
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+def _create_engine(url):
+    """Create an engine with the pool settings from db_config"""
+    if url.get_backend_name() == 'sqlite':
+        return create_engine(url)
+    
+    connect_args = {}
+    if url.get_backend_name() == 'postgresql' and DB_STATEMENT_TIMEOUT_MS > 0:
+        connect_args['options'] = f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"
+    return create_engine(
+        url,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_pre_ping=DB_POOL_PRE_PING,
+        connect_args=connect_args
     )
 
+def get_engine(db_url=DATABASE_URL):
+    """
+    Return the process-wide engine for a database URL, creating it on first use
+    
+    Every Database for the same URL shares this engine and its connection pool.
+    In-memory SQLite URLs get a new engine each time.
+    
+    Parameters:
+    - db_url: Database URL string or URL object
+    """
+    url = make_url(db_url)
+    if _is_memory_url(url):
+        return _create_engine(url)
+    
+    key = url.render_as_string(hide_password=False)
+    with _engines_lock:
+        engine = _engines.get(key)
+        if engine is None:
+            engine = _engines[key] = _create_engine(url)
+        return engine
+
+def _dispose_inherited_engines():
+    """Drop pooled connections inherited from the parent process, without closing the parent's sockets"""
+    for engine in list(_engines.values()):
+        engine.dispose(close=False)
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_dispose_inherited_engines)
+
+def _add_missing_columns(engine):
+    """Add nullable model columns that existing tables were created without"""
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            present = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in present:
+                    continue
+                if not column.nullable:
+                    print(f"Cannot add NOT NULL column {table.name}.{column.name} automatically, recreate the table")
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+                print(f"Added column {table.name}.{column.name}")
+
+def init_schema(db_url=DATABASE_URL):
+    """
+    Create any missing tables and indexes, and add new nullable columns to existing tables
+    
+    Run once at deploy or before the first ingest, not on every connection.
+    
+    Parameters:
+    - db_url: Database URL, or an Engine to create the schema on
+    """
+    engine = db_url if hasattr(db_url, 'dialect') else get_engine(db_url)
+    Base.metadata.create_all(engine)
+    _add_missing_columns(engine)
+    return engine
+
+def dispose_engines():
+    """Close every pooled connection and forget the registered engines"""
+    with _engines_lock:
+        for engine in _engines.values():
+            engine.dispose()
+        _engines.clear()
+
 class Database:
-    def __init__(self, db_url=DATABASE_URL):
-        self.engine = create_engine(db_url)
-        Base.metadata.create_all(self.engine)
-        Session = sessionmaker(bind=self.engine)
-        self.session = Session()
+    def __init__(self, db_url=DATABASE_URL, create_schema=False):
+        """
+        Open a session on the shared engine for a database URL
+        
+        Parameters:
+        - db_url: Database URL
+        - create_schema: Create missing tables first; otherwise run init_schema() once beforehand
+        """
+        self.engine = get_engine(db_url)
+        if create_schema:
+            init_schema(self.engine)
+        self.Session = sessionmaker(bind=self.engine)
+        self.session = self.Session()
+        self.symbol_ids = {}  # symbol -> id, filled as symbols are looked up or saved
+    
+    @contextmanager
+    def session_scope(self):
+        """
+        Short-lived session for one unit of work
+        
+        Commits when the block succeeds, rolls back when it raises, and always
+        returns the connection to the pool.
+        """
+        session = self.Session()
+        try:
+            yield session
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
     
     def save_symbol(self, symbol, company_name=None):
         """Save or update a symbol"""
@@ -65,8 +393,96 @@ class Database:
             self.session.add(new_symbol)
         self.session.commit()
     
+    def get_symbol_ids(self, symbols):
+        """
+        Map symbols to their ids, querying only symbols not already cached
+        
+        Returns:
+        - dict of symbol -> id for the symbols that exist
+        """
+        missing = [symbol for symbol in symbols if symbol not in self.symbol_ids]
+        if missing:
+            self.symbol_ids.update(
+                self.session.query(Symbol.symbol, Symbol.id).filter(Symbol.symbol.in_(missing)).all()
+            )
+        return {symbol: self.symbol_ids[symbol] for symbol in symbols if symbol in self.symbol_ids}
+    
+    def upsert_symbols(self, company_names, commit=True):
+        """
+        Insert or update many symbols with one statement
+        
+        Parameters:
+        - company_names: dict of symbol -> freshly fetched company name, or None to only
+          make sure the symbol exists without touching its stored metadata
+        - commit: Commit right away; otherwise the caller commits
+        
+        Returns:
+        - dict of symbol -> id
+        """
+        if not company_names:
+            return {}
+        
+        now = datetime.utcnow()
+        rows = [
+            {
+                'symbol': symbol,
+                'company_name': company_name,
+                'metadata_fetched_at': None if company_name is None else now,
+                'is_active': True,
+                'created_at': now,
+                'updated_at': now
+            }
+            for symbol, company_name in company_names.items()
+        ]
+        insert = _dialect_insert(self.engine)
+        stmt = insert(Symbol.__table__).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['symbol'],
+            set_={
+                'company_name': func.coalesce(stmt.excluded.company_name, Symbol.__table__.c.company_name),
+                'metadata_fetched_at': func.coalesce(stmt.excluded.metadata_fetched_at,
+                                                     Symbol.__table__.c.metadata_fetched_at),
+                'updated_at': stmt.excluded.updated_at
+            }
+        )
+        try:
+            self.session.execute(stmt)
+            ids = self.get_symbol_ids(list(company_names))
+            if commit:
+                self.session.commit()
+        except Exception:
+            self.session.rollback()
+            self.symbol_ids.clear()
+            raise
+        return ids
+    
+    def get_stale_symbols(self, symbols, ttl):
+        """
+        Find symbols whose company metadata is missing or older than ttl
+        
+        Parameters:
+        - symbols: Symbols to check
+        - ttl: timedelta after which fetched metadata is refreshed
+        
+        Returns:
+        - set of symbols that need their metadata fetched
+        """
+        fetched = dict(
+            self.session.query(Symbol.symbol, Symbol.metadata_fetched_at).filter(Symbol.symbol.in_(list(symbols))).all()
+        )
+        cutoff = datetime.utcnow() - ttl
+        return {symbol for symbol in symbols if fetched.get(symbol) is None or fetched[symbol] < cutoff}
+    
+    def _symbol_id(self, symbol):
+        """Return a symbol's id, creating the symbol if needed"""
+        symbol_id = self.get_symbol_ids([symbol]).get(symbol)
+        if symbol_id is None:
+            symbol_id = self.upsert_symbols({symbol: None})[symbol]
+        return symbol_id
+    
     def save_time_interval(self, symbol, data):
         """Save time interval data to database"""
+        data = data.set_axis(exchange_wall_clock(data.index))
         symbol_obj = self.session.query(Symbol).filter(Symbol.symbol == symbol).first()
         if not symbol_obj:
             symbol_obj = Symbol(symbol=symbol)
@@ -102,6 +518,276 @@ class Database:
                 self.session.add(time_interval)
         
         self.session.commit()
+        
+        if not data.empty:
+            self.update_rollups(symbol_obj.id, data.index.min(), data.index.max())
+    
+    def upsert_time_intervals(self, symbol, data, chunk_size=1000, copy_threshold=50000):
+        """
+        Bulk insert-or-update time interval data using the (symbol_id, start_time) unique constraint
+        
+        Parameters:
+        - symbol: Stock symbol (e.g., 'AAPL')
+        - data: DataFrame indexed by bar start time with Open/High/Low/Close/Volume columns
+        - chunk_size: Number of rows written per INSERT ... ON CONFLICT statement
+        - copy_threshold: On PostgreSQL, frames with at least this many rows are loaded
+          with COPY into a staging table instead of chunked INSERTs
+        
+        Returns:
+        - dict with 'inserted' and 'updated' row counts
+        """
+        symbol_id = self._symbol_id(symbol)
+        
+        records = _interval_records(symbol_id, data)
+        if not records:
+            return {'inserted': 0, 'updated': 0}
+        
+        if self.engine.dialect.name == 'postgresql' and len(records) >= copy_threshold:
+            counts = self._copy_upsert_time_intervals(records)
+        else:
+            counts = self._chunked_upsert_time_intervals(symbol_id, records, chunk_size)
+        
+        start_times = [row['start_time'] for row in records]
+        self.update_rollups(symbol_id, min(start_times), max(start_times))
+        return counts
+    
+    def upsert_time_interval_batch(self, batch, chunk_size=1000):
+        """
+        Upsert several symbols' bars in a single transaction
+        
+        Used by the ingest pipeline's writer stage so one commit covers many symbols.
+        Either every symbol in the batch is stored or, on error, none is. Rollups are
+        updated after the commit, so a rollup failure leaves the bars stored and is
+        reported per symbol instead of raised.
+        
+        Parameters:
+        - batch: List of (symbol, company_name, columns) with columns from interval_columns();
+          company_name is None when the symbol's metadata was not fetched, see upsert_symbols
+        - chunk_size: Number of rows written per INSERT ... ON CONFLICT statement
+        
+        Returns:
+        - dict of symbol -> {'inserted', 'updated'} row counts, plus 'rollup_error' for
+          symbols whose rollups could not be updated
+        """
+        counts = {}
+        spans = {}
+        try:
+            symbol_ids = self.upsert_symbols({symbol: company_name for symbol, company_name, _ in batch}, commit=False)
+            
+            for symbol, _, columns in batch:
+                symbol_id = symbol_ids[symbol]
+                records = _column_records(symbol_id, columns)
+                counts[symbol] = self._chunked_upsert_time_intervals(symbol_id, records, chunk_size, commit=False)
+                if records:
+                    spans[symbol] = (symbol_id, min(columns['start_time']), max(columns['start_time']))
+            
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            # Ids of symbols inserted by the rolled back transaction are no longer valid
+            self.symbol_ids.clear()
+            raise
+        
+        for symbol, (symbol_id, start_time, end_time) in spans.items():
+            try:
+                self.update_rollups(symbol_id, start_time, end_time)
+            except Exception as e:
+                self.session.rollback()
+                counts[symbol]['rollup_error'] = str(e)
+        return counts
+    
+    def _chunked_upsert_time_intervals(self, symbol_id, records, chunk_size, commit=True):
+        """Upsert rows with one INSERT ... ON CONFLICT statement per chunk, leaving the commit to the caller if commit is False"""
+        insert = _dialect_insert(self.engine)
+        table = TimeInterval.__table__
+        inserted = updated = 0
+        written = datetime.utcnow()
+        try:
+            for offset in range(0, len(records), chunk_size):
+                chunk = [dict(row, updated_at=written) for row in records[offset:offset + chunk_size]]
+                
+                # One lookup per chunk to split the upsert into inserted/updated counts
+                existing = self.session.query(TimeInterval.start_time).filter(
+                    TimeInterval.symbol_id == symbol_id,
+                    TimeInterval.start_time.in_([row['start_time'] for row in chunk])
+                ).count()
+                
+                stmt = insert(table).values(chunk)
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=['symbol_id', 'start_time'],
+                    set_={
+                        'open': stmt.excluded.open,
+                        'high': stmt.excluded.high,
+                        'low': stmt.excluded.low,
+                        'close': stmt.excluded.close,
+                        'volume': stmt.excluded.volume,
+                        'updated_at': stmt.excluded.updated_at
+                    }
+                )
+                self.session.execute(stmt)
+                
+                inserted += len(chunk) - existing
+                updated += existing
+            
+            if commit:
+                self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+        
+        return {'inserted': inserted, 'updated': updated}
+    
+    def _copy_upsert_time_intervals(self, records):
+        """PostgreSQL fast path: COPY rows into a temp staging table, then upsert in one statement"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in records:
+            writer.writerow([
+                row['start_time'].isoformat(),
+                row['end_time'].isoformat(),
+                row['open'], row['high'], row['low'], row['close'], row['volume']
+            ])
+        buffer.seek(0)
+        
+        # Staging times are timestamptz so they are converted exactly like the ORM path converts them
+        connection = self.engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+            cursor.execute("""
+                CREATE TEMP TABLE time_intervals_staging (
+                    start_time timestamptz, end_time timestamptz,
+                    open float8, high float8, low float8, close float8, volume bigint
+                ) ON COMMIT DROP
+            """)
+            cursor.copy_expert('COPY time_intervals_staging FROM STDIN WITH (FORMAT csv)', buffer)
+            cursor.execute("""
+                INSERT INTO time_intervals (symbol_id, start_time, end_time, open, high, low, close, volume, updated_at)
+                SELECT %s, start_time, end_time, open, high, low, close, volume, %s
+                FROM time_intervals_staging
+                ON CONFLICT (symbol_id, start_time) DO UPDATE SET
+                    open = EXCLUDED.open,
+                    high = EXCLUDED.high,
+                    low = EXCLUDED.low,
+                    close = EXCLUDED.close,
+                    volume = EXCLUDED.volume,
+                    updated_at = EXCLUDED.updated_at
+                RETURNING (xmax = 0)
+            """, (records[0]['symbol_id'], datetime.utcnow()))
+            inserted = sum(1 for (was_inserted,) in cursor.fetchall() if was_inserted)
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            connection.close()
+        
+        return {'inserted': inserted, 'updated': len(records) - inserted}
+    
+    def update_rollups(self, symbol_id, start_time=None, end_time=None):
+        """
+        Recompute the ROLLUP_TIMEFRAMES bars covering a range of 1-minute bars
+        
+        Buckets are counted from each day's session open, as in resample.resample_bars,
+        so the 60-minute bars start at 09:30, 10:30, ... and none is cut off by the open.
+        
+        Parameters:
+        - symbol_id: ID of the symbol whose bars changed
+        - start_time, end_time: First and last changed 1-minute bar, the whole history if not given
+        
+        Returns:
+        - Number of rollup rows written
+        """
+        span = self.session.query(
+            func.min(TimeInterval.start_time),
+            func.max(TimeInterval.start_time)
+        ).filter(TimeInterval.symbol_id == symbol_id)
+        if start_time is not None:
+            span = span.filter(TimeInterval.start_time >= start_time)
+        if end_time is not None:
+            span = span.filter(TimeInterval.start_time <= end_time)
+        first, last = span.one()
+        if first is None:
+            return 0
+        
+        # Widen the range to whole session-aligned hours so every affected bucket is rebuilt from all of its bars
+        bucket_start = _session_bucket(first, 60)
+        bucket_end = _session_bucket(last, 60) + timedelta(hours=1)
+        rows = self.session.query(
+            TimeInterval.start_time,
+            TimeInterval.open,
+            TimeInterval.high,
+            TimeInterval.low,
+            TimeInterval.close,
+            TimeInterval.volume
+        ).filter(
+            TimeInterval.symbol_id == symbol_id,
+            TimeInterval.start_time >= bucket_start,
+            TimeInterval.start_time < bucket_end
+        ).order_by(TimeInterval.start_time).all()
+        bars = pd.DataFrame(rows, columns=['start_time', 'open', 'high', 'low', 'close', 'volume'])
+        session_open = bars['start_time'].dt.normalize() + pd.Timedelta(hours=SESSION_OPEN.hour,
+                                                                         minutes=SESSION_OPEN.minute)
+        since_open = bars['start_time'] - session_open
+        
+        rollups = []
+        for ticker_time in ROLLUP_TIMEFRAMES:
+            buckets = bars.groupby(session_open + since_open.dt.floor(f'{ticker_time}min'))
+            aggregated = buckets.agg(
+                open=('open', 'first'),
+                high=('high', 'max'),
+                low=('low', 'min'),
+                close=('close', 'last'),
+                volume=('volume', 'sum'),
+                bar_count=('volume', 'size')
+            )
+            for bucket, row in zip(aggregated.index.to_pydatetime(), aggregated.itertuples(index=False)):
+                rollups.append({
+                    'symbol_id': symbol_id,
+                    'ticker_time': ticker_time,
+                    'start_time': bucket,
+                    'end_time': bucket + timedelta(minutes=ticker_time),
+                    'open': float(row.open),
+                    'high': float(row.high),
+                    'low': float(row.low),
+                    'close': float(row.close),
+                    'volume': int(row.volume),
+                    'bar_count': int(row.bar_count)
+                })
+        
+        insert = _dialect_insert(self.engine)
+        try:
+            for offset in range(0, len(rollups), 1000):
+                stmt = insert(IntervalRollup.__table__).values(rollups[offset:offset + 1000])
+                self.session.execute(stmt.on_conflict_do_update(
+                    index_elements=['symbol_id', 'ticker_time', 'start_time'],
+                    set_={
+                        'open': stmt.excluded.open,
+                        'high': stmt.excluded.high,
+                        'low': stmt.excluded.low,
+                        'close': stmt.excluded.close,
+                        'volume': stmt.excluded.volume,
+                        'bar_count': stmt.excluded.bar_count
+                    }
+                ))
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+        
+        return len(rollups)
+    
+    def get_rollups(self, symbol, ticker_time, start_date=None, end_date=None):
+        """Retrieve aggregated bars of one timeframe from the interval_rollups table"""
+        query = self.session.query(IntervalRollup)\
+            .join(Symbol, IntervalRollup.symbol_id == Symbol.id)\
+            .filter(Symbol.symbol == symbol, IntervalRollup.ticker_time == ticker_time)
+        
+        if start_date:
+            query = query.filter(IntervalRollup.start_time >= start_date)
+        if end_date:
+            query = query.filter(IntervalRollup.end_time <= end_date)
+        
+        return query.order_by(IntervalRollup.start_time).all()
     
     def get_time_intervals(self, symbol, start_date=None, end_date=None):
         """Retrieve time intervals from database"""
@@ -116,6 +802,106 @@ class Database:
         
         return query.order_by(TimeInterval.start_time).all()
     
+    def stream_time_intervals(self, symbol=None, start_date=None, end_date=None, chunk_size=50000, as_frame=False,
+                              symbols=None):
+        """
+        Stream 1-minute bars in fixed-size chunks without building ORM objects
+        
+        Only the bar columns are selected, and on PostgreSQL the rows come from a
+        server-side cursor, so memory stays bounded by chunk_size however much
+        history is read. Bars are ordered by symbol id, then start time.
+        
+        Parameters:
+        - symbol: Stock symbol to read, or None for every symbol
+        - start_date, end_date: Optional time range, as in get_time_intervals
+        - chunk_size: Number of bars per chunk
+        - as_frame: Yield DataFrames instead of dicts of NumPy arrays
+        - symbols: Stock symbols to read, filtered in the query (default: all, or symbol)
+        
+        Yields:
+        - Dict of arrays keyed by BAR_FIELDS, or a DataFrame with symbol_id, Open,
+          High, Low, Close and Volume columns indexed by start time
+        """
+        query = select(
+            TimeInterval.id,
+            TimeInterval.symbol_id,
+            TimeInterval.start_time,
+            TimeInterval.open,
+            TimeInterval.high,
+            TimeInterval.low,
+            TimeInterval.close,
+            TimeInterval.volume
+        )
+        if symbol is not None:
+            query = query.join(Symbol).where(Symbol.symbol == symbol)
+        elif symbols is not None:
+            query = query.join(Symbol).where(Symbol.symbol.in_(list(symbols)))
+        if start_date:
+            query = query.where(TimeInterval.start_time >= start_date)
+        if end_date:
+            query = query.where(TimeInterval.end_time <= end_date)
+        query = query.order_by(TimeInterval.symbol_id, TimeInterval.start_time)
+        
+        with self.engine.connect() as connection:
+            result = connection.execution_options(stream_results=True, yield_per=chunk_size).execute(query)
+            for rows in result.partitions():
+                arrays = bar_arrays(rows)
+                yield _bar_frame(arrays) if as_frame else arrays
+    
+    def get_latest_start_times(self, symbols=None):
+        """
+        Get the start time of every symbol's latest stored bar in one query
+        
+        Parameters:
+        - symbols: Symbols to look up, or None for all
+        
+        Returns:
+        - dict of symbol -> latest start_time; symbols without bars are left out
+        """
+        query = self.session.query(Symbol.symbol, func.max(TimeInterval.start_time))\
+            .join(TimeInterval, TimeInterval.symbol_id == Symbol.id)\
+            .group_by(Symbol.symbol)
+        if symbols is not None:
+            query = query.filter(Symbol.symbol.in_(list(symbols)))
+        return dict(query.all())
+    
+    def get_bar_counts(self, symbols=None, bucket_minutes=60, start_date=None):
+        """
+        Count every symbol's stored bars per session-aligned bucket in one query
+        
+        Buckets are counted from the session open, as in update_rollups, so with the
+        default 60 minutes they start at 09:30, 10:30, ... Buckets without bars are left out.
+        
+        Parameters:
+        - symbols: Symbols to count, or None for all
+        - bucket_minutes: Bucket length, a divisor of a day
+        - start_date: Only count bars starting at or after this time
+        
+        Returns:
+        - dict of symbol -> {bucket start: (number of bars, start time of the first one)}
+        """
+        if self.engine.dialect.name == 'sqlite':
+            epoch = cast(func.strftime('%s', TimeInterval.start_time), BigInteger)
+        else:
+            epoch = cast(func.extract('epoch', TimeInterval.start_time), BigInteger)
+        offset = SESSION_OPEN.hour * 3600 + SESSION_OPEN.minute * 60
+        size = bucket_minutes * 60
+        bucket = (epoch - offset) // size
+        
+        query = self.session.query(Symbol.symbol, bucket, func.count(TimeInterval.id), func.min(TimeInterval.start_time))\
+            .join(TimeInterval, TimeInterval.symbol_id == Symbol.id)\
+            .group_by(Symbol.symbol, bucket)
+        if symbols is not None:
+            query = query.filter(Symbol.symbol.in_(list(symbols)))
+        if start_date:
+            query = query.filter(TimeInterval.start_time >= start_date)
+        
+        counts = {}
+        for symbol, number, count, first in query.all():
+            bucket_start = datetime(1970, 1, 1) + timedelta(seconds=int(number) * size + offset)
+            counts.setdefault(symbol, {})[bucket_start] = (count, first)
+        return counts
+    
     def get_latest_intervals(self, symbol, limit=100):
         """Get the most recent time intervals for a symbol"""
         return self.session.query(TimeInterval)\
@@ -125,14 +911,121 @@ class Database:
             .limit(limit)\
             .all()
     
-    def save_analysis_result(self, symbol, start_date, end_date, strategy_name, parameters, performance_metrics):
-        """Save analysis results to database"""
-        symbol_obj = self.session.query(Symbol).filter(Symbol.symbol == symbol).first()
-        if not symbol_obj:
+    def get_scan_watermark(self, symbol_id, lookback_period, ticker_time, volume_ratio_threshold):
+        """Get the breakout scan watermark of a symbol for one set of scan parameters"""
+        return self.session.query(ScanWatermark).filter(
+            ScanWatermark.symbol_id == symbol_id,
+            ScanWatermark.lookback_period == lookback_period,
+            ScanWatermark.ticker_time == ticker_time,
+            ScanWatermark.volume_ratio_threshold == volume_ratio_threshold
+        ).first()
+    
+    def insert_breakouts(self, symbol_id, lookback_period, ticker_time, volume_ratio_threshold, breakouts, commit=True):
+        """
+        Store breakouts, skipping any already stored for the same interval and parameters
+        
+        Parameters:
+        - symbol_id: ID of the scanned symbol
+        - lookback_period, ticker_time, volume_ratio_threshold: Scan parameters
+        - breakouts: List of dicts with Breakout column values (interval_id, start_time, volume, ...)
+        - commit: Commit the session afterwards
+        """
+        if breakouts:
+            params = {
+                'symbol_id': symbol_id,
+                'lookback_period': lookback_period,
+                'ticker_time': ticker_time,
+                'volume_ratio_threshold': volume_ratio_threshold
+            }
+            rows = [{**params, **breakout, 'created_at': datetime.utcnow()} for breakout in breakouts]
+            insert = _dialect_insert(self.engine)
+            self.session.execute(insert(Breakout.__table__).values(rows).on_conflict_do_nothing(
+                index_elements=['interval_id', 'lookback_period', 'ticker_time', 'volume_ratio_threshold']
+            ))
+        if commit:
+            self.session.commit()
+    
+    def save_breakouts(self, symbol_id, lookback_period, ticker_time, volume_ratio_threshold,
+                       breakouts, last_updated_at, last_start_time, bars_scanned, replace_from=None):
+        """
+        Store new breakouts and advance the scan watermark in one transaction
+        
+        Parameters:
+        - symbol_id: ID of the scanned symbol
+        - lookback_period, ticker_time, volume_ratio_threshold: Scan parameters
+        - breakouts: List of dicts with Breakout column values (interval_id, start_time, volume, ...)
+        - last_updated_at: Latest bar write processed by this scan
+        - last_start_time: Start time of the latest bar processed by this scan
+        - bars_scanned: Total number of bars processed for this symbol so far
+        - replace_from: Delete the stored breakouts starting at or after this time first,
+          when the scan rescanned them
+        """
+        try:
+            if replace_from is not None:
+                self.session.query(Breakout).filter(
+                    Breakout.symbol_id == symbol_id,
+                    Breakout.lookback_period == lookback_period,
+                    Breakout.ticker_time == ticker_time,
+                    Breakout.volume_ratio_threshold == volume_ratio_threshold,
+                    Breakout.start_time >= replace_from
+                ).delete(synchronize_session=False)
+            self.insert_breakouts(symbol_id, lookback_period, ticker_time, volume_ratio_threshold,
+                                  breakouts, commit=False)
+            
+            insert = _dialect_insert(self.engine)
+            stmt = insert(ScanWatermark.__table__).values(
+                symbol_id=symbol_id,
+                lookback_period=lookback_period,
+                ticker_time=ticker_time,
+                volume_ratio_threshold=volume_ratio_threshold,
+                last_updated_at=last_updated_at,
+                last_start_time=last_start_time,
+                bars_scanned=bars_scanned,
+                updated_at=datetime.utcnow()
+            )
+            # Never move a watermark backwards, e.g. when a worker with a reclaimed lease finishes late
+            self.session.execute(stmt.on_conflict_do_update(
+                index_elements=['symbol_id', 'lookback_period', 'ticker_time', 'volume_ratio_threshold'],
+                set_={
+                    'last_updated_at': stmt.excluded.last_updated_at,
+                    'last_start_time': stmt.excluded.last_start_time,
+                    'bars_scanned': stmt.excluded.bars_scanned,
+                    'updated_at': stmt.excluded.updated_at
+                },
+                where=ScanWatermark.__table__.c.last_updated_at <= stmt.excluded.last_updated_at
+            ))
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+    
+    def get_breakouts(self, lookback_period, ticker_time, volume_ratio_threshold, symbol=None):
+        """Retrieve stored breakouts for one set of scan parameters"""
+        query = self.session.query(Breakout, Symbol.symbol)\
+            .join(Symbol, Breakout.symbol_id == Symbol.id)\
+            .filter(
+                Breakout.lookback_period == lookback_period,
+                Breakout.ticker_time == ticker_time,
+                Breakout.volume_ratio_threshold == volume_ratio_threshold
+            )
+        if symbol:
+            query = query.filter(Symbol.symbol == symbol)
+        return query.order_by(Breakout.symbol_id, Breakout.start_time).all()
+    
+    def save_analysis_result(self, symbol, start_date, end_date, strategy_name, parameters, performance_metrics,
+                             commit=True):
+        """
+        Save analysis results to database
+        
+        Parameters:
+        - commit: Commit right away; otherwise the caller commits, e.g. once for many symbols
+        """
+        symbol_id = self.get_symbol_ids([symbol]).get(symbol)
+        if symbol_id is None:
             raise ValueError(f"Symbol {symbol} not found")
         
         result = AnalysisResult(
-            symbol_id=symbol_obj.id,
+            symbol_id=symbol_id,
             start_date=start_date,
             end_date=end_date,
             strategy_name=strategy_name,
@@ -140,7 +1033,8 @@ class Database:
             performance_metrics=performance_metrics
         )
         self.session.add(result)
-        self.session.commit()
+        if commit:
+            self.session.commit()
     
     def get_analysis_results(self, symbol=None, strategy_name=None):
         """Retrieve analysis results from database"""
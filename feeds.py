@@ -0,0 +1,378 @@
+"""
+Module for bar-close event feeds and the trigger that runs the strategy on them.
+
+In polling mode the bot sleeps a fixed interval between cycles, so signals fire up
+to a minute after the bar that caused them. In event mode a BarFeed calls a handler
+as each bar closes, and BarCloseTrigger evaluates that symbol right away. Two feeds
+are provided:
+
+    AlpacaBarFeed   live 1-minute bars from Alpaca's websocket data stream
+    ReplayFeed      bars stored in time_intervals, replayed in close order at any speed
+
+Both report the time on their own clock, real or simulated, so the latency from
+bar close to the end of evaluation is measured the same way live and offline.
+TimeframeFeed wraps either one to deliver longer bars, such as the strategy's TIMEFRAME.
+"""
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+import os
+import threading
+import time
+import numpy as np
+import pandas as pd
+from bar_cache import BarCache
+from bar_series import BarSeries
+from config import ALPACA_DATA_FEED, EVALUATION_WORKERS, SYMBOL_TIMEOUT_SECONDS
+from database import Database
+from market_calendar import MarketCalendar, NYSECalendar
+from metrics import LatencyHistogram
+from resample import resample_bars
+
+class BarEvent(NamedTuple):
+    """
+    One closed bar.
+
+    start_time is the naive exchange-local start time, as stored in time_intervals;
+    close_ts is the moment the bar closed, as UTC epoch seconds.
+    """
+    symbol: str
+    start_time: datetime
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: int
+    close_ts: float
+
+    def to_series(self) -> BarSeries:
+        """Return the bar as a one-bar BarSeries with id -1."""
+        return BarSeries([np.datetime64(self.start_time, 'ns')], [self.open], [self.high], [self.low],
+                         [self.close], [self.volume], id=[-1])
+
+class BarFeed(ABC):
+    """Source of bar-close events. Subclasses implement run() and stop()."""
+
+    # Length of the bars the feed delivers
+    bar_seconds = 60
+
+    def now(self) -> float:
+        """Current time on the feed's clock, as UTC epoch seconds."""
+        return time.time()
+
+    @abstractmethod
+    def run(self, symbols: List[str], handler: Callable[[BarEvent], None]) -> None:
+        """Call handler with every bar of symbols as it closes, until the feed ends or stop() is called."""
+
+    @abstractmethod
+    def stop(self) -> None:
+        """Make run() return."""
+
+class AlpacaBarFeed(BarFeed):
+    """
+    Live minute bars from Alpaca's market data websocket.
+
+    Alpaca publishes each minute bar just after it closes. Credentials default to
+    the ALPACA_API_KEY, ALPACA_API_SECRET and ALPACA_BASE_URL environment variables.
+    """
+
+    def __init__(
+        self,
+        key_id: Optional[str] = None,
+        secret_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        data_feed: str = ALPACA_DATA_FEED,
+        calendar: Optional[MarketCalendar] = None
+    ):
+        """
+        Initialize the feed.
+
+        Args:
+            key_id (str): Alpaca API key
+            secret_key (str): Alpaca API secret
+            base_url (str): Alpaca trading API URL
+            data_feed (str): 'iex' or 'sip'
+            calendar (MarketCalendar): Calendar whose time zone bar start times are given in
+        """
+        from alpaca_trade_api.stream import Stream
+        self.stream = Stream(
+            key_id or os.getenv('ALPACA_API_KEY'),
+            secret_key or os.getenv('ALPACA_API_SECRET'),
+            base_url or os.getenv('ALPACA_BASE_URL'),
+            data_feed=data_feed
+        )
+        self.timezone = (calendar or NYSECalendar()).timezone
+
+    def _event(self, bar) -> BarEvent:
+        start = pd.Timestamp(bar.timestamp, unit='ns', tz='UTC')
+        return BarEvent(
+            bar.symbol,
+            start.tz_convert(self.timezone).tz_localize(None).to_pydatetime(),
+            float(bar.open), float(bar.high), float(bar.low), float(bar.close), int(bar.volume),
+            start.timestamp() + self.bar_seconds
+        )
+
+    def run(self, symbols: List[str], handler: Callable[[BarEvent], None]) -> None:
+        async def on_bar(bar):
+            handler(self._event(bar))
+
+        self.stream.subscribe_bars(on_bar, *symbols)
+        self.stream.run()
+
+    def stop(self) -> None:
+        self.stream.stop()
+
+class ReplayFeed(BarFeed):
+    """
+    Replays stored 1-minute bars from time_intervals in bar-close order.
+
+    Example:
+        >>> feed = ReplayFeed(Database(), start_date=datetime(2024, 1, 2), speed=60)  # an hour per minute
+        >>> feed.run(['AAPL', 'MSFT'], print)
+    """
+
+    def __init__(
+        self,
+        db: Database,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        speed: Optional[float] = None,
+        calendar: Optional[MarketCalendar] = None
+    ):
+        """
+        Initialize the feed.
+
+        Args:
+            db (Database): Database to read bars from
+            start_date (datetime): Only replay bars starting at or after this time
+            end_date (datetime): Only replay bars ending at or before this time
+            speed (float): Replay this many times faster than real time, None for as fast as possible
+            calendar (MarketCalendar): Calendar whose time zone stored times are in
+        """
+        self.db = db
+        self.start_date = start_date
+        self.end_date = end_date
+        self.speed = speed
+        self.timezone = (calendar or NYSECalendar()).timezone
+        self._stopped = threading.Event()
+        self._clock_origin = (0.0, time.monotonic())
+
+    def _load(self, symbols: List[str]):
+        """Read every symbol's bars and order them by close time, then by symbol."""
+        series, symbol_index = [], []
+        for position, symbol in enumerate(symbols):
+            bars = BarSeries.concat(
+                BarSeries.from_arrays(chunk)
+                for chunk in self.db.stream_time_intervals(symbol, self.start_date, self.end_date)
+            )
+            series.append(bars)
+            symbol_index.append(np.full(len(bars), position))
+        bars = BarSeries.concat(series)
+        symbol_index = np.concatenate(symbol_index) if symbol_index else np.empty(0, dtype=int)
+        order = np.lexsort((symbol_index, bars.timestamp))
+        bars, symbol_index = bars.take(order), symbol_index[order]
+        close_ts = pd.DatetimeIndex(bars.start_time).tz_localize(
+            self.timezone, ambiguous=False, nonexistent='shift_forward'
+        ).asi8 / 1e9 + self.bar_seconds
+        return bars, symbol_index, close_ts
+
+    def now(self) -> float:
+        simulated, started = self._clock_origin
+        return simulated + (time.monotonic() - started) * (self.speed or 1.0)
+
+    def run(self, symbols: List[str], handler: Callable[[BarEvent], None]) -> None:
+        self._stopped.clear()
+        bars, symbol_index, close_ts = self._load(symbols)
+        if not len(bars):
+            return
+        start_times = bars.start_time.astype('datetime64[us]').tolist()
+        if self.speed:
+            self._clock_origin = (close_ts[0], time.monotonic())
+
+        for i in range(len(bars)):
+            if self._stopped.is_set():
+                return
+            if self.speed:
+                # Sleep until the simulated clock reaches the bar's close
+                delay = (close_ts[i] - self.now()) / self.speed
+                if delay > 0 and self._stopped.wait(delay):
+                    return
+            else:
+                self._clock_origin = (close_ts[i], time.monotonic())
+            handler(BarEvent(
+                symbols[symbol_index[i]], start_times[i],
+                float(bars.open[i]), float(bars.high[i]), float(bars.low[i]), float(bars.close[i]),
+                int(bars.volume[i]), float(close_ts[i])
+            ))
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+class TimeframeFeed(BarFeed):
+    """
+    Aggregates another feed's 1-minute bars into ticker_time bars aligned to the session open.
+
+    Bars are bucketed as in resample.resample_bars, so they match rollups, scans and
+    backtests, and the last bucket of a session ends at the close. A bucket is
+    delivered when its last minute arrives or, if that minute had no trades, with the
+    symbol's next bar; its close_ts is the end of the bucket either way.
+
+    Example:
+        >>> feed = TimeframeFeed(AlpacaBarFeed(), 60)
+        >>> feed.run(['AAPL'], print)  # one event per hour, just after it closes
+    """
+
+    def __init__(self, feed: BarFeed, ticker_time: int, calendar: Optional[MarketCalendar] = None):
+        """
+        Initialize the feed.
+
+        Args:
+            feed (BarFeed): Feed delivering 1-minute bars
+            ticker_time (int): Length of the delivered bars in minutes
+            calendar (MarketCalendar): Calendar giving the session open and close (default: NYSE)
+        """
+        self.feed = feed
+        self.ticker_time = ticker_time
+        self.bar_seconds = ticker_time * 60
+        self.calendar = calendar or NYSECalendar()
+        self.pending: Dict[str, List[BarEvent]] = {}
+        self._lock = threading.Lock()
+
+    def now(self) -> float:
+        return self.feed.now()
+
+    def _bucket(self, start_time: datetime) -> Tuple[datetime, datetime]:
+        """Return the start and end of the bucket a 1-minute bar belongs to."""
+        open_time = datetime.combine(start_time.date(), self.calendar.open_time)
+        size = timedelta(minutes=self.ticker_time)
+        start = open_time + (start_time - open_time) // size * size
+        return start, min(start + size, datetime.combine(start_time.date(), self.calendar.close_time))
+
+    def _aggregate(self, events: List[BarEvent]) -> BarEvent:
+        """Reduce one bucket's 1-minute bars to a single bar."""
+        bars = resample_bars(BarSeries.concat(event.to_series() for event in events), self.ticker_time,
+                             self.calendar.open_time)
+        last = events[-1]
+        _, end = self._bucket(last.start_time)
+        close_ts = last.close_ts + (end - last.start_time - timedelta(minutes=1)).total_seconds()
+        return BarEvent(
+            last.symbol, bars.start_time[0].astype('datetime64[us]').item(),
+            float(bars.open[0]), float(bars.high[0]), float(bars.low[0]), float(bars.close[0]),
+            int(bars.volume[0]), close_ts
+        )
+
+    def _on_minute(self, event: BarEvent) -> List[BarEvent]:
+        """Add a 1-minute bar to its symbol's bucket, returning the buckets it closes."""
+        closed = []
+        with self._lock:
+            events = self.pending.get(event.symbol, [])
+            bucket = self._bucket(event.start_time)
+            if events and self._bucket(events[0].start_time) != bucket:
+                closed.append(self._aggregate(events))
+                events = []
+            events.append(event)
+            if event.start_time + timedelta(minutes=1) >= bucket[1]:
+                closed.append(self._aggregate(events))
+                events = []
+            self.pending[event.symbol] = events
+        return closed
+
+    def run(self, symbols: List[str], handler: Callable[[BarEvent], None]) -> None:
+        def on_minute(event):
+            for bar in self._on_minute(event):
+                handler(bar)
+
+        self.feed.run(symbols, on_minute)
+
+    def stop(self) -> None:
+        self.feed.stop()
+
+class BarCloseTrigger:
+    """
+    Evaluates a symbol as soon as its bar closes, and measures the latency from the close.
+
+    Each bar is merged into the symbol's rolling history in a BarCache, then
+    evaluate(symbol, df, deadline) runs on a worker thread with the updated history.
+    A symbol whose previous evaluation is still running skips the bar instead of
+    queueing behind it.
+
+    Example:
+        >>> trigger = BarCloseTrigger(ReplayFeed(db), lambda symbol, df, deadline: None)
+        >>> trigger.run(['AAPL', 'MSFT'])
+        >>> trigger.latency_summary()
+    """
+
+    def __init__(
+        self,
+        feed: BarFeed,
+        evaluate: Callable,
+        cache: Optional[BarCache] = None,
+        executor: Optional[ThreadPoolExecutor] = None,
+        timeout: float = SYMBOL_TIMEOUT_SECONDS
+    ):
+        """
+        Initialize the trigger.
+
+        Args:
+            feed (BarFeed): Feed delivering bar-close events
+            evaluate (Callable): Called as evaluate(symbol, df, deadline) with the symbol's bars as a
+                yfinance-style DataFrame and a time.monotonic() deadline for acting on them
+            cache (BarCache): Rolling bar history the feed's bars are merged into
+            executor (ThreadPoolExecutor): Pool evaluations run on (default: a new one)
+            timeout (float): Seconds after a bar arrives before its evaluation's deadline
+        """
+        self.feed = feed
+        self.evaluate = evaluate
+        self.cache = cache if cache is not None else BarCache()
+        self.executor = executor or ThreadPoolExecutor(max_workers=EVALUATION_WORKERS, thread_name_prefix='evaluate')
+        self.timeout = timeout
+        self.latency = LatencyHistogram()
+        self.results: Dict[str, object] = {}
+        self.skipped = 0
+        self.errors = 0
+        self.in_flight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def on_bar(self, event: BarEvent) -> None:
+        """Feed handler: merge the bar and start evaluating its symbol."""
+        df = self.cache.push(event.symbol, event.to_series()).to_dataframe()
+        with self._lock:
+            running = self.in_flight.get(event.symbol)
+            if running is not None and not running.done():
+                self.skipped += 1
+                return
+            deadline = time.monotonic() + self.timeout
+            self.in_flight[event.symbol] = self.executor.submit(self._evaluate, event, df, deadline)
+
+    def _evaluate(self, event: BarEvent, df: pd.DataFrame, deadline: float):
+        try:
+            result = self.evaluate(event.symbol, df, deadline)
+        except Exception as e:
+            print(f"Error evaluating {event.symbol}: {e}")
+            with self._lock:
+                self.errors += 1
+            return None
+        self.latency.record(self.feed.now() - event.close_ts)
+        with self._lock:
+            self.results[event.symbol] = result
+        return result
+
+    def run(self, symbols: List[str]) -> None:
+        """Run the feed until it ends or is stopped, then wait for running evaluations."""
+        try:
+            self.feed.run(symbols, self.on_bar)
+        finally:
+            with self._lock:
+                running = list(self.in_flight.values())
+            wait(running)
+
+    def latency_summary(self) -> Dict:
+        """
+        Summarize the latencies from bar close to the end of evaluation.
+
+        Returns:
+            Dict: The latency histogram's snapshot in seconds, plus skipped bars and errors
+        """
+        with self._lock:
+            return {**self.latency.snapshot(), 'skipped': self.skipped, 'errors': self.errors}
@@ -0,0 +1,251 @@
+"""
+Module for computing whole-series technical indicators from a symbol's OHLCV arrays.
+
+The per-id methods in TechnicalAnalysis run two queries and a Python loop to produce
+a single value. IndicatorEngine loads a symbol's bars once and computes the same
+indicators for every interval at once, returning them aligned to interval ids.
+"""
+from datetime import datetime
+from typing import Literal, Optional, Tuple
+import numpy as np
+import pandas as pd
+from bar_series import BarSeries
+from database import Database, IntervalRollup, ROLLUP_TIMEFRAMES, TimeInterval, bar_arrays
+
+FIELDS = {'O': 'open', 'H': 'high', 'L': 'low', 'C': 'close', 'V': 'volume'}
+FIELDS_LOADED = ('id', 'start_time', 'open', 'high', 'low', 'close', 'volume')
+
+def load_symbol_bars(
+    db: Database,
+    symbol_id: int,
+    start_time: Optional[datetime] = None,
+    end_time: Optional[datetime] = None
+) -> BarSeries:
+    """
+    Load every 1-minute bar of a symbol into a BarSeries with a single query.
+
+    Args:
+        db (Database): Open database connection
+        symbol_id (int): ID of the symbol to load
+        start_time (datetime): Only load bars starting at or after this time
+        end_time (datetime): Only load bars starting before this time
+
+    Returns:
+        BarSeries: The symbol's bars with interval ids, ordered by start time
+    """
+    query = db.session.query(TimeInterval).filter(TimeInterval.symbol_id == symbol_id)
+    return _load_bars(query, TimeInterval, start_time, end_time)
+
+def load_rollup_bars(
+    db: Database,
+    symbol_id: int,
+    ticker_time: int,
+    start_time: Optional[datetime] = None,
+    end_time: Optional[datetime] = None
+) -> BarSeries:
+    """
+    Load a symbol's aggregated bars of one timeframe from the interval_rollups table.
+
+    Args:
+        db (Database): Open database connection
+        symbol_id (int): ID of the symbol to load
+        ticker_time (int): Timeframe in minutes, one of ROLLUP_TIMEFRAMES
+        start_time (datetime): Only load bars starting at or after this time
+        end_time (datetime): Only load bars starting before this time
+
+    Returns:
+        BarSeries: The symbol's rollup bars, with rollup ids in 'id'
+    """
+    if ticker_time not in ROLLUP_TIMEFRAMES:
+        raise ValueError(f"No rollups are kept for {ticker_time}-minute bars")
+
+    query = db.session.query(IntervalRollup).filter(
+        IntervalRollup.symbol_id == symbol_id,
+        IntervalRollup.ticker_time == ticker_time
+    )
+    return _load_bars(query, IntervalRollup, start_time, end_time)
+
+def _load_bars(query, model, start_time: Optional[datetime], end_time: Optional[datetime]) -> BarSeries:
+    """Run a bar query on the OHLCV columns of a model and convert the rows to a BarSeries."""
+    query = query.with_entities(
+        model.id,
+        model.start_time,
+        model.open,
+        model.high,
+        model.low,
+        model.close,
+        model.volume
+    )
+    if start_time is not None:
+        query = query.filter(model.start_time >= start_time)
+    if end_time is not None:
+        query = query.filter(model.start_time < end_time)
+    rows = query.order_by(model.start_time.asc()).all()
+    return BarSeries.from_arrays(bar_arrays(rows, FIELDS_LOADED))
+
+class IndicatorEngine:
+    """
+    Vectorized SMA, EMA, adjusted SMA and standard deviation over a symbol's full history.
+
+    Results reproduce TechnicalAnalysis exactly: for every interval, the indicator is
+    computed over the preceding bars whose minute is a multiple of ticker_time, and is
+    NaN wherever TechnicalAnalysis would return None.
+
+    Example:
+        >>> engine = IndicatorEngine.from_database(db, symbol_id=1)
+        >>> sma = engine.sma('C', period=20, ticker_time=5)
+        >>> sma.loc[timeinterval_id]
+        150.25
+    """
+
+    def __init__(self, bars: BarSeries, presampled: bool = False):
+        """
+        Initialize the engine with a symbol's bars.
+
+        Args:
+            bars (BarSeries): Bars as returned by load_symbol_bars
+            presampled (bool): The bars are already ticker_time bars (rollups or
+                resample_bars output), so every bar is used instead of sampling the
+                bars whose minute is a multiple of ticker_time
+        """
+        self.bars = bars
+        self.ids = bars['id']
+        self.minutes = bars.timestamp // 60_000_000_000
+        self.presampled = presampled
+
+    @classmethod
+    def from_database(cls, db: Database, symbol_id: int) -> 'IndicatorEngine':
+        """Create an engine from a symbol's bars stored in the database."""
+        return cls(load_symbol_bars(db, symbol_id))
+
+    def _sampled(self, type: Literal['O', 'H', 'L', 'C', 'V'], ticker_time: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Select the bars TechnicalAnalysis would sample for a ticker_time.
+
+        Returns:
+            Tuple of (sampled minutes, sampled values, index of the latest sampled
+            bar at or before each interval, -1 if there is none)
+        """
+        if self.presampled:
+            mask = np.ones(len(self.minutes), dtype=bool)
+        else:
+            mask = (self.minutes % 60) % ticker_time == 0
+        minutes = self.minutes[mask]
+        values = self.bars[FIELDS[type]][mask]
+        latest = np.searchsorted(minutes, self.minutes, side='right') - 1
+        return minutes, values, latest
+
+    def _aligned(self, sampled: Tuple[np.ndarray, np.ndarray, np.ndarray], rolled: np.ndarray,
+                 period: int, ticker_time: int) -> np.ndarray:
+        """
+        Map a rolling statistic over the sampled series back onto every interval.
+
+        A value is valid when the last `period` sampled bars all start within
+        ticker_time * period minutes of the interval, as in TechnicalAnalysis.
+        """
+        minutes, _, latest = sampled
+        first = latest - period + 1
+        valid = first >= 0
+        window_start = self.minutes - ticker_time * period
+        valid[valid] &= minutes[first[valid]] >= window_start[valid]
+
+        result = np.full(len(self.ids), np.nan)
+        result[valid] = rolled[latest[valid]]
+        return result
+
+    def _series(self, values: np.ndarray, name: str) -> pd.Series:
+        """Wrap an indicator array as a Series indexed by interval id."""
+        return pd.Series(values, index=pd.Index(self.ids, name='timeinterval_id'), name=name)
+
+    def sma(self, type: Literal['O', 'H', 'L', 'C', 'V'], period: int, ticker_time: int) -> pd.Series:
+        """
+        Calculate the Simple Moving Average for every interval.
+
+        Args:
+            type (Literal['O', 'H', 'L', 'C', 'V']): Type of data to calculate SMA for
+            period (int): Number of periods/bars to calculate the moving average
+            ticker_time (int): Time interval in minutes (e.g., 5 for 5-minute intervals)
+
+        Returns:
+            pd.Series: SMA values indexed by interval id, NaN where there is not enough data
+        """
+        sampled = self._sampled(type, ticker_time)
+        rolled = pd.Series(sampled[1]).rolling(period).mean().to_numpy()
+        values = self._aligned(sampled, rolled, period, ticker_time)
+        return self._series(values, f'sma_{type}_{period}_{ticker_time}')
+
+    def adjusted_sma(self, type: Literal['O', 'H', 'L', 'C', 'V'], period: int, ticker_time: int) -> pd.Series:
+        """
+        Calculate the Adjusted SMA, [sum - max - min]/(n-2), for every interval.
+
+        Args:
+            type (Literal['O', 'H', 'L', 'C', 'V']): Type of data to calculate adjusted SMA for
+            period (int): Number of periods/bars, must be greater than 2
+            ticker_time (int): Time interval in minutes (e.g., 5 for 5-minute intervals)
+
+        Returns:
+            pd.Series: Adjusted SMA values indexed by interval id, NaN where there is not enough data
+        """
+        if period <= 2:
+            raise ValueError("Adjusted SMA needs a period greater than 2")
+
+        sampled = self._sampled(type, ticker_time)
+        rolling = pd.Series(sampled[1]).rolling(period)
+        rolled = ((rolling.sum() - rolling.max() - rolling.min()) / (period - 2)).to_numpy()
+        values = self._aligned(sampled, rolled, period, ticker_time)
+        return self._series(values, f'adjusted_sma_{type}_{period}_{ticker_time}')
+
+    def stdv(self, type: Literal['O', 'H', 'L', 'C', 'V'], period: int, ticker_time: int) -> pd.Series:
+        """
+        Calculate the population Standard Deviation for every interval.
+
+        Args:
+            type (Literal['O', 'H', 'L', 'C', 'V']): Type of data to calculate STDV for
+            period (int): Number of periods/bars to calculate the standard deviation
+            ticker_time (int): Time interval in minutes (e.g., 5 for 5-minute intervals)
+
+        Returns:
+            pd.Series: STDV values indexed by interval id, NaN where there is not enough data
+        """
+        sampled = self._sampled(type, ticker_time)
+        rolled = pd.Series(sampled[1]).rolling(period).std(ddof=0).to_numpy()
+        values = self._aligned(sampled, rolled, period, ticker_time)
+        return self._series(values, f'stdv_{type}_{period}_{ticker_time}')
+
+    def ema(self, type: Literal['O', 'H', 'L', 'C', 'V'], period: int, ticker_time: int) -> pd.Series:
+        """
+        Calculate the Exponential Moving Average for every interval.
+
+        Like TechnicalAnalysis.calculate_ema, each value is seeded with the SMA of the
+        first `period` sampled bars in the last 2 * period * ticker_time minutes and then
+        smoothed over the rest of that window. The recursion is unrolled into a
+        weighted sum so it can be evaluated for all intervals at once.
+
+        Args:
+            type (Literal['O', 'H', 'L', 'C', 'V']): Type of data to calculate EMA for
+            period (int): Number of periods/bars to calculate the moving average
+            ticker_time (int): Time interval in minutes (e.g., 5 for 5-minute intervals)
+
+        Returns:
+            pd.Series: EMA values indexed by interval id, NaN where there is not enough data
+        """
+        minutes, values, latest = self._sampled(type, ticker_time)
+        rolling_mean = pd.Series(values).rolling(period).mean().to_numpy()
+
+        first = np.searchsorted(minutes, self.minutes - 2 * ticker_time * period, side='left')
+        count = latest - first + 1
+        valid = count >= period
+
+        first, latest, extra = first[valid], latest[valid], count[valid] - period
+        multiplier = 2 / (period + 1)
+        decay = 1 - multiplier
+
+        # ema = seed * decay^extra + sum(multiplier * decay^q * value[latest - q] for q < extra)
+        result = rolling_mean[first + period - 1] * decay ** extra
+        for q in range(int(extra.max()) if len(extra) else 0):
+            active = q < extra
+            result[active] += multiplier * decay ** q * values[latest[active] - q]
+
+        output = np.full(len(self.ids), np.nan)
+        output[valid] = result
+        return self._series(output, f'ema_{type}_{period}_{ticker_time}')
@@ -0,0 +1,331 @@
+"""
+Module for pipelined ingestion: fetch -> normalize -> write stages joined by bounded queues.
+
+Fetch threads download symbols and push raw frames onto a bounded queue, normalize
+threads turn them into time_intervals column lists, and writer threads upsert
+several symbols per transaction. A full queue blocks the stage feeding it, so a
+slow database throttles fetching instead of buffering the whole universe in memory,
+and network and database work overlap. Every stage counts items, busy time and its
+input queue depth, which shows where the bottleneck is. A stage thread that fails
+keeps draining its input queue, marking each item as an error, so the stages
+after it still stop.
+"""
+from typing import Dict, List, Optional
+from datetime import timedelta
+import argparse
+import queue
+import threading
+import time
+from config import INGEST_MAX_WORKERS, PROVIDER_BACKOFF_SECONDS, PROVIDER_MAX_RETRIES, SYMBOL_METADATA_TTL_DAYS
+from database import Database, init_schema, interval_columns
+from db_config import DATABASE_URL
+from providers import DataProvider, RateLimiter, YFinanceProvider, fetch_symbol
+
+# Tells a stage thread that no more input is coming
+_DONE = object()
+
+class StageStats:
+    """Running counters for one pipeline stage."""
+
+    def __init__(self, name: str, input_queue: queue.Queue):
+        self.name = name
+        self.input_queue = input_queue
+        self.items = 0
+        self.rows = 0
+        self.busy_seconds = 0.0
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def record(self, busy_seconds: float, items: int = 1, rows: int = 0) -> None:
+        """Count work done by one of the stage's threads."""
+        with self._lock:
+            self.items += items
+            self.rows += rows
+            self.busy_seconds += busy_seconds
+
+    def snapshot(self) -> Dict:
+        """
+        Current counters.
+
+        Returns:
+            Dict: items and rows processed, their rates per second since the stage
+                started, busy seconds summed over its threads and its input queue depth
+        """
+        with self._lock:
+            elapsed = max(time.monotonic() - self.started, 1e-9)
+            return {
+                'stage': self.name,
+                'items': self.items,
+                'rows': self.rows,
+                'items_per_second': self.items / elapsed,
+                'rows_per_second': self.rows / elapsed,
+                'busy_seconds': self.busy_seconds,
+                'queue_depth': self.input_queue.qsize()
+            }
+
+class IngestPipeline:
+    """
+    Concurrent, backpressured ingestion of many symbols.
+
+    Example:
+        >>> pipeline = IngestPipeline(YFinanceProvider(), fetch_workers=16, batch_symbols=20)
+        >>> results = pipeline.run(symbols)
+        >>> pipeline.stats()
+    """
+
+    def __init__(
+        self,
+        provider: Optional[DataProvider] = None,
+        db_url: str = DATABASE_URL,
+        period: str = '7d',
+        fetch_workers: int = INGEST_MAX_WORKERS,
+        normalize_workers: int = 1,
+        writers: int = 1,
+        queue_size: int = 32,
+        batch_symbols: int = 10,
+        batch_timeout: float = 1.0,
+        report_interval: Optional[float] = None,
+        limiter: Optional[RateLimiter] = None,
+        max_retries: int = PROVIDER_MAX_RETRIES,
+        backoff: float = PROVIDER_BACKOFF_SECONDS
+    ):
+        """
+        Initialize the pipeline.
+
+        Args:
+            provider (DataProvider): Where to fetch from (default: Yahoo Finance)
+            db_url (str): Database to write to, every writer opens its own session on it
+            period (str): History period to fetch, e.g. '7d'
+            fetch_workers (int): Concurrent fetch threads
+            normalize_workers (int): Threads converting frames to column lists
+            writers (int): Writer threads, each committing its own batches
+            queue_size (int): Capacity of each queue between stages
+            batch_symbols (int): Most symbols a writer upserts in one transaction
+            batch_timeout (float): Seconds a writer waits to fill a batch before writing what it has
+            report_interval (float): Print stage stats this often while running, None to stay quiet
+            limiter (RateLimiter): Rate limiter, defaults to the provider host's
+            max_retries (int): Retries per fetch request
+            backoff (float): First retry delay in seconds
+        """
+        self.provider = provider or YFinanceProvider()
+        self.db_url = db_url
+        self.period = period
+        self.fetch_workers = max(1, fetch_workers)
+        self.normalize_workers = max(1, normalize_workers)
+        self.writers = max(1, writers)
+        self.batch_symbols = max(1, batch_symbols)
+        self.batch_timeout = batch_timeout
+        self.report_interval = report_interval
+        self.limiter = limiter
+        self.max_retries = max_retries
+        self.backoff = backoff
+
+        self.symbol_queue = queue.Queue()
+        self.raw_queue = queue.Queue(maxsize=queue_size)
+        self.normalized_queue = queue.Queue(maxsize=queue_size)
+        self.fetch_stats = StageStats('fetch', self.symbol_queue)
+        self.normalize_stats = StageStats('normalize', self.raw_queue)
+        self.write_stats = StageStats('write', self.normalized_queue)
+        self.batches = 0
+
+        self.metadata_symbols = set()
+        self.results = {}
+        self._results_lock = threading.Lock()
+
+    def _result(self, symbol: str, **result) -> None:
+        with self._results_lock:
+            self.results[symbol] = result
+
+    def _fetch(self) -> None:
+        """Fetch stage: symbol -> raw FetchResult."""
+        while True:
+            symbol = self.symbol_queue.get()
+            if symbol is _DONE:
+                return
+            start = time.monotonic()
+            result = fetch_symbol(self.provider, symbol, self.period, self.limiter, self.max_retries, self.backoff,
+                                  fetch_metadata=symbol in self.metadata_symbols)
+            self.fetch_stats.record(time.monotonic() - start, rows=0 if result.error else len(result.data))
+            if result.error:
+                self._result(symbol, error=result.error)
+            elif result.data.empty:
+                self._result(symbol, error="No data found")
+            else:
+                self.raw_queue.put(result)
+
+    def _normalize(self) -> None:
+        """Normalize stage: raw frame -> (symbol, company name, column lists)."""
+        while True:
+            result = self.raw_queue.get()
+            if result is _DONE:
+                return
+            start = time.monotonic()
+            try:
+                columns = interval_columns(result.data)
+            except Exception as e:
+                self._result(result.symbol, error=f"Normalize failed: {e}")
+                continue
+            self.normalize_stats.record(time.monotonic() - start, rows=len(columns['start_time']))
+            self.normalized_queue.put((result.symbol, result.company_name, columns))
+
+    def _write(self) -> None:
+        """Write stage: batches of normalized symbols -> one transaction per batch."""
+        db = Database(self.db_url)
+        try:
+            done = False
+            while not done:
+                batch = []
+                deadline = time.monotonic() + self.batch_timeout
+                while len(batch) < self.batch_symbols:
+                    try:
+                        item = self.normalized_queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                    except queue.Empty:
+                        break
+                    if item is _DONE:
+                        done = True
+                        break
+                    batch.append(item)
+                if batch:
+                    self._write_batch(db, batch)
+        finally:
+            try:
+                db.close()
+            except Exception as e:
+                print(f"Error closing the database: {e}")
+
+    def _write_batch(self, db: Database, batch: List) -> None:
+        start = time.monotonic()
+        try:
+            counts = db.upsert_time_interval_batch(batch)
+        except Exception as e:
+            for symbol, _, _ in batch:
+                self._result(symbol, error=f"Write failed: {e}")
+            print(f"Error writing batch of {len(batch)} symbols: {e}")
+            return
+        rows = sum(len(columns['start_time']) for _, _, columns in batch)
+        self.write_stats.record(time.monotonic() - start, items=len(batch), rows=rows)
+        with self._results_lock:
+            self.batches += 1
+            for symbol, symbol_counts in counts.items():
+                result = {'inserted': symbol_counts['inserted'], 'updated': symbol_counts['updated']}
+                if 'rollup_error' in symbol_counts:
+                    # The bars are stored; only their rollups are stale
+                    result['error'] = f"Rollup update failed: {symbol_counts['rollup_error']}"
+                    print(f"Error updating rollups of {symbol}: {symbol_counts['rollup_error']}")
+                self.results[symbol] = result
+
+    def stats(self) -> List[Dict]:
+        """Return every stage's StageStats snapshot, in pipeline order."""
+        return [stats.snapshot() for stats in (self.fetch_stats, self.normalize_stats, self.write_stats)]
+
+    def report(self) -> None:
+        """Print a one-line summary of every stage."""
+        print(" | ".join(
+            f"{s['stage']}: {s['items']} symbols, {s['rows_per_second']:.0f} rows/s, queue {s['queue_depth']}"
+            for s in self.stats()
+        ))
+
+    def _guard(self, name: str, target, input_queue: queue.Queue, symbol_of):
+        """
+        Wrap a stage thread's target so that if it raises, the thread marks every item
+        left in its input queue as an error until it takes its _DONE. Targets only raise
+        before taking their _DONE, so the thread stops as it would have.
+        """
+        def run():
+            try:
+                target()
+            except Exception as e:
+                print(f"Error in {name} stage: {e}")
+                while True:
+                    item = input_queue.get()
+                    if item is _DONE:
+                        return
+                    self._result(symbol_of(item), error=f"{name.capitalize()} failed: {e}")
+        return run
+
+    def _start(self, target, count: int) -> List[threading.Thread]:
+        threads = [threading.Thread(target=target, daemon=True) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        return threads
+
+    def _finish(self, threads: List[threading.Thread], next_queue: Optional[queue.Queue], next_count: int) -> None:
+        """Wait for a stage's threads, then tell every thread of the next stage to stop."""
+        for thread in threads:
+            thread.join()
+        if next_queue is not None:
+            for _ in range(next_count):
+                next_queue.put(_DONE)
+
+    def run(self, symbols: List[str]) -> Dict[str, Dict]:
+        """
+        Ingest symbols and wait until every stage has drained.
+
+        Company names are only fetched for symbols that are new or whose metadata is
+        older than SYMBOL_METADATA_TTL_DAYS.
+
+        Returns:
+            Dict[str, Dict]: Per symbol, {'inserted', 'updated'} row counts or {'error': message};
+                symbols whose rollups failed to update have both
+        """
+        for stats in (self.fetch_stats, self.normalize_stats, self.write_stats):
+            stats.started = time.monotonic()
+        db = Database(self.db_url)
+        try:
+            self.metadata_symbols = db.get_stale_symbols(symbols, timedelta(days=SYMBOL_METADATA_TTL_DAYS))
+        finally:
+            db.close()
+        for symbol in symbols:
+            self.symbol_queue.put(symbol)
+        for _ in range(self.fetch_workers):
+            self.symbol_queue.put(_DONE)
+
+        fetchers = self._start(self._guard('fetch', self._fetch, self.symbol_queue, lambda symbol: symbol),
+                               self.fetch_workers)
+        normalizers = self._start(self._guard('normalize', self._normalize, self.raw_queue,
+                                              lambda result: result.symbol), self.normalize_workers)
+        writers = self._start(self._guard('write', self._write, self.normalized_queue, lambda item: item[0]),
+                              self.writers)
+
+        stop_reporting = threading.Event()
+        if self.report_interval:
+            def reporter():
+                while not stop_reporting.wait(self.report_interval):
+                    self.report()
+            threading.Thread(target=reporter, daemon=True).start()
+
+        try:
+            self._finish(fetchers, self.raw_queue, self.normalize_workers)
+            self._finish(normalizers, self.normalized_queue, self.writers)
+            self._finish(writers, None, 0)
+        finally:
+            stop_reporting.set()
+
+        if self.report_interval:
+            self.report()
+        return {symbol: self.results.get(symbol, {'error': 'Not processed'}) for symbol in symbols}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest 1-minute bars through the fetch/normalize/write pipeline")
+    parser.add_argument('symbols', nargs='+', help="Symbols to ingest")
+    parser.add_argument('--period', default='7d', help="History period to fetch")
+    parser.add_argument('--fetch-workers', type=int, default=INGEST_MAX_WORKERS, help="Concurrent fetches")
+    parser.add_argument('--writers', type=int, default=1, help="Writer threads")
+    parser.add_argument('--batch-symbols', type=int, default=10, help="Symbols per write transaction")
+    parser.add_argument('--report-interval', type=float, default=5.0, help="Seconds between stage reports")
+    args = parser.parse_args()
+
+    init_schema()
+    pipeline = IngestPipeline(
+        period=args.period,
+        fetch_workers=args.fetch_workers,
+        writers=args.writers,
+        batch_symbols=args.batch_symbols,
+        report_interval=args.report_interval
+    )
+    results = pipeline.run(args.symbols)
+    for symbol, result in results.items():
+        if 'error' in result:
+            print(f"{symbol}: {result['error']}")
+        else:
+            print(f"{symbol}: {result['inserted']} inserted, {result['updated']} updated")
@@ -0,0 +1,207 @@
+"""
+Module for trading calendars and detecting missing 1-minute bars.
+
+A calendar lists the regular sessions of an exchange as naive exchange-local
+open/close times, the same wall-clock times stored in time_intervals. find_gaps
+compares stored bar times against the calendar's trading minutes, so incremental
+fetches can backfill exactly the missing ranges; find_short_buckets does the same
+from per-bucket bar counts, without reading every stored bar time.
+"""
+from typing import Dict, List, Tuple
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+import numpy as np
+import pandas as pd
+
+class MarketCalendar:
+    """Calendar trading every weekday from open_time to close_time. Subclasses add holidays."""
+
+    timezone = 'America/New_York'
+    open_time = time(9, 30)
+    close_time = time(16, 0)
+
+    def now(self) -> datetime:
+        """Current naive wall-clock time in the exchange's time zone."""
+        return datetime.now(ZoneInfo(self.timezone)).replace(tzinfo=None)
+
+    def holidays(self, year: int) -> set:
+        """Return the dates the market is closed in a year, besides weekends."""
+        return set()
+
+    def is_trading_day(self, day: date) -> bool:
+        return day.weekday() < 5 and day not in self.holidays(day.year)
+
+    def sessions(self, start: date, end: date) -> List[Tuple[datetime, datetime]]:
+        """
+        List the sessions between two dates, both included.
+
+        Returns:
+            List of (open, close) datetimes, oldest first
+        """
+        sessions = []
+        day = start
+        while day <= end:
+            if self.is_trading_day(day):
+                sessions.append((datetime.combine(day, self.open_time), datetime.combine(day, self.close_time)))
+            day += timedelta(days=1)
+        return sessions
+
+    def trading_minutes(self, start: datetime, end: datetime) -> np.ndarray:
+        """
+        Start times of every 1-minute bar the market trades in [start, end).
+
+        Returns:
+            np.ndarray: datetime64[m] bar start times
+        """
+        minutes = [
+            np.arange(np.datetime64(max(open, start), 'm'), np.datetime64(min(close, end), 'm'), dtype='datetime64[m]')
+            for open, close in self.sessions(start.date(), end.date())
+            if open < end and close > start
+        ]
+        return np.concatenate(minutes) if minutes else np.empty(0, dtype='datetime64[m]')
+
+def exchange_wall_clock(index: pd.DatetimeIndex, timezone: str = MarketCalendar.timezone) -> pd.DatetimeIndex:
+    """Naive exchange-local times of an index; tz-aware times are converted to the exchange's time zone first."""
+    if index.tz is None:
+        return index
+    return index.tz_convert(timezone).tz_localize(None)
+
+def _nth_weekday(year: int, month: int, weekday: int, n: int) -> date:
+    """The nth (1-based, or -1 for last) weekday of a month."""
+    if n > 0:
+        first = date(year, month, 1)
+        return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+def _easter(year: int) -> date:
+    """Western Easter Sunday (anonymous Gregorian algorithm)."""
+    a, b, c = year % 19, year // 100, year % 100
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+def _observed(day: date) -> date:
+    """Move a Saturday holiday to Friday and a Sunday holiday to Monday."""
+    if day.weekday() == 5:
+        return day - timedelta(days=1)
+    if day.weekday() == 6:
+        return day + timedelta(days=1)
+    return day
+
+class NYSECalendar(MarketCalendar):
+    """
+    NYSE/Nasdaq regular sessions, 09:30-16:00 New York time, with full-day holidays.
+
+    Early closes (13:00 on some holiday eves) are treated as full sessions, so their
+    afternoon is reported as a gap; backfilling it costs one request that returns nothing.
+    """
+
+    def holidays(self, year: int) -> set:
+        return _nyse_holidays(year)
+
+@lru_cache(maxsize=None)
+def _nyse_holidays(year: int) -> set:
+    """NYSE full-day holidays of a year."""
+    holidays = {
+        _nth_weekday(year, 1, 0, 3),    # Martin Luther King Jr. Day
+        _nth_weekday(year, 2, 0, 3),    # Washington's Birthday
+        _easter(year) - timedelta(days=2),  # Good Friday
+        _nth_weekday(year, 5, 0, -1),   # Memorial Day
+        _observed(date(year, 7, 4)),    # Independence Day
+        _nth_weekday(year, 9, 0, 1),    # Labor Day
+        _nth_weekday(year, 11, 3, 4),   # Thanksgiving
+        _observed(date(year, 12, 25)),  # Christmas
+    }
+    # New Year's Day is not moved back into the previous year when it falls on a Saturday
+    new_year = _observed(date(year, 1, 1))
+    if new_year.year == year:
+        holidays.add(new_year)
+    if year >= 2022:
+        holidays.add(_observed(date(year, 6, 19)))  # Juneteenth
+    return holidays
+
+def find_gaps(
+    stored_times: np.ndarray,
+    calendar: MarketCalendar,
+    start: datetime,
+    end: datetime,
+    min_gap_minutes: int = 1
+) -> List[Tuple[datetime, datetime]]:
+    """
+    Find trading-minute ranges in [start, end) with no stored bar.
+
+    Args:
+        stored_times (np.ndarray): Start times of the stored 1-minute bars
+        calendar (MarketCalendar): Calendar giving the expected trading minutes
+        start (datetime): Start of the range to check
+        end (datetime): End of the range to check, exclusive
+        min_gap_minutes (int): Ignore runs of fewer missing minutes, e.g. minutes
+            without trades in thinly traded symbols
+
+    Returns:
+        List of (gap start, gap end) datetimes, end exclusive, oldest first
+    """
+    expected = calendar.trading_minutes(start, end)
+    missing = np.setdiff1d(expected, np.asarray(stored_times, dtype='datetime64[m]'), assume_unique=True)
+    if len(missing) == 0:
+        return []
+
+    # Split into runs of consecutive trading minutes
+    positions = np.searchsorted(expected, missing)
+    breaks = np.flatnonzero(np.diff(positions) != 1) + 1
+    gaps = []
+    for run in np.split(missing, breaks):
+        if len(run) >= min_gap_minutes:
+            gaps.append((run[0].astype(datetime), (run[-1] + np.timedelta64(1, 'm')).astype(datetime)))
+    return gaps
+
+def find_short_buckets(
+    counts: Dict[datetime, int],
+    calendar: MarketCalendar,
+    start: datetime,
+    end: datetime,
+    bucket_minutes: int = 60,
+    min_gap_minutes: int = 1
+) -> List[Tuple[datetime, datetime]]:
+    """
+    Find the session-aligned buckets in [start, end) holding too few stored bars.
+
+    Buckets are counted from each session's open. A bucket is short when it is missing
+    at least min_gap_minutes of the trading minutes it covers within [start, end), and
+    adjacent short buckets are merged into one range.
+
+    Args:
+        counts (Dict[datetime, int]): Stored bars per bucket, keyed by bucket start
+        calendar (MarketCalendar): Calendar giving the sessions and expected trading minutes
+        start (datetime): Start of the range to check
+        end (datetime): End of the range to check, exclusive
+        bucket_minutes (int): Bucket length
+        min_gap_minutes (int): Ignore buckets missing fewer minutes, e.g. minutes
+            without trades in thinly traded symbols
+
+    Returns:
+        List of (range start, range end) datetimes, end exclusive, oldest first
+    """
+    size = timedelta(minutes=bucket_minutes)
+    ranges = []
+    for open, close in calendar.sessions(start.date(), end.date()):
+        bucket = open
+        while bucket < close:
+            first, last = max(bucket, start), min(bucket + size, close, end)
+            if first < last:
+                expected = len(calendar.trading_minutes(first, last))
+                if expected - counts.get(bucket, 0) >= min_gap_minutes:
+                    if ranges and ranges[-1][1] == first:
+                        ranges[-1] = (ranges[-1][0], last)
+                    else:
+                        ranges.append((first, last))
+            bucket += size
+    return ranges
@@ -0,0 +1,307 @@
+"""
+Module for lightweight latency and count instrumentation of the bot.
+
+Code is timed with METRICS.timer(...) blocks or the METRICS.timed(...) decorator,
+and events are counted with METRICS.count(...). Each distinct name and label set
+gets its own log-bucketed LatencyHistogram or Counter. The registry can be served
+as a Prometheus text endpoint or flushed to a JSON file periodically. When metrics
+are disabled, timers and counts return after a single flag check, so the
+instrumentation can stay in the hot path.
+
+Example:
+    >>> with METRICS.timer('stage_seconds', stage='fetch', symbol='AAPL'):
+    ...     df = fetch()
+    >>> METRICS.count('orders_total', side='buy')
+    >>> print(METRICS.to_prometheus())
+"""
+from typing import Callable, Dict, Tuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import functools
+import json
+import math
+import os
+import threading
+import time
+from config import METRICS_ENABLED
+
+class LatencyHistogram:
+    """
+    Log-bucketed latency histogram with bounded relative error, in the spirit of HdrHistogram.
+
+    Values are counted in buckets whose bounds grow by a fixed ratio, so memory stays
+    constant and every percentile is exact to within that ratio.
+    """
+
+    def __init__(self, lowest: float = 1e-5, highest: float = 600.0, precision: float = 0.01):
+        """
+        Initialize an empty histogram.
+
+        Args:
+            lowest (float): Smallest value told apart from zero, in seconds
+            highest (float): Largest value recorded without clamping, in seconds
+            precision (float): Relative width of a bucket, e.g. 0.01 for 1%
+        """
+        self.lowest = lowest
+        self.ratio = math.log1p(precision)
+        self.counts = [0] * (int(math.log(highest / lowest) / self.ratio) + 2)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, value: float) -> None:
+        """Count one value."""
+        bucket = 0 if value < self.lowest else min(int(math.log(value / self.lowest) / self.ratio) + 1,
+                                                   len(self.counts) - 1)
+        with self._lock:
+            self.counts[bucket] += 1
+            self.count += 1
+            self.total += value
+            self.max = max(self.max, value)
+
+    def percentile(self, q: float) -> float:
+        """Return the value below which q percent of recorded values fall, or 0 if empty."""
+        with self._lock:
+            if not self.count:
+                return 0.0
+            rank = max(1, math.ceil(self.count * q / 100))
+            seen = 0
+            for bucket, count in enumerate(self.counts):
+                seen += count
+                if seen >= rank:
+                    if bucket == 0:
+                        return 0.0
+                    return min(self.lowest * math.exp(bucket * self.ratio), self.max)
+        return self.max
+
+    def snapshot(self) -> Dict:
+        """Return count, sum, mean, p50, p90, p99 and max."""
+        return {
+            'count': self.count,
+            'sum': self.total,
+            'mean': self.total / self.count if self.count else 0.0,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'max': self.max
+        }
+
+class Counter:
+    """Thread-safe running total."""
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+class _Timer:
+    """Context manager recording the seconds spent in its block into a histogram."""
+
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram: LatencyHistogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.record(time.perf_counter() - self.start)
+        return False
+
+class _NullTimer:
+    """Timer used while metrics are disabled: does nothing."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+_NULL_TIMER = _NullTimer()
+
+# Quantiles exported for every histogram
+QUANTILES = (('0.5', 'p50'), ('0.9', 'p90'), ('0.99', 'p99'))
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(labels: Tuple, **extra) -> str:
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+class MetricsRegistry:
+    """Histograms and counters by name and labels, with Prometheus and JSON export."""
+
+    def __init__(self, enabled: bool = METRICS_ENABLED, prefix: str = 'stonksbot_'):
+        """
+        Initialize an empty registry.
+
+        Args:
+            enabled (bool): Whether timer() and count() record anything
+            prefix (str): Prefix of every exported metric name
+        """
+        self.enabled = enabled
+        self.prefix = prefix
+        self.histograms: Dict[Tuple, LatencyHistogram] = {}
+        self.counters: Dict[Tuple, Counter] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name: str, labels: Dict) -> Tuple:
+        return name, tuple(sorted(labels.items()))
+
+    def histogram(self, name: str, **labels) -> LatencyHistogram:
+        """Return the histogram of a name and label set, creating it on first use."""
+        key = self._key(name, labels)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(key, LatencyHistogram())
+        return histogram
+
+    def register(self, histogram: LatencyHistogram, name: str, **labels) -> None:
+        """Export a histogram owned by another component, e.g. an OrderExecutor's latency."""
+        with self._lock:
+            self.histograms[self._key(name, labels)] = histogram
+
+    def counter(self, name: str, **labels) -> Counter:
+        """Return the counter of a name and label set, creating it on first use."""
+        key = self._key(name, labels)
+        counter = self.counters.get(key)
+        if counter is None:
+            with self._lock:
+                counter = self.counters.setdefault(key, Counter())
+        return counter
+
+    def timer(self, name: str, **labels):
+        """Return a context manager timing its block into the name's histogram; a no-op when disabled."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self.histogram(name, **labels))
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        """Record a value measured elsewhere into the name's histogram; a no-op when disabled."""
+        if self.enabled:
+            self.histogram(name, **labels).record(value)
+
+    def count(self, name: str, amount: float = 1.0, **labels) -> None:
+        """Add to the name's counter; a no-op when disabled."""
+        if self.enabled:
+            self.counter(name, **labels).inc(amount)
+
+    def timed(self, name: str, **labels) -> Callable:
+        """Decorator timing every call of a function into the name's histogram."""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with _Timer(self.histogram(name, **labels)):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def to_json(self) -> Dict:
+        """Return every metric as {'histograms': [...], 'counters': [...]} with their labels."""
+        with self._lock:
+            histograms = list(self.histograms.items())
+            counters = list(self.counters.items())
+        return {
+            'timestamp': time.time(),
+            'histograms': [
+                {'name': name, 'labels': dict(labels), **histogram.snapshot()}
+                for (name, labels), histogram in sorted(histograms, key=lambda item: item[0])
+            ],
+            'counters': [
+                {'name': name, 'labels': dict(labels), 'value': counter.value}
+                for (name, labels), counter in sorted(counters, key=lambda item: item[0])
+            ]
+        }
+
+    def to_prometheus(self) -> str:
+        """Return every metric in the Prometheus text format; histograms are exported as summaries."""
+        data = self.to_json()
+        lines = []
+        typed = set()
+        for histogram in data['histograms']:
+            name = self.prefix + histogram['name']
+            labels = tuple(histogram['labels'].items())
+            if name not in typed:
+                lines.append(f'# TYPE {name} summary')
+                typed.add(name)
+            for quantile, field in QUANTILES:
+                lines.append(f'{name}{_labels(labels, quantile=quantile)} {histogram[field]}')
+            lines.append(f'{name}_sum{_labels(labels)} {histogram["sum"]}')
+            lines.append(f'{name}_count{_labels(labels)} {histogram["count"]}')
+        for counter in data['counters']:
+            name = self.prefix + counter['name']
+            if name not in typed:
+                lines.append(f'# TYPE {name} counter')
+                typed.add(name)
+            lines.append(f'{name}{_labels(tuple(counter["labels"].items()))} {counter["value"]}')
+        return '\n'.join(lines) + '\n'
+
+    def write_json(self, path: str) -> None:
+        """Write every metric to a JSON file atomically."""
+        with open(path + '.tmp', 'w') as file:
+            json.dump(self.to_json(), file, indent=1)
+        os.replace(path + '.tmp', path)
+
+    def start_json_flusher(self, path: str, interval: float) -> threading.Event:
+        """
+        Write the metrics to path every interval seconds on a background thread.
+
+        Returns:
+            threading.Event: Set it to stop flushing
+        """
+        stop = threading.Event()
+
+        def flush():
+            while not stop.wait(interval):
+                try:
+                    self.write_json(path)
+                except OSError as e:
+                    print(f"Error writing metrics to {path}: {e}")
+
+        threading.Thread(target=flush, name='metrics-flush', daemon=True).start()
+        return stop
+
+    def serve_prometheus(self, port: int, host: str = '0.0.0.0') -> ThreadingHTTPServer:
+        """
+        Serve the metrics at http://host:port/metrics on a background thread.
+
+        Returns:
+            ThreadingHTTPServer: The server; call shutdown() to stop it
+        """
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != '/metrics':
+                    self.send_error(404)
+                    return
+                body = registry.to_prometheus().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+        return server
+
+# The process-wide registry the bot is instrumented with
+METRICS = MetricsRegistry()
@@ -0,0 +1,248 @@
+"""
+Module for submitting orders off the strategy's critical path.
+
+The bot used to call api.submit_order inline, so one slow broker response stalled
+every symbol evaluated after it. OrderExecutor takes orders on a bounded queue and
+returns immediately; worker threads submit them to the broker. Every order carries
+a client order id that stays the same across retries, so a retry after a lost
+response can never open a second order. A symbol with an order still in flight
+rejects new ones. The latency from signal to broker acknowledgement is recorded in
+a histogram.
+"""
+from typing import Dict, List, NamedTuple, Optional
+from types import SimpleNamespace
+import queue
+import random
+import threading
+import time
+import uuid
+from config import ORDER_MAX_RETRIES, ORDER_QUEUE_SIZE, ORDER_WORKERS, PROVIDER_BACKOFF_SECONDS
+from metrics import LatencyHistogram
+
+# Tells a worker thread that no more orders are coming
+_DONE = object()
+
+class OrderRequest(NamedTuple):
+    """An order waiting to be submitted; signal_time is the time.monotonic() the signal fired."""
+    symbol: str
+    side: str
+    qty: float
+    client_order_id: str
+    signal_time: float
+    type: str = 'market'
+    time_in_force: str = 'gtc'
+
+def new_client_order_id(symbol: str, side: str, prefix: str = 'stonks') -> str:
+    """Return a unique client order id, which Alpaca limits to 48 characters."""
+    return f"{prefix}-{symbol}-{side}-{uuid.uuid4().hex[:16]}"[:48]
+
+class OrderExecutor:
+    """
+    Bounded, asynchronous order submission with per-symbol in-flight suppression.
+
+    Example:
+        >>> executor = OrderExecutor(api, position_book=book)
+        >>> executor.submit('AAPL', 'buy', 1)  # returns at once
+        'stonks-AAPL-buy-3f2a...'
+        >>> executor.latency.snapshot()
+    """
+
+    def __init__(
+        self,
+        broker,
+        workers: int = ORDER_WORKERS,
+        queue_size: int = ORDER_QUEUE_SIZE,
+        max_retries: int = ORDER_MAX_RETRIES,
+        backoff: float = PROVIDER_BACKOFF_SECONDS,
+        position_book=None
+    ):
+        """
+        Initialize the executor and start its worker threads.
+
+        Args:
+            broker: Alpaca REST client, or anything with submit_order() and get_order_by_client_order_id()
+            workers (int): Threads submitting orders
+            queue_size (int): Most orders waiting to be submitted; more are rejected
+            max_retries (int): Retries of a failed submission, with the same client order id
+            backoff (float): First retry delay in seconds, doubled on each retry
+            position_book (PositionBook): Book that acknowledged orders are recorded in
+        """
+        self.broker = broker
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.position_book = position_book
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.latency = LatencyHistogram()
+        self.in_flight: Dict[str, OrderRequest] = {}
+        self.counts = {'submitted': 0, 'acknowledged': 0, 'failed': 0, 'suppressed': 0, 'rejected': 0}
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self.threads = [
+            threading.Thread(target=self._work, name=f'order-{i}', daemon=True)
+            for i in range(max(1, workers))
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.counts[name] += 1
+
+    def submit(self, symbol: str, side: str, qty: float, signal_time: Optional[float] = None, **order) -> Optional[str]:
+        """
+        Queue an order without waiting for the broker.
+
+        Args:
+            symbol (str): Stock symbol
+            side (str): 'buy' or 'sell'
+            qty (float): Quantity
+            signal_time (float): time.monotonic() when the signal fired (default: now)
+            **order: type and time_in_force, as for OrderRequest
+
+        Returns:
+            str: The order's client order id, or None if the symbol already has an order
+                in flight or the queue is full
+        """
+        request = OrderRequest(symbol, side, qty, new_client_order_id(symbol, side),
+                               time.monotonic() if signal_time is None else signal_time, **order)
+        with self._lock:
+            if symbol in self.in_flight:
+                self.counts['suppressed'] += 1
+                return None
+            try:
+                self.queue.put_nowait(request)
+            except queue.Full:
+                self.counts['rejected'] += 1
+                print(f"Order queue full, rejecting {side} order for {symbol}")
+                return None
+            self.in_flight[symbol] = request
+            self.counts['submitted'] += 1
+        return request.client_order_id
+
+    def _work(self) -> None:
+        while True:
+            request = self.queue.get()
+            if request is _DONE:
+                return
+            try:
+                order = self._submit_with_retry(request)
+            except Exception as e:
+                self._count('failed')
+                print(f"Error executing {request.side} order for {request.symbol}: {e}")
+            else:
+                self.latency.record(time.monotonic() - request.signal_time)
+                self._count('acknowledged')
+                if self.position_book is not None:
+                    self.position_book.record_order(order)
+                print(f"{'Bought' if request.side == 'buy' else 'Sold'} {request.qty} shares of {request.symbol}")
+            finally:
+                with self._lock:
+                    self.in_flight.pop(request.symbol, None)
+                    self._idle.notify_all()
+
+    def _submit_with_retry(self, request: OrderRequest):
+        """Submit an order, retrying with the same client order id until the broker acknowledges it."""
+        for attempt in range(self.max_retries + 1):
+            try:
+                return self.broker.submit_order(
+                    symbol=request.symbol,
+                    qty=request.qty,
+                    side=request.side,
+                    type=request.type,
+                    time_in_force=request.time_in_force,
+                    client_order_id=request.client_order_id
+                )
+            except Exception as e:
+                # An earlier attempt may have reached the broker even though its response was lost
+                if attempt:
+                    try:
+                        return self.broker.get_order_by_client_order_id(request.client_order_id)
+                    except Exception:
+                        pass
+                if attempt == self.max_retries:
+                    raise
+                delay = self.backoff * 2 ** attempt * (1 + random.random() / 2)
+                print(f"Submitting {request.client_order_id} failed ({e}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Wait until no order is queued or in flight; return False on timeout."""
+        with self._idle:
+            return self._idle.wait_for(lambda: not self.in_flight, timeout)
+
+    def close(self) -> None:
+        """Submit the queued orders, then stop the worker threads."""
+        for _ in self.threads:
+            self.queue.put(_DONE)
+        for thread in self.threads:
+            thread.join()
+
+class FakeBroker:
+    """
+    In-memory broker for tests and offline runs: acknowledges orders after a delay and fills them at once.
+
+    Client order ids are unique, as at Alpaca: submitting one twice raises.
+    """
+
+    def __init__(self, latency: float = 0.0, failures: int = 0, lose_responses: int = 0, fill_price: float = 100.0):
+        """
+        Initialize the broker.
+
+        Args:
+            latency (float): Seconds every submission takes
+            failures (int): Number of submissions that fail before reaching the broker
+            lose_responses (int): Number of accepted submissions that still raise, as when
+                the response is lost on the way back
+            fill_price (float): Price every order fills at
+        """
+        self.latency = latency
+        self.failures = failures
+        self.lose_responses = lose_responses
+        self.fill_price = fill_price
+        self.orders: List[SimpleNamespace] = []
+        self.positions: Dict[str, float] = {}
+        self.attempts = 0
+        self._lock = threading.Lock()
+
+    def submit_order(self, symbol, qty, side, type='market', time_in_force='gtc', client_order_id=None, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.attempts += 1
+            if self.failures:
+                self.failures -= 1
+                raise ConnectionError("Simulated broker failure")
+            if any(order.client_order_id == client_order_id for order in self.orders if client_order_id):
+                raise ValueError(f"client_order_id must be unique: {client_order_id}")
+            order = SimpleNamespace(
+                id=uuid.uuid4().hex, client_order_id=client_order_id, symbol=symbol, qty=qty,
+                side=side, type=type, time_in_force=time_in_force, status='filled',
+                filled_avg_price=self.fill_price
+            )
+            self.orders.append(order)
+            signed = float(qty) if side == 'buy' else -float(qty)
+            self.positions[symbol] = self.positions.get(symbol, 0.0) + signed
+            if not self.positions[symbol]:
+                del self.positions[symbol]
+            if self.lose_responses:
+                self.lose_responses -= 1
+                raise TimeoutError("Simulated lost response")
+            return order
+
+    def get_order_by_client_order_id(self, client_order_id):
+        with self._lock:
+            for order in self.orders:
+                if order.client_order_id == client_order_id:
+                    return order
+        raise KeyError(client_order_id)
+
+    def list_positions(self):
+        with self._lock:
+            return [
+                SimpleNamespace(symbol=symbol, qty=str(qty), avg_entry_price=str(self.fill_price))
+                for symbol, qty in self.positions.items()
+            ]
+
+    def list_orders(self, status='open'):
+        # Orders fill at once, so none are ever open
+        return []
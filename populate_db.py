@@ -1,50 +1,77 @@
-import yfinance as yf
-from datetime import datetime, timedelta
-from database import Database
-import pandas as pd
+from datetime import timedelta
+import sys
+from bar_store import BAR_STORE_PATH, BarStore
+from database import Database, init_schema
+from data_fetcher import plan_fetch_windows
+from providers import YFinanceProvider, fetch_symbols
+from config import INGEST_MAX_WORKERS, SYMBOL_METADATA_TTL_DAYS
 
-def fetch_and_save_data(symbols, period='7d'):
+def fetch_and_save_data(symbols, period='7d', bar_store=None, provider=None, max_workers=INGEST_MAX_WORKERS,
+                        incremental=False):
     """
     Fetch data from Yahoo Finance and save to database
     
+    Symbols are fetched concurrently by up to max_workers threads, rate limited and
+    retried per provider host, and saved on this thread as each one arrives. Company
+    names are only fetched when a symbol is new or its metadata is older than
+    SYMBOL_METADATA_TTL_DAYS.
+    
     Parameters:
     - symbols: List of stock symbols (e.g., ['AAPL', 'MSFT'])
     - period: Time period ('1d', '5d', '7d', '1mo', '3mo', '6mo', '1y', '2y', '5y', '10y', 'ytd', 'max')
+    - bar_store: Optional BarStore that also receives the fetched bars
+    - provider: DataProvider to fetch from (default: Yahoo Finance)
+    - max_workers: Maximum number of symbols fetched at once
+    - incremental: Only fetch bars after each symbol's latest stored bar plus gaps in its
+      recent history; symbols without bars still fetch the whole period
     """
     db = Database()
+    provider = provider or YFinanceProvider()
+    windows = plan_fetch_windows(db, symbols) if incremental else None
+    stale = db.get_stale_symbols(symbols, timedelta(days=SYMBOL_METADATA_TTL_DAYS))
+    db.get_symbol_ids(symbols)
     
-    for symbol in symbols:
+    for result in fetch_symbols(provider, symbols, period, max_workers, windows=windows,
+                                metadata_symbols=stale):
+        symbol = result.symbol
         print(f"Processing {symbol}...")
         try:
-            # Fetch data from Yahoo Finance
-            stock = yf.Ticker(symbol)
-            data = stock.history(period=period, interval='1m')
+            if result.error:
+                raise RuntimeError(result.error)
             
+            data = result.data
             if data.empty:
-                print(f"No data found for {symbol}")
+                print(f"No {'new ' if windows and symbol in windows else ''}data found for {symbol}")
                 continue
             
-            # Get company info
-            info = stock.info
-            company_name = info.get('longName', '')
-            
-            # Save symbol info
-            db.save_symbol(
-                symbol=symbol,
-                company_name=company_name
-            )
+            # Save symbol info, only if it is new or its metadata was refreshed
+            if result.company_name is not None or symbol not in db.symbol_ids:
+                db.upsert_symbols({symbol: result.company_name})
             
             # Save time intervals
-            db.save_time_interval(symbol, data)
+            counts = db.upsert_time_intervals(symbol, data)
             
-            print(f"Successfully saved data for {symbol}")
+            print(f"Successfully saved data for {symbol} "
+                  f"({counts['inserted']} inserted, {counts['updated']} updated)")
+            
+            if bar_store is not None:
+                bar_store.write_dataframe(symbol, data)
             
         except Exception as e:
+            db.session.rollback()
             print(f"Error processing {symbol}: {str(e)}")
     
     db.close()
 
-def main():
+def main(incremental=False, bar_store_path=None):
+    """
+    Populate the database with the default symbols
+    
+    Parameters:
+    - incremental: Only fetch the bars missing from the database
+    - bar_store_path: Directory of a BarStore that also receives the fetched bars
+      (default: None, only write the database; bar_store.py sync exports stored bars in bulk)
+    """
     # List of symbols to fetch
     symbols = [
         'AAPL',  # Apple
@@ -59,10 +86,20 @@ def main():
         'WMT'    # Walmart
     ]
     
-    # Fetch last 7 days of 1-minute data
-    fetch_and_save_data(symbols, period='7d')
+    # Create any missing tables once, before the first write
+    init_schema()
+    
+    # Fetch last 7 days of 1-minute data, or only the missing bars when incremental
+    bar_store = BarStore(bar_store_path) if bar_store_path else None
+    fetch_and_save_data(symbols, period='7d', bar_store=bar_store, incremental=incremental)
     
     print("Data population complete!")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    # --bar-store [PATH] also mirrors the fetched bars to a BarStore, at BAR_STORE_PATH if no path is given
+    bar_store_path = None
+    if '--bar-store' in sys.argv:
+        position = sys.argv.index('--bar-store') + 1
+        has_path = position < len(sys.argv) and not sys.argv[position].startswith('--')
+        bar_store_path = sys.argv[position] if has_path else BAR_STORE_PATH
+    main(incremental='--incremental' in sys.argv, bar_store_path=bar_store_path) 
\ No newline at end of file
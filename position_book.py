@@ -0,0 +1,116 @@
+"""
+Module for the bot's local book of positions and open orders.
+
+The bot used to call api.get_position once per symbol per cycle, and read any error
+as "no position". PositionBook loads every position and open order with two bulk
+calls, list_positions and list_orders, and answers per-symbol questions from memory.
+Between refreshes it is kept current from the bot's own orders, including orders
+submitted while a refresh is waiting on the API. It also
+tracks how old its data is, so the bot can stop trading on a stale book instead of
+trading on a wrong one.
+"""
+from typing import Dict, List, Optional, Tuple
+import math
+import threading
+import time
+from config import POSITION_BOOK_MAX_AGE_SECONDS
+
+class PositionBook:
+    """
+    Positions and open orders per symbol, refreshed in bulk from a broker API.
+
+    Example:
+        >>> book = PositionBook(api)
+        >>> book.refresh()
+        >>> book.has_position('AAPL'), book.has_open_order('AAPL')
+        (True, False)
+    """
+
+    def __init__(self, api, max_age: float = POSITION_BOOK_MAX_AGE_SECONDS):
+        """
+        Initialize an empty book.
+
+        Args:
+            api: Alpaca REST client, or anything with list_positions() and list_orders()
+            max_age (float): Seconds after a refresh before the book counts as stale
+        """
+        self.api = api
+        self.max_age = max_age
+        self.positions: Dict[str, Dict] = {}
+        self.orders: Dict[str, List] = {}
+        self.refreshed_at: Optional[float] = None
+        self._recorded: List[Tuple[float, object]] = []  # (time.monotonic(), order) from record_order
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+
+    def refresh(self) -> None:
+        """
+        Reload every position and open order with one call each.
+
+        The calls are made outside the lock, so orders recorded after the refresh
+        started may be missing from the API's answer; they are kept in the new book.
+
+        Raises:
+            Exception: The API error; the book keeps its previous contents and age
+        """
+        started = time.monotonic()
+        positions = self.api.list_positions()
+        orders = self.api.list_orders(status='open')
+        by_symbol = {}
+        for order in orders:
+            by_symbol.setdefault(order.symbol, []).append(order)
+        known = {order.id for order in orders}
+        with self._lock:
+            self._recorded = [(recorded_at, order) for recorded_at, order in self._recorded if recorded_at >= started]
+            for _, order in self._recorded:
+                if order.id not in known:
+                    by_symbol.setdefault(order.symbol, []).append(order)
+            self.positions = {
+                position.symbol: {
+                    'qty': float(position.qty),
+                    'avg_entry_price': float(position.avg_entry_price)
+                }
+                for position in positions
+            }
+            self.orders = by_symbol
+            self.refreshed_at = time.monotonic()
+
+    def refresh_if_older(self, seconds: float) -> None:
+        """Refresh unless the book is at most seconds old; concurrent callers trigger one refresh."""
+        with self._refresh_lock:
+            if self.age > seconds:
+                self.refresh()
+
+    @property
+    def age(self) -> float:
+        """Seconds since the last successful refresh, infinite before the first one."""
+        if self.refreshed_at is None:
+            return math.inf
+        return time.monotonic() - self.refreshed_at
+
+    @property
+    def is_stale(self) -> bool:
+        return self.age > self.max_age
+
+    def get(self, symbol: str) -> Optional[Dict]:
+        """Return a symbol's position as {'qty', 'avg_entry_price'}, or None if flat."""
+        with self._lock:
+            position = self.positions.get(symbol)
+            return dict(position) if position else None
+
+    def has_position(self, symbol: str) -> bool:
+        return self.get(symbol) is not None
+
+    def open_orders(self, symbol: str) -> List:
+        """Return the symbol's open orders."""
+        with self._lock:
+            return list(self.orders.get(symbol, []))
+
+    def has_open_order(self, symbol: str) -> bool:
+        return bool(self.open_orders(symbol))
+
+    def record_order(self, order) -> None:
+        """Add an order the bot just submitted, so it is seen before the next refresh."""
+        with self._lock:
+            self.orders.setdefault(order.symbol, []).append(order)
+            self._recorded.append((time.monotonic(), order))
@@ -0,0 +1,342 @@
+"""
+Module for market data providers and concurrent, rate-limited fetching.
+
+Ingestion talks to a DataProvider instead of calling yfinance directly, so the
+same code runs against Yahoo Finance or against a local StaticProvider in tests.
+fetch_symbols fetches many symbols from a bounded thread pool; every request goes
+through the provider host's token-bucket RateLimiter and is retried with
+exponential backoff when it fails.
+"""
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+import multiprocessing
+import random
+import threading
+import time
+import pandas as pd
+from market_calendar import exchange_wall_clock
+from config import (
+    INGEST_MAX_WORKERS,
+    PROVIDER_BACKOFF_SECONDS,
+    PROVIDER_BURST,
+    PROVIDER_MAX_RETRIES,
+    PROVIDER_REQUESTS_PER_SECOND
+)
+
+class DataProvider(ABC):
+    """Source of 1-minute bars and company names. Subclasses set `host` and implement both fetches."""
+
+    # Requests to the same host share one rate limiter; a rate of None means no limit
+    host = 'local'
+    requests_per_second: Optional[float] = PROVIDER_REQUESTS_PER_SECOND
+    burst: int = PROVIDER_BURST
+
+    @abstractmethod
+    def fetch_bars(
+        self,
+        symbol: str,
+        period: str = '7d',
+        interval: str = '1m',
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> pd.DataFrame:
+        """
+        Fetch OHLCV bars for a symbol, over the last period or, if start is given, over [start, end).
+
+        Returns:
+            pd.DataFrame: yfinance-style frame with Open, High, Low, Close and Volume
+                columns indexed by bar start time; empty if there is no data
+        """
+
+    @abstractmethod
+    def fetch_company_name(self, symbol: str) -> Optional[str]:
+        """Fetch the company name of a symbol, or None if unknown."""
+
+class YFinanceProvider(DataProvider):
+    """Bars and company names from Yahoo Finance."""
+
+    host = 'query1.finance.yahoo.com'
+
+    def fetch_bars(self, symbol: str, period: str = '7d', interval: str = '1m',
+                   start: Optional[datetime] = None, end: Optional[datetime] = None) -> pd.DataFrame:
+        import yfinance as yf
+        if start is not None:
+            return yf.Ticker(symbol).history(start=start, end=end, interval=interval)
+        return yf.Ticker(symbol).history(period=period, interval=interval)
+
+    def fetch_company_name(self, symbol: str) -> Optional[str]:
+        import yfinance as yf
+        return yf.Ticker(symbol).info.get('longName')
+
+class StaticProvider(DataProvider):
+    """
+    Serves prepared DataFrames, for tests and offline runs.
+
+    Example:
+        >>> provider = StaticProvider({'AAPL': generate_intraday_data()}, latency=0.05)
+        >>> fetcher = DataFetcher(provider=provider)
+    """
+
+    def __init__(
+        self,
+        frames: Dict[str, pd.DataFrame],
+        company_names: Optional[Dict[str, str]] = None,
+        latency: float = 0.0,
+        failures: Optional[Dict[str, int]] = None,
+        requests_per_second: Optional[float] = None
+    ):
+        """
+        Initialize the provider.
+
+        Args:
+            frames (Dict[str, pd.DataFrame]): Bars to serve per symbol
+            company_names (Dict[str, str]): Company names per symbol
+            latency (float): Seconds each bar fetch takes, to simulate network time
+            failures (Dict[str, int]): Number of times fetching a symbol's bars fails
+                before it succeeds, to exercise retries
+            requests_per_second (float): Rate limit to apply, None for no limit
+        """
+        self.frames = frames
+        self.company_names = company_names or {}
+        self.latency = latency
+        self.failures = dict(failures or {})
+        self.requests_per_second = requests_per_second
+        self.calls = []
+        self.windows = []
+        self.metadata_calls = []
+        self._lock = threading.Lock()
+
+    def fetch_bars(self, symbol: str, period: str = '7d', interval: str = '1m',
+                   start: Optional[datetime] = None, end: Optional[datetime] = None) -> pd.DataFrame:
+        with self._lock:
+            self.calls.append(symbol)
+            self.windows.append((symbol, start, end))
+            failing = self.failures.get(symbol, 0) > 0
+            if failing:
+                self.failures[symbol] -= 1
+        if self.latency:
+            time.sleep(self.latency)
+        if failing:
+            raise ConnectionError(f"Simulated failure fetching {symbol}")
+        if symbol not in self.frames:
+            return pd.DataFrame(columns=['Open', 'High', 'Low', 'Close', 'Volume'], index=pd.DatetimeIndex([]))
+        data = self.frames[symbol]
+        if start is not None:
+            wall_clock = exchange_wall_clock(data.index)
+            data = data[(wall_clock >= start) & ((wall_clock < end) if end is not None else True)]
+        return data.copy()
+
+    def fetch_company_name(self, symbol: str) -> Optional[str]:
+        with self._lock:
+            self.metadata_calls.append(symbol)
+        return self.company_names.get(symbol)
+
+class RateLimiter:
+    """Thread-safe token bucket: `rate` requests per second on average, bursts of up to `burst`."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        if rate <= 0 or burst < 1:
+            raise ValueError("Rate must be positive and burst at least 1")
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """
+        Block until a request may be made.
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+class SharedRateLimiter(RateLimiter):
+    """
+    RateLimiter whose bucket lives in shared memory, so that worker processes forked
+    after it is created all draw on one budget.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        if rate <= 0 or burst < 1:
+            raise ValueError("Rate must be positive and burst at least 1")
+        self.rate = rate
+        self.burst = burst
+        # time.monotonic() is system-wide, so it is comparable across processes
+        self._state = multiprocessing.Array('d', [float(burst), time.monotonic()])
+        self._lock = self._state.get_lock()
+
+    @property
+    def tokens(self) -> float:
+        return self._state[0]
+
+    @tokens.setter
+    def tokens(self, value: float) -> None:
+        self._state[0] = value
+
+    @property
+    def updated(self) -> float:
+        return self._state[1]
+
+    @updated.setter
+    def updated(self, value: float) -> None:
+        self._state[1] = value
+
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+def get_rate_limiter(provider: DataProvider) -> Optional[RateLimiter]:
+    """
+    Return the process-wide rate limiter of a provider's host, creating it on first use.
+
+    Returns:
+        RateLimiter: The host's limiter, or None if the provider has no rate limit
+    """
+    if provider.requests_per_second is None:
+        return None
+    with _limiters_lock:
+        limiter = _limiters.get(provider.host)
+        if limiter is None:
+            limiter = _limiters[provider.host] = RateLimiter(provider.requests_per_second, provider.burst)
+        return limiter
+
+def call_with_retry(
+    func: Callable,
+    *args,
+    limiter: Optional[RateLimiter] = None,
+    max_retries: int = PROVIDER_MAX_RETRIES,
+    backoff: float = PROVIDER_BACKOFF_SECONDS,
+    **kwargs
+):
+    """
+    Call func, waiting on the rate limiter before every attempt and backing off between retries.
+
+    The delay doubles with every retry, with up to 50% random jitter so that many
+    workers failing together do not retry in lockstep.
+
+    Raises:
+        Exception: The last error once max_retries retries have failed
+    """
+    for attempt in range(max_retries + 1):
+        if limiter is not None:
+            limiter.acquire()
+        try:
+            return func(*args, **kwargs)
+        except Exception as e:
+            if attempt == max_retries:
+                raise
+            delay = backoff * 2 ** attempt * (1 + random.random() / 2)
+            print(f"{getattr(func, '__name__', 'Request')} failed ({e}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+class FetchResult(NamedTuple):
+    """
+    Outcome of fetching one symbol; data and company_name are None when error is set.
+
+    company_name is None when metadata was not fetched, and '' when it was fetched
+    but the provider has no name, matching Database.upsert_symbols.
+    """
+    symbol: str
+    data: Optional[pd.DataFrame]
+    company_name: Optional[str]
+    error: Optional[str]
+
+def fetch_symbol(
+    provider: DataProvider,
+    symbol: str,
+    period: str = '7d',
+    limiter: Optional[RateLimiter] = None,
+    max_retries: int = PROVIDER_MAX_RETRIES,
+    backoff: float = PROVIDER_BACKOFF_SECONDS,
+    windows: Optional[List[Tuple[datetime, datetime]]] = None,
+    fetch_metadata: bool = True
+) -> FetchResult:
+    """
+    Fetch one symbol's bars and company name with rate limiting and retries.
+
+    With windows, only those [start, end) ranges are requested, one request each,
+    instead of the whole period; an empty list fetches nothing. The company name is
+    only requested with fetch_metadata, and only for symbols that returned bars.
+    """
+    limiter = limiter or get_rate_limiter(provider)
+    try:
+        if windows is None:
+            data = call_with_retry(provider.fetch_bars, symbol, period,
+                                   limiter=limiter, max_retries=max_retries, backoff=backoff)
+        else:
+            frames = [
+                call_with_retry(provider.fetch_bars, symbol, period, start=start, end=end,
+                                limiter=limiter, max_retries=max_retries, backoff=backoff)
+                for start, end in windows
+            ]
+            frames = [frame for frame in frames if not frame.empty]
+            if frames:
+                data = pd.concat(frames).sort_index()
+                data = data[~data.index.duplicated(keep='last')]
+            else:
+                data = pd.DataFrame(columns=['Open', 'High', 'Low', 'Close', 'Volume'], index=pd.DatetimeIndex([]))
+        company_name = None
+        if fetch_metadata and not data.empty:
+            company_name = call_with_retry(provider.fetch_company_name, symbol,
+                                           limiter=limiter, max_retries=max_retries, backoff=backoff) or ''
+        return FetchResult(symbol, data, company_name, None)
+    except Exception as e:
+        return FetchResult(symbol, None, None, str(e))
+
+def fetch_symbols(
+    provider: DataProvider,
+    symbols: List[str],
+    period: str = '7d',
+    max_workers: int = INGEST_MAX_WORKERS,
+    limiter: Optional[RateLimiter] = None,
+    max_retries: int = PROVIDER_MAX_RETRIES,
+    backoff: float = PROVIDER_BACKOFF_SECONDS,
+    windows: Optional[Dict[str, List[Tuple[datetime, datetime]]]] = None,
+    metadata_symbols: Optional[set] = None
+) -> Iterator[FetchResult]:
+    """
+    Fetch many symbols concurrently, yielding each result as soon as it arrives.
+
+    Only network calls run on the pool; the caller consumes results on its own
+    thread, so database writes stay on one session and overlap with fetching.
+
+    Args:
+        provider (DataProvider): Where to fetch from
+        symbols (List[str]): Symbols to fetch
+        period (str): History period, e.g. '7d'
+        max_workers (int): Maximum concurrent fetches
+        limiter (RateLimiter): Rate limiter, defaults to the provider host's
+        max_retries (int): Retries per request
+        backoff (float): First retry delay in seconds
+        windows (Dict): Per symbol, the [start, end) ranges to fetch instead of the
+            whole period; symbols not in it get the whole period
+        metadata_symbols (set): Symbols whose company name should be fetched, e.g.
+            from Database.get_stale_symbols (default: all)
+
+    Yields:
+        FetchResult: One per symbol, in completion order
+    """
+    limiter = limiter or get_rate_limiter(provider)
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = [
+            executor.submit(fetch_symbol, provider, symbol, period, limiter, max_retries, backoff,
+                            None if windows is None else windows.get(symbol),
+                            metadata_symbols is None or symbol in metadata_symbols)
+            for symbol in symbols
+        ]
+        for future in as_completed(futures):
+            yield future.result()
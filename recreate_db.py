@@ -1,12 +1,11 @@
-from database import Base, Database
+from database import Base, get_engine, init_schema
 from db_config import DATABASE_URL
-from sqlalchemy import create_engine
 
 def recreate_database():
     print("Recreating database...")
     
     # Create engine
-    engine = create_engine(DATABASE_URL)
+    engine = get_engine(DATABASE_URL)
     
     # Drop all tables
     print("Dropping existing tables...")
@@ -14,7 +13,7 @@ def recreate_database():
     
     # Create new tables
     print("Creating new tables...")
-    Base.metadata.create_all(engine)
+    init_schema(engine)
     
     print("Database recreation complete!")
 
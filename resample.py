@@ -0,0 +1,71 @@
+"""
+Module for aggregating 1-minute bars into arbitrary ticker_time bars in memory.
+
+Bars are grouped into ticker_time buckets counted from each day's session open and
+reduced with NumPy reduceat, so any timeframe (3m, 7m, 45m, ...) is available without
+a rollup table or a pandas resample round-trip.
+"""
+from datetime import time
+import numpy as np
+from bar_series import BarSeries
+
+SESSION_OPEN = time(9, 30)
+
+def timeframe_minutes(timeframe: str) -> int:
+    """
+    Convert a yfinance-style timeframe such as '1m', '15m' or '1h' to minutes.
+
+    Raises:
+        ValueError: If the timeframe is not a whole number of minutes or hours
+    """
+    units = {'m': 1, 'h': 60}
+    number, unit = timeframe[:-1], timeframe[-1:]
+    if unit not in units or not number.isdigit() or int(number) < 1:
+        raise ValueError(f"Unsupported timeframe: {timeframe}")
+    return int(number) * units[unit]
+
+def resample_bars(
+    bars: BarSeries,
+    ticker_time: int,
+    session_open: time = SESSION_OPEN
+) -> BarSeries:
+    """
+    Aggregate 1-minute bars into ticker_time bars aligned to the session open.
+
+    Each bucket takes the first open, highest high, lowest low, last close and the
+    summed volume of its 1-minute bars. Buckets never span two days; the last bucket
+    of a session may be shorter than ticker_time.
+
+    Args:
+        bars (BarSeries): 1-minute bars as returned by indicators.load_symbol_bars,
+            ordered by start time
+        ticker_time (int): Bucket length in minutes
+        session_open (time): Time of day buckets are counted from (default: 09:30)
+
+    Returns:
+        BarSeries: Aggregated bars, where 'id' is the id of the first 1-minute bar in each bucket
+    """
+    if ticker_time < 1:
+        raise ValueError("ticker_time must be at least one minute")
+
+    minutes = bars.timestamp // 60_000_000_000
+    if len(minutes) == 0:
+        return bars[:0]
+
+    day_start = minutes - minutes % 1440
+    open_minute = day_start + session_open.hour * 60 + session_open.minute
+    bucket = open_minute + np.floor_divide(minutes - open_minute, ticker_time) * ticker_time
+
+    # Index of the first 1-minute bar of every bucket
+    starts = np.flatnonzero(np.concatenate(([True], bucket[1:] != bucket[:-1])))
+    ends = np.concatenate((starts[1:], [len(minutes)])) - 1
+
+    return BarSeries(
+        bucket[starts] * 60_000_000_000,
+        bars.open[starts],
+        np.maximum.reduceat(bars.high, starts),
+        np.minimum.reduceat(bars.low, starts),
+        bars.close[ends],
+        np.add.reduceat(bars.volume, starts),
+        id=bars.id[starts]
+    )
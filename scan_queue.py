@@ -0,0 +1,306 @@
+"""
+Module for coordinating breakout scans across machines that share one database.
+
+Scan work is split into per-symbol (or per-symbol-day) jobs in the scan_jobs table.
+Workers claim jobs with SELECT ... FOR UPDATE SKIP LOCKED on PostgreSQL, keep their
+lease alive with heartbeats, and jobs whose lease expires are handed to another
+worker. Breakout writes are idempotent, so a job that runs twice stores nothing twice.
+"""
+from typing import Callable, Dict, Optional
+from datetime import date, datetime, timedelta
+import argparse
+import os
+import socket
+import threading
+import time
+from sqlalchemy import func, update
+from database import Database, ScanJob, TimeInterval, init_schema
+from calculate_breakouts import scan_symbol_incremental, scan_symbol_day
+
+ACTIVE_STATUSES = ('pending', 'running')
+
+def _run_breakout_job(db: Database, job: ScanJob) -> None:
+    """Run a breakout scan job for one symbol, or one symbol-day."""
+    params = (job.ticker_time, job.lookback_period, job.volume_ratio_threshold)
+    if job.trading_day is None:
+        scan_symbol_incremental(db, job.symbol_id, *params)
+    else:
+        scan_symbol_day(db, job.symbol_id, job.trading_day, *params)
+
+# Job type -> handler, new job types register a handler here
+JOB_HANDLERS: Dict[str, Callable[[Database, ScanJob], None]] = {
+    'breakouts': _run_breakout_job
+}
+
+def enqueue_scan_jobs(
+    db: Database,
+    ticker_time: int = 5,
+    lookback_period: int = 20,
+    volume_ratio_threshold: float = 10.0,
+    per_day: bool = False,
+    job_type: str = 'breakouts'
+) -> int:
+    """
+    Queue a scan job for every symbol with bars, or every symbol-day when per_day is set.
+
+    Jobs that are already pending or running for the same key are not queued again.
+
+    Args:
+        db (Database): Open database connection
+        ticker_time (int): Time interval in minutes (default: 5)
+        lookback_period (int): Number of bars to look back (default: 20)
+        volume_ratio_threshold (float): Minimum ratio of current volume to adjusted SMA (default: 10.0)
+        per_day (bool): Queue one job per symbol and trading day instead of per symbol
+        job_type (str): Type of job to queue, a key of JOB_HANDLERS
+
+    Returns:
+        int: Number of jobs queued
+    """
+    if job_type not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job type {job_type}")
+
+    if per_day:
+        keys = db.session.query(TimeInterval.symbol_id, func.date(TimeInterval.start_time))\
+            .distinct().all()
+        # SQLite returns dates as strings
+        keys = [(symbol_id, date.fromisoformat(day) if isinstance(day, str) else day) for symbol_id, day in keys]
+    else:
+        keys = [(symbol_id, None) for (symbol_id,) in db.session.query(TimeInterval.symbol_id).distinct()]
+
+    active = set(db.session.query(ScanJob.symbol_id, ScanJob.trading_day).filter(
+        ScanJob.job_type == job_type,
+        ScanJob.status.in_(ACTIVE_STATUSES),
+        ScanJob.ticker_time == ticker_time,
+        ScanJob.lookback_period == lookback_period,
+        ScanJob.volume_ratio_threshold == volume_ratio_threshold
+    ).all())
+
+    jobs = [
+        ScanJob(
+            job_type=job_type,
+            symbol_id=symbol_id,
+            trading_day=trading_day,
+            ticker_time=ticker_time,
+            lookback_period=lookback_period,
+            volume_ratio_threshold=volume_ratio_threshold,
+            status='pending'
+        )
+        for symbol_id, trading_day in sorted(keys, key=lambda key: (key[0], key[1] or date.min))
+        if (symbol_id, trading_day) not in active
+    ]
+    db.session.add_all(jobs)
+    db.session.commit()
+    return len(jobs)
+
+def claim_job(db: Database, worker_id: str, lease_seconds: int = 300) -> Optional[ScanJob]:
+    """
+    Claim the oldest pending job for a worker.
+
+    PostgreSQL uses SELECT ... FOR UPDATE SKIP LOCKED so concurrent workers never wait
+    on each other. Other databases fall back to a conditional UPDATE that only succeeds
+    while the job is still pending, retrying with the next candidate if another worker won.
+
+    Args:
+        db (Database): Open database connection
+        worker_id (str): Unique name of the claiming worker
+        lease_seconds (int): How long the claim lasts without a heartbeat
+
+    Returns:
+        ScanJob: The claimed job, or None if no job is pending
+    """
+    now = datetime.utcnow()
+    claim = {
+        'status': 'running',
+        'lease_owner': worker_id,
+        'lease_expires_at': now + timedelta(seconds=lease_seconds),
+        'heartbeat_at': now,
+        'attempts': ScanJob.attempts + 1,
+        'updated_at': now
+    }
+    pending = db.session.query(ScanJob).filter(ScanJob.status == 'pending').order_by(ScanJob.id)
+
+    if db.engine.dialect.name == 'postgresql':
+        job = pending.with_for_update(skip_locked=True).first()
+        if job is None:
+            db.session.commit()
+            return None
+        db.session.execute(update(ScanJob).where(ScanJob.id == job.id).values(**claim))
+        db.session.commit()
+        return db.session.get(ScanJob, job.id, populate_existing=True)
+
+    candidates = [job_id for (job_id,) in pending.with_entities(ScanJob.id).limit(10)]
+    for job_id in candidates:
+        result = db.session.execute(
+            update(ScanJob).where(ScanJob.id == job_id, ScanJob.status == 'pending').values(**claim)
+        )
+        db.session.commit()
+        if result.rowcount == 1:
+            return db.session.get(ScanJob, job_id, populate_existing=True)
+    return None
+
+def heartbeat(db: Database, job_id: int, worker_id: str, lease_seconds: int = 300) -> bool:
+    """
+    Extend a running job's lease.
+
+    Returns:
+        bool: False if the worker no longer owns the job, e.g. because its lease expired and was reclaimed
+    """
+    now = datetime.utcnow()
+    result = db.session.execute(update(ScanJob).where(
+        ScanJob.id == job_id,
+        ScanJob.lease_owner == worker_id,
+        ScanJob.status == 'running'
+    ).values(heartbeat_at=now, lease_expires_at=now + timedelta(seconds=lease_seconds), updated_at=now))
+    db.session.commit()
+    return result.rowcount == 1
+
+def complete_job(db: Database, job_id: int, worker_id: str, error: Optional[str] = None) -> bool:
+    """
+    Mark a job done, or failed with an error message, if the worker still owns it.
+
+    Returns:
+        bool: False if the job was reclaimed by another worker in the meantime
+    """
+    result = db.session.execute(update(ScanJob).where(
+        ScanJob.id == job_id,
+        ScanJob.lease_owner == worker_id,
+        ScanJob.status == 'running'
+    ).values(
+        status='failed' if error else 'done',
+        last_error=error,
+        lease_expires_at=None,
+        updated_at=datetime.utcnow()
+    ))
+    db.session.commit()
+    return result.rowcount == 1
+
+def reclaim_stale_jobs(db: Database, max_attempts: int = 3) -> int:
+    """
+    Return running jobs with an expired lease to the queue.
+
+    Jobs that have already been attempted max_attempts times are marked failed instead.
+
+    Returns:
+        int: Number of jobs reclaimed or failed
+    """
+    now = datetime.utcnow()
+    expired = (ScanJob.status == 'running', ScanJob.lease_expires_at < now)
+    failed = db.session.execute(update(ScanJob).where(*expired, ScanJob.attempts >= max_attempts).values(
+        status='failed', last_error='Lease expired', lease_owner=None, lease_expires_at=None, updated_at=now
+    )).rowcount
+    requeued = db.session.execute(update(ScanJob).where(*expired).values(
+        status='pending', lease_owner=None, lease_expires_at=None, updated_at=now
+    )).rowcount
+    db.session.commit()
+    return failed + requeued
+
+class _Heartbeat(threading.Thread):
+    """Background thread that keeps a job's lease alive with its own database connection."""
+
+    def __init__(self, db_url: str, job_id: int, worker_id: str, lease_seconds: int):
+        super().__init__(daemon=True)
+        self.db_url = db_url
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self.lease_seconds = lease_seconds
+        self.stopped = threading.Event()
+        self.lost = False
+
+    def run(self):
+        db = Database(self.db_url)
+        try:
+            while not self.stopped.wait(self.lease_seconds / 3):
+                if not heartbeat(db, self.job_id, self.worker_id, self.lease_seconds):
+                    self.lost = True
+                    return
+        finally:
+            db.close()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+def run_worker(
+    db_url: str,
+    worker_id: Optional[str] = None,
+    lease_seconds: int = 300,
+    poll_interval: float = 5.0,
+    max_attempts: int = 3,
+    stop_when_empty: bool = False
+) -> int:
+    """
+    Claim and run scan jobs until stopped, or until the queue is empty with stop_when_empty.
+
+    Args:
+        db_url (str): Database URL shared by all workers
+        worker_id (str): Unique worker name, defaults to hostname and process id
+        lease_seconds (int): Lease length, renewed by a heartbeat every third of it
+        poll_interval (float): Seconds to wait before polling an empty queue again
+        max_attempts (int): Attempts after which an expired job is marked failed
+        stop_when_empty (bool): Return as soon as no job is pending
+
+    Returns:
+        int: Number of jobs this worker completed
+    """
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    db = Database(db_url)
+    completed = 0
+
+    try:
+        while True:
+            reclaim_stale_jobs(db, max_attempts)
+            job = claim_job(db, worker_id, lease_seconds)
+            if job is None:
+                if stop_when_empty:
+                    return completed
+                time.sleep(poll_interval)
+                continue
+
+            beat = _Heartbeat(db_url, job.id, worker_id, lease_seconds)
+            beat.start()
+            error = None
+            try:
+                JOB_HANDLERS[job.job_type](db, job)
+            except Exception as e:
+                db.session.rollback()
+                error = str(e)
+                print(f"Job {job.id} failed on {worker_id}: {error}")
+            finally:
+                beat.stop()
+
+            if beat.lost:
+                print(f"Job {job.id} lease was lost by {worker_id}, leaving it to its new owner")
+            elif complete_job(db, job.id, worker_id, error) and not error:
+                completed += 1
+
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Distributed breakout scan queue")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    enqueue_parser = subparsers.add_parser('enqueue', help="Queue scan jobs for every symbol")
+    enqueue_parser.add_argument('--ticker-time', type=int, default=5, help="Time interval in minutes")
+    enqueue_parser.add_argument('--lookback', type=int, default=20, help="Number of bars to look back")
+    enqueue_parser.add_argument('--threshold', type=float, default=10.0, help="Minimum volume to adjusted SMA ratio")
+    enqueue_parser.add_argument('--per-day', action='store_true', help="Queue one job per symbol and trading day")
+
+    work_parser = subparsers.add_parser('work', help="Run a worker that claims and runs scan jobs")
+    work_parser.add_argument('--worker-id', help="Unique worker name (default: hostname-pid)")
+    work_parser.add_argument('--lease', type=int, default=300, help="Lease length in seconds")
+    work_parser.add_argument('--stop-when-empty', action='store_true', help="Exit once the queue is empty")
+
+    args = parser.parse_args()
+    init_schema()
+    db = Database()
+    try:
+        if args.command == 'enqueue':
+            count = enqueue_scan_jobs(db, args.ticker_time, args.lookback, args.threshold, args.per_day)
+            print(f"Queued {count} scan jobs")
+        else:
+            url = db.engine.url.render_as_string(hide_password=False)
+            count = run_worker(url, args.worker_id, args.lease, stop_when_empty=args.stop_when_empty)
+            print(f"Worker completed {count} jobs")
+    finally:
+        db.close()
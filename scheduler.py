@@ -0,0 +1,438 @@
+"""
+Module for the long-running ingestion scheduler that keeps the whole symbol universe current.
+
+The universe is every active row of the symbols table. It is split into shards by
+a stable hash of the symbol, and each shard runs in its own worker process. A
+shard wakes up just after every bar closes during market hours, as given by a
+MarketCalendar, and fetches the bars after each symbol's latest stored one; gaps
+further back are looked for once per session and every few cycles. All shards
+share one request rate budget and one in-flight request budget, so adding shards
+adds parallelism without exceeding what the data provider allows. After every
+cycle a shard reports how far its data lags behind the clock.
+"""
+from typing import Dict, List, Optional
+from datetime import datetime, timedelta
+import argparse
+import multiprocessing
+import queue
+import time
+import zlib
+import numpy as np
+from config import (
+    PROVIDER_BURST,
+    SCHEDULER_BACKFILL_CYCLES,
+    SCHEDULER_BAR_MINUTES,
+    SCHEDULER_MAX_CONCURRENCY,
+    SCHEDULER_REQUESTS_PER_SECOND,
+    SCHEDULER_SETTLE_SECONDS,
+    SCHEDULER_SHARDS
+)
+from data_fetcher import DataFetcher, plan_fetch_windows
+from database import Database, Symbol, init_schema
+from db_config import DATABASE_URL
+from market_calendar import MarketCalendar, NYSECalendar, exchange_wall_clock
+from providers import DataProvider, RateLimiter, SharedRateLimiter, YFinanceProvider
+
+# How far ahead next_refresh looks for a session, enough to cover any run of holidays
+SESSION_LOOKAHEAD_DAYS = 14
+
+def shard_of(symbol: str, shards: int) -> int:
+    """Return the shard a symbol belongs to; CRC-32 keeps it the same across processes and runs."""
+    return zlib.crc32(symbol.encode()) % shards
+
+def load_universe(db: Database, shard: int = 0, shards: int = 1) -> List[str]:
+    """
+    Load the active symbols of one shard.
+
+    Args:
+        db (Database): Database holding the symbols table
+        shard (int): Shard to load, from 0 to shards - 1
+        shards (int): Number of shards the universe is split into
+
+    Returns:
+        List[str]: The shard's active symbols, sorted
+    """
+    symbols = [row.symbol for row in db.session.query(Symbol.symbol).filter(Symbol.is_active.is_(True))]
+    return sorted(symbol for symbol in symbols if shard_of(symbol, shards) == shard)
+
+def next_refresh(
+    calendar: MarketCalendar,
+    now: datetime,
+    bar_minutes: int = SCHEDULER_BAR_MINUTES,
+    settle_seconds: float = SCHEDULER_SETTLE_SECONDS
+) -> datetime:
+    """
+    Find the next time a refresh should run: settle_seconds after a bar closes, in a session.
+
+    Bars are aligned to the session open, so with 5-minute bars the refreshes of a
+    09:30-16:00 session run just after 09:35, 09:40, ... 16:00.
+
+    Args:
+        calendar (MarketCalendar): Calendar giving the sessions
+        now (datetime): Current exchange-local time
+        bar_minutes (int): Bar length in minutes
+        settle_seconds (float): Delay after a bar closes before fetching it
+
+    Returns:
+        datetime: Exchange-local time of the next refresh, after now
+
+    Raises:
+        ValueError: If the calendar has no session in the next SESSION_LOOKAHEAD_DAYS days
+    """
+    bar = timedelta(minutes=bar_minutes)
+    settle = timedelta(seconds=settle_seconds)
+    for open_time, close_time in calendar.sessions(now.date(), now.date() + timedelta(days=SESSION_LOOKAHEAD_DAYS)):
+        last = close_time + settle
+        if now >= last:
+            continue
+        first = open_time + bar + settle
+        if now < first:
+            return first
+        bars_closed = (now - open_time - settle) // bar
+        return min(open_time + (bars_closed + 1) * bar + settle, last)
+    raise ValueError(f"No trading session within {SESSION_LOOKAHEAD_DAYS} days of {now}")
+
+class ConcurrencyLimitedProvider(DataProvider):
+    """Wraps a provider so that at most as many requests as a semaphore allows are in flight at once."""
+
+    def __init__(self, provider: DataProvider, semaphore):
+        """
+        Initialize the wrapper.
+
+        Args:
+            provider (DataProvider): Provider to forward requests to
+            semaphore: Semaphore held during every request, e.g. a multiprocessing.BoundedSemaphore
+                shared by every shard
+        """
+        self.provider = provider
+        self.semaphore = semaphore
+        self.host = provider.host
+        self.requests_per_second = provider.requests_per_second
+        self.burst = provider.burst
+
+    def fetch_bars(self, *args, **kwargs):
+        with self.semaphore:
+            return self.provider.fetch_bars(*args, **kwargs)
+
+    def fetch_company_name(self, symbol: str) -> Optional[str]:
+        with self.semaphore:
+            return self.provider.fetch_company_name(symbol)
+
+class ShardMetrics:
+    """Counters and lag of one shard's refresh cycles."""
+
+    def __init__(self, shard: int):
+        self.shard = shard
+        self.cycles = 0
+        self.overruns = 0
+        self.backfills = 0
+        self.symbols = 0
+        self.failed = 0
+        self.missing = 0
+        self.cycle_seconds = 0.0
+        self.schedule_delay_seconds = 0.0
+        self.lag_median_seconds = 0.0
+        self.lag_max_seconds = 0.0
+
+    def record_cycle(
+        self,
+        symbols: int,
+        failed: int,
+        lags: np.ndarray,
+        cycle_seconds: float,
+        schedule_delay_seconds: float,
+        overran: bool,
+        backfilled: bool = False
+    ) -> None:
+        """
+        Record one finished cycle.
+
+        Args:
+            symbols (int): Symbols in the shard
+            failed (int): Symbols whose fetch or save failed
+            lags (np.ndarray): Seconds between the end of each symbol's latest stored bar
+                and the end of the cycle; symbols without bars are left out
+            cycle_seconds (float): How long the cycle took
+            schedule_delay_seconds (float): How late the cycle started
+            overran (bool): Whether the cycle ended after the next one was due
+            backfilled (bool): Whether the cycle also looked for gaps in recent history
+        """
+        self.cycles += 1
+        self.overruns += int(overran)
+        self.backfills += int(backfilled)
+        self.symbols = symbols
+        self.failed = failed
+        self.missing = symbols - len(lags)
+        self.cycle_seconds = cycle_seconds
+        self.schedule_delay_seconds = schedule_delay_seconds
+        self.lag_median_seconds = float(np.median(lags)) if len(lags) else 0.0
+        self.lag_max_seconds = float(lags.max()) if len(lags) else 0.0
+
+    def snapshot(self) -> Dict:
+        """Return the counters as a dict, as sent to the scheduler's metrics queue."""
+        return dict(vars(self))
+
+class ShardWorker:
+    """
+    Refreshes one shard of the universe after every bar close.
+
+    Example:
+        >>> worker = ShardWorker(0, 4, provider=YFinanceProvider())
+        >>> worker.run_cycle()
+        {'shard': 0, 'cycles': 1, 'symbols': 250, 'lag_max_seconds': 7.2, ...}
+    """
+
+    def __init__(
+        self,
+        shard: int,
+        shards: int,
+        provider: Optional[DataProvider] = None,
+        db_url: str = DATABASE_URL,
+        calendar: Optional[MarketCalendar] = None,
+        limiter: Optional[RateLimiter] = None,
+        semaphore=None,
+        period: str = '7d',
+        max_workers: int = SCHEDULER_MAX_CONCURRENCY,
+        bar_minutes: int = SCHEDULER_BAR_MINUTES,
+        settle_seconds: float = SCHEDULER_SETTLE_SECONDS,
+        metrics_queue=None,
+        backfill_cycles: int = SCHEDULER_BACKFILL_CYCLES
+    ):
+        """
+        Initialize the worker.
+
+        Args:
+            shard (int): Shard to refresh
+            shards (int): Number of shards the universe is split into
+            provider (DataProvider): Where to fetch from (default: Yahoo Finance)
+            db_url (str): Database holding the universe and the bars
+            calendar (MarketCalendar): Calendar of the market's sessions (default: NYSE)
+            limiter (RateLimiter): Rate limiter, shared with the other shards
+            semaphore: Semaphore bounding the requests in flight across shards
+            period (str): History period fetched for symbols without any bars
+            max_workers (int): Fetch threads in this shard
+            bar_minutes (int): Bar length in minutes
+            settle_seconds (float): Delay after a bar closes before fetching it
+            metrics_queue: Queue that receives a ShardMetrics snapshot after every cycle
+            backfill_cycles (int): Look for gaps in recent history every this many cycles,
+                besides the first cycle of every session
+        """
+        provider = provider or YFinanceProvider()
+        self.provider = provider if semaphore is None else ConcurrencyLimitedProvider(provider, semaphore)
+        self.shard = shard
+        self.shards = shards
+        self.db_url = db_url
+        self.calendar = calendar or NYSECalendar()
+        self.limiter = limiter
+        self.period = period
+        self.max_workers = max_workers
+        self.bar_minutes = bar_minutes
+        self.settle_seconds = settle_seconds
+        self.metrics_queue = metrics_queue
+        self.backfill_cycles = max(1, backfill_cycles)
+        self.metrics = ShardMetrics(shard)
+        self._last_backfill = None  # (session date, cycle number) of the last gap backfill
+
+    def _backfill_due(self, now: datetime) -> bool:
+        """A cycle looks for gaps if it is the session's first or backfill_cycles have passed since the last."""
+        if self._last_backfill is None:
+            return True
+        day, cycle = self._last_backfill
+        return now.date() != day or self.metrics.cycles - cycle >= self.backfill_cycles
+
+    def run_cycle(self, scheduled: Optional[datetime] = None) -> Dict:
+        """
+        Fetch the missing bars of every symbol in the shard once.
+
+        The universe is reloaded every cycle, so symbols activated or deactivated in
+        the symbols table are picked up without a restart. A cycle reads every symbol's
+        latest bar in one query and fetches the bars after it; only a backfill cycle,
+        see backfill_cycles, also counts bars per bucket to find older gaps. The lag
+        metrics come from that one query and the fetched bars.
+
+        Args:
+            scheduled (datetime): When the cycle was due, to measure how late it started
+
+        Returns:
+            Dict: The shard's ShardMetrics snapshot after the cycle
+        """
+        started = self.calendar.now()
+        clock = time.monotonic()
+        backfill = self._backfill_due(started)
+        db = Database(self.db_url)
+        try:
+            symbols = load_universe(db, self.shard, self.shards)
+            latest = db.get_latest_start_times(symbols)
+            windows = plan_fetch_windows(db, symbols, self.calendar, started, gaps=backfill, latest=latest)
+            fetcher = DataFetcher(provider=self.provider, db=db, calendar=self.calendar, limiter=self.limiter)
+            results = fetcher.fetch_multiple_symbols(symbols, self.period, self.max_workers, windows=windows)
+        finally:
+            db.close()
+        if backfill:
+            self._last_backfill = (started.date(), self.metrics.cycles)
+        cycle_seconds = time.monotonic() - clock
+        finished = started + timedelta(seconds=cycle_seconds)
+
+        # Fetched bars are stored at exchange time, so compare them at exchange time too
+        for symbol, data in results.items():
+            if data is not None and not data.empty:
+                fetched = exchange_wall_clock(data.index).max().to_pydatetime()
+                latest[symbol] = max(latest.get(symbol, fetched), fetched)
+        bar = timedelta(minutes=self.bar_minutes)
+        lags = np.array([max((finished - (start_time + bar)).total_seconds(), 0.0) for start_time in latest.values()])
+        due = scheduled or started
+        self.metrics.record_cycle(
+            symbols=len(symbols),
+            failed=sum(result is None for result in results.values()),
+            lags=lags,
+            cycle_seconds=cycle_seconds,
+            schedule_delay_seconds=max((started - due).total_seconds(), 0.0),
+            overran=finished > next_refresh(self.calendar, due, self.bar_minutes, self.settle_seconds),
+            backfilled=backfill
+        )
+        snapshot = self.metrics.snapshot()
+        if self.metrics_queue is not None:
+            self.metrics_queue.put(snapshot)
+        return snapshot
+
+    def run(self, stop_event) -> None:
+        """Run a cycle after every bar close until stop_event is set."""
+        while not stop_event.is_set():
+            scheduled = next_refresh(self.calendar, self.calendar.now(), self.bar_minutes, self.settle_seconds)
+            wait = (scheduled - self.calendar.now()).total_seconds()
+            if stop_event.wait(max(wait, 0.0)):
+                return
+            try:
+                self.run_cycle(scheduled)
+            except Exception as e:
+                print(f"Shard {self.shard}: cycle failed: {e}")
+
+def _run_shard(worker: ShardWorker, stop_event) -> None:
+    """Process entry point of a shard."""
+    try:
+        worker.run(stop_event)
+    except KeyboardInterrupt:
+        pass
+
+class IngestScheduler:
+    """
+    Runs one ShardWorker process per shard under shared rate and concurrency budgets.
+
+    Example:
+        >>> scheduler = IngestScheduler(shards=4, requests_per_second=5, max_concurrency=16)
+        >>> scheduler.run()  # until interrupted
+    """
+
+    def __init__(
+        self,
+        provider: Optional[DataProvider] = None,
+        db_url: str = DATABASE_URL,
+        calendar: Optional[MarketCalendar] = None,
+        shards: int = SCHEDULER_SHARDS,
+        max_concurrency: int = SCHEDULER_MAX_CONCURRENCY,
+        requests_per_second: float = SCHEDULER_REQUESTS_PER_SECOND,
+        burst: int = PROVIDER_BURST,
+        period: str = '7d',
+        bar_minutes: int = SCHEDULER_BAR_MINUTES,
+        settle_seconds: float = SCHEDULER_SETTLE_SECONDS
+    ):
+        """
+        Initialize the scheduler.
+
+        Args:
+            provider (DataProvider): Where to fetch from (default: Yahoo Finance)
+            db_url (str): Database holding the universe and the bars
+            calendar (MarketCalendar): Calendar of the market's sessions (default: NYSE)
+            shards (int): Worker processes to split the universe across
+            max_concurrency (int): Requests in flight at once, across all shards
+            requests_per_second (float): Sustained request rate, across all shards
+            burst (int): Requests allowed back to back before the rate limit applies
+            period (str): History period fetched for symbols without any bars
+            bar_minutes (int): Bar length in minutes
+            settle_seconds (float): Delay after a bar closes before fetching it
+        """
+        if shards < 1 or max_concurrency < 1:
+            raise ValueError("Shards and max_concurrency must be at least 1")
+        self.limiter = SharedRateLimiter(requests_per_second, burst)
+        self.semaphore = multiprocessing.BoundedSemaphore(max_concurrency)
+        self.metrics_queue = multiprocessing.Queue()
+        self.stop_event = multiprocessing.Event()
+        self.workers = [
+            ShardWorker(
+                shard, shards, provider, db_url, calendar, self.limiter, self.semaphore, period,
+                max_workers=max(1, max_concurrency // shards), bar_minutes=bar_minutes,
+                settle_seconds=settle_seconds, metrics_queue=self.metrics_queue
+            )
+            for shard in range(shards)
+        ]
+        self.metrics: Dict[int, Dict] = {}
+
+    def report(self) -> None:
+        """Print the latest metrics of every shard that has finished a cycle."""
+        for shard in sorted(self.metrics):
+            m = self.metrics[shard]
+            print(f"shard {shard}: {m['symbols']} symbols, {m['failed']} failed, {m['missing']} without bars, "
+                  f"lag p50 {m['lag_median_seconds']:.0f}s max {m['lag_max_seconds']:.0f}s, "
+                  f"cycle {m['cycle_seconds']:.1f}s, started {m['schedule_delay_seconds']:.1f}s late, "
+                  f"{m['overruns']}/{m['cycles']} cycles overran")
+
+    def run(self, duration: Optional[float] = None) -> Dict[int, Dict]:
+        """
+        Start every shard and collect their metrics until interrupted or duration seconds pass.
+
+        Returns:
+            Dict[int, Dict]: The latest metrics snapshot of every shard
+        """
+        processes = [
+            multiprocessing.Process(target=_run_shard, args=(worker, self.stop_event),
+                                    name=f"shard-{worker.shard}", daemon=True)
+            for worker in self.workers
+        ]
+        for process in processes:
+            process.start()
+        deadline = None if duration is None else time.monotonic() + duration
+
+        try:
+            while deadline is None or time.monotonic() < deadline:
+                try:
+                    snapshot = self.metrics_queue.get(timeout=1.0)
+                except queue.Empty:
+                    continue
+                self.metrics[snapshot['shard']] = snapshot
+                self.report()
+        except KeyboardInterrupt:
+            print("Stopping shards...")
+        finally:
+            self.stop_event.set()
+            for process in processes:
+                process.join()
+        return self.metrics
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Keep every active symbol's 1-minute bars current during market hours")
+    parser.add_argument('--shards', type=int, default=SCHEDULER_SHARDS, help="Worker processes")
+    parser.add_argument('--max-concurrency', type=int, default=SCHEDULER_MAX_CONCURRENCY,
+                        help="Requests in flight across all shards")
+    parser.add_argument('--requests-per-second', type=float, default=SCHEDULER_REQUESTS_PER_SECOND,
+                        help="Request rate across all shards")
+    parser.add_argument('--bar-minutes', type=int, default=SCHEDULER_BAR_MINUTES, help="Refresh after every N-minute bar")
+    parser.add_argument('--period', default='7d', help="History fetched for symbols without bars")
+    parser.add_argument('--add', action='append', default=[], metavar='SYMBOL',
+                        help="Add a symbol to the universe before starting, repeatable")
+    args = parser.parse_args()
+
+    init_schema()
+    if args.add:
+        db = Database()
+        try:
+            db.upsert_symbols({symbol: None for symbol in args.add})
+        finally:
+            db.close()
+
+    IngestScheduler(
+        shards=args.shards,
+        max_concurrency=args.max_concurrency,
+        requests_per_second=args.requests_per_second,
+        period=args.period,
+        bar_minutes=args.bar_minutes
+    ).run()
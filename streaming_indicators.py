@@ -0,0 +1,303 @@
+"""
+Module for incremental indicators that update in constant time per bar.
+
+The live bot used to recompute full rolling columns over its whole history window on
+every loop. These indicators keep running state instead: each update() folds in one
+new value in O(1) (amortized for the rolling max/min), independent of history length.
+Each update also keeps what it replaced, so the last update can be undone in O(1),
+which is how a still-forming bar is revised: undo it and apply the new value.
+"""
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+from collections import deque
+import copy
+import math
+
+class StreamingIndicator(ABC):
+    """Base class for indicators with O(1) update and undo, and snapshot/restore of their state."""
+
+    @abstractmethod
+    def update(self, value: float) -> Optional[float]:
+        """Fold in the next value and return the indicator, or None while warming up."""
+
+    @abstractmethod
+    def undo(self) -> None:
+        """Revert the last update. Only the last update can be undone."""
+
+    @property
+    @abstractmethod
+    def value(self) -> Optional[float]:
+        """Current indicator value, or None while warming up."""
+
+    def snapshot(self) -> Dict:
+        """Return a copy of the indicator state."""
+        return copy.deepcopy(self.__dict__)
+
+    def restore(self, snapshot: Dict) -> None:
+        """Reset the indicator to a state returned by snapshot()."""
+        self.__dict__.update(copy.deepcopy(snapshot))
+
+class RollingSMA(StreamingIndicator):
+    """Simple moving average over the last `period` values, kept as a running sum."""
+
+    def __init__(self, period: int):
+        self.period = period
+        self.window = deque()
+        self.total = 0.0
+        self._undo = None  # (total before the last update, value it evicted or None)
+
+    def update(self, value: float) -> Optional[float]:
+        total = self.total
+        self.window.append(value)
+        self.total += value
+        evicted = None
+        if len(self.window) > self.period:
+            evicted = self.window.popleft()
+            self.total -= evicted
+        self._undo = (total, evicted)
+        return self.value
+
+    def undo(self) -> None:
+        self.total, evicted = self._undo
+        self.window.pop()
+        if evicted is not None:
+            self.window.appendleft(evicted)
+        self._undo = None
+
+    @property
+    def value(self) -> Optional[float]:
+        if len(self.window) < self.period:
+            return None
+        return self.total / self.period
+
+class EMA(StreamingIndicator):
+    """Exponential moving average seeded with the SMA of the first `period` values."""
+
+    def __init__(self, period: int):
+        self.period = period
+        self.multiplier = 2 / (period + 1)
+        self.seed = RollingSMA(period)
+        self.ema = None
+        self._undo = None  # EMA before the last update
+
+    def update(self, value: float) -> Optional[float]:
+        self._undo = self.ema
+        if self.ema is None:
+            self.ema = self.seed.update(value)
+        else:
+            self.ema = value * self.multiplier + self.ema * (1 - self.multiplier)
+        return self.ema
+
+    def undo(self) -> None:
+        if self._undo is None:
+            self.seed.undo()
+        self.ema = self._undo
+        self._undo = None
+
+    @property
+    def value(self) -> Optional[float]:
+        return self.ema
+
+class RSI(StreamingIndicator):
+    """
+    Relative Strength Index over price changes.
+
+    The default rolling mode averages gains and losses over the last `period` changes,
+    matching TradingBot's pandas formula (the first bar counts as a zero change).
+    wilder=True uses Wilder's smoothing, seeded with the rolling averages.
+    """
+
+    def __init__(self, period: int, wilder: bool = False):
+        self.period = period
+        self.wilder = wilder
+        self.previous = None
+        self.gains = RollingSMA(period)
+        self.losses = RollingSMA(period)
+        self.average_gain = None
+        self.average_loss = None
+        self._undo = None  # (previous, average_gain, average_loss, rolled) before the last update
+
+    def update(self, value: float) -> Optional[float]:
+        change = 0.0 if self.previous is None else value - self.previous
+        rolled = not (self.wilder and self.average_gain is not None)
+        self._undo = (self.previous, self.average_gain, self.average_loss, rolled)
+        self.previous = value
+        gain, loss = max(change, 0.0), max(-change, 0.0)
+
+        if rolled:
+            self.average_gain = self.gains.update(gain)
+            self.average_loss = self.losses.update(loss)
+        else:
+            self.average_gain = (self.average_gain * (self.period - 1) + gain) / self.period
+            self.average_loss = (self.average_loss * (self.period - 1) + loss) / self.period
+        return self.value
+
+    def undo(self) -> None:
+        self.previous, self.average_gain, self.average_loss, rolled = self._undo
+        if rolled:
+            self.gains.undo()
+            self.losses.undo()
+        self._undo = None
+
+    @property
+    def value(self) -> Optional[float]:
+        if self.average_gain is None:
+            return None
+        if self.average_loss == 0:
+            # Same as pandas: gain/0 gives RSI 100, and 0/0 is undefined
+            return 100.0 if self.average_gain > 0 else math.nan
+        return 100 - 100 / (1 + self.average_gain / self.average_loss)
+
+class RollingVariance(StreamingIndicator):
+    """Rolling variance over the last `period` values using Welford's add/remove updates."""
+
+    def __init__(self, period: int, ddof: int = 0):
+        self.period = period
+        self.ddof = ddof
+        self.window = deque()
+        self.mean = 0.0
+        self.m2 = 0.0
+        self._undo = None  # (mean, m2, value evicted or None) of the last update
+
+    def update(self, value: float) -> Optional[float]:
+        undo = (self.mean, self.m2)
+        self.window.append(value)
+        delta = value - self.mean
+        self.mean += delta / len(self.window)
+        self.m2 += delta * (value - self.mean)
+
+        removed = None
+        if len(self.window) > self.period:
+            removed = self.window.popleft()
+            delta = removed - self.mean
+            self.mean -= delta / len(self.window)
+            self.m2 -= delta * (removed - self.mean)
+        self._undo = undo + (removed,)
+        return self.value
+
+    def undo(self) -> None:
+        self.mean, self.m2, removed = self._undo
+        self.window.pop()
+        if removed is not None:
+            self.window.appendleft(removed)
+        self._undo = None
+
+    @property
+    def value(self) -> Optional[float]:
+        if len(self.window) < self.period:
+            return None
+        return max(self.m2, 0.0) / (self.period - self.ddof)
+
+    @property
+    def std(self) -> Optional[float]:
+        """Rolling standard deviation."""
+        variance = self.value
+        return None if variance is None else math.sqrt(variance)
+
+class RollingAdjustedSMA(StreamingIndicator):
+    """
+    Adjusted SMA, [sum - max - min]/(n-2), over the last `period` values.
+
+    The window max and min come from monotonic deques, so each update is amortized O(1).
+    Undoing an update re-inserts the entries it dropped from them.
+    """
+
+    def __init__(self, period: int):
+        if period <= 2:
+            raise ValueError("Adjusted SMA needs a period greater than 2")
+        self.period = period
+        self.count = 0
+        self.sum = RollingSMA(period)
+        self.maxima = deque()  # (index, value), values decreasing
+        self.minima = deque()  # (index, value), values increasing
+        self._undo = None  # Entries the last update dropped from each deque: (tail, expired)
+
+    def update(self, value: float) -> Optional[float]:
+        index = self.count
+        self.count += 1
+        self.sum.update(value)
+        oldest = index - self.period + 1
+        self._undo = (_push(self.maxima, (index, value), oldest, lambda last: last <= value),
+                      _push(self.minima, (index, value), oldest, lambda last: last >= value))
+        return self.value
+
+    def undo(self) -> None:
+        self.count -= 1
+        self.sum.undo()
+        for entries, (tail, expired) in zip((self.maxima, self.minima), self._undo):
+            entries.pop()
+            entries.extend(reversed(tail))
+            if expired is not None:
+                entries.appendleft(expired)
+        self._undo = None
+
+    @property
+    def value(self) -> Optional[float]:
+        if self.sum.value is None:
+            return None
+        return (self.sum.total - self.maxima[0][1] - self.minima[0][1]) / (self.period - 2)
+
+def _push(entries: deque, entry, oldest: int, dominates) -> tuple:
+    """Append to a monotonic deque, returning the entries dropped from its tail and the expired head."""
+    tail = []
+    while entries and dominates(entries[-1][1]):
+        tail.append(entries.pop())
+    entries.append(entry)
+    expired = entries.popleft() if entries[0][0] < oldest else None
+    return tail, expired
+
+class BarIndicators:
+    """
+    The live strategy's indicators for one symbol: fast/slow moving averages and RSI.
+
+    Bars are fed by timestamp. A bar with the same timestamp as the last one revises it,
+    which is how the still-forming latest bar is handled on every loop. Revising undoes
+    the last update of each indicator, so it costs O(1) like any other bar.
+    """
+
+    def __init__(self, fast_period: int, slow_period: int, rsi_period: int, history: int = 2):
+        """
+        Initialize the indicators.
+
+        Args:
+            fast_period (int): Fast moving average period
+            slow_period (int): Slow moving average period
+            rsi_period (int): RSI period
+            history (int): Number of latest indicator rows to keep for signal checks
+        """
+        self.ma_fast = RollingSMA(fast_period)
+        self.ma_slow = RollingSMA(slow_period)
+        self.rsi = RSI(rsi_period)
+        self.rows = deque(maxlen=history)
+        self.last_timestamp = None
+
+    def update(self, timestamp, close: float) -> Dict:
+        """
+        Fold in a bar close, or revise the latest bar if the timestamp repeats.
+
+        Returns:
+            Dict: Indicator row with 'timestamp', 'MA_fast', 'MA_slow' and 'RSI'
+        """
+        if timestamp == self.last_timestamp:
+            for indicator in (self.ma_fast, self.ma_slow, self.rsi):
+                indicator.undo()
+            self.rows.pop()
+        elif self.last_timestamp is not None and timestamp < self.last_timestamp:
+            raise ValueError(f"Bar at {timestamp} is older than the last bar at {self.last_timestamp}")
+
+        row = {
+            'timestamp': timestamp,
+            'MA_fast': _nan_if_none(self.ma_fast.update(close)),
+            'MA_slow': _nan_if_none(self.ma_slow.update(close)),
+            'RSI': _nan_if_none(self.rsi.update(close))
+        }
+        self.rows.append(row)
+        self.last_timestamp = timestamp
+        return row
+
+    def latest_rows(self) -> List[Dict]:
+        """Return the kept indicator rows, oldest first."""
+        return list(self.rows)
+
+def _nan_if_none(value: Optional[float]) -> float:
+    return math.nan if value is None else value
@@ -0,0 +1,211 @@
+"""
+Test file for the vectorized MA-crossover/RSI backtester, checked against bar-by-bar references.
+"""
+import unittest
+from datetime import datetime
+import numpy as np
+from backtest import (
+    EXIT_END, EXIT_SIGNAL, EXIT_STOP_LOSS, EXIT_TAKE_PROFIT, STRATEGY_NAME, BarMatrix, StrategyParameters,
+    backtest_bars, bar_matrix, performance_metrics, run_backtest, signals, simulate
+)
+from bar_series import BarSeries
+from database import Database
+from resample import resample_bars
+from tests.utils import generate_intraday_data
+
+def reference_signals(df, params):
+    """Evaluate the bot's indicator and signal rules on every prefix of df, as it would live."""
+    df = df.copy()
+    df['MA_fast'] = df['Close'].rolling(window=params.ma_fast).mean()
+    df['MA_slow'] = df['Close'].rolling(window=params.ma_slow).mean()
+    delta = df['Close'].diff()
+    gain = (delta.where(delta > 0, 0)).rolling(window=params.rsi_period).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=params.rsi_period).mean()
+    df['RSI'] = 100 - (100 / (1 + gain / loss))
+
+    fast, slow, rsi = df['MA_fast'].values, df['MA_slow'].values, df['RSI'].values
+    buy = np.zeros(len(df), dtype=bool)
+    sell = np.zeros(len(df), dtype=bool)
+    for t in range(params.ma_slow - 1, len(df)):
+        buy[t] = (fast[t - 1] <= slow[t - 1] and fast[t] > slow[t]) or rsi[t] < params.rsi_oversold
+        sell[t] = (fast[t - 1] >= slow[t - 1] and fast[t] < slow[t]) or rsi[t] > params.rsi_overbought
+    return buy, sell
+
+def reference_trades(df, buy, sell, params):
+    """Simulate the strategy one bar at a time."""
+    o, h, l, c = (df[column].values for column in ['Open', 'High', 'Low', 'Close'])
+    trades = []
+    position = pending = None
+    for t in range(len(df)):
+        if pending == 'buy':
+            position, pending = (t, o[t]), None
+        elif pending == 'sell':
+            trades.append((position[0], t, position[1], o[t], EXIT_SIGNAL))
+            position = pending = None
+        if position is not None:
+            stop = position[1] * (1 - params.stop_loss_percentage / 100)
+            target = position[1] * (1 + params.take_profit_percentage / 100)
+            if l[t] <= stop:
+                trades.append((position[0], t, position[1], min(o[t], stop), EXIT_STOP_LOSS))
+                position = None
+            elif h[t] >= target:
+                trades.append((position[0], t, position[1], max(o[t], target), EXIT_TAKE_PROFIT))
+                position = None
+        if t + 1 < len(df):
+            if position is None and buy[t]:
+                pending = 'buy'
+            elif position is not None and sell[t]:
+                pending = 'sell'
+    if position is not None:
+        trades.append((position[0], len(df) - 1, position[1], c[-1], EXIT_END))
+    return trades
+
+def frames_to_arrays(frames):
+    """Concatenate DataFrames into bar arrays, the i-th frame becoming symbol id i."""
+    return {
+        'symbol_id': np.concatenate([np.full(len(df), i) for i, df in enumerate(frames)]),
+        'start_time': np.concatenate([df.index.values for df in frames]),
+        'open': np.concatenate([df['Open'].values for df in frames]),
+        'high': np.concatenate([df['High'].values for df in frames]),
+        'low': np.concatenate([df['Low'].values for df in frames]),
+        'close': np.concatenate([df['Close'].values for df in frames])
+    }
+
+class TestVectorizedStrategy(unittest.TestCase):
+    def setUp(self):
+        """Set up bars of three symbols with different lengths and tight stops so every exit occurs."""
+        self.params = StrategyParameters(stop_loss_percentage=0.3, take_profit_percentage=0.5)
+        self.frames = [generate_intraday_data(periods=390, days=2, seed=seed) for seed in range(3)]
+        self.frames[1] = self.frames[1].iloc[:500]
+        self.bars = bar_matrix(frames_to_arrays(self.frames), {0: 'AAPL', 1: 'MSFT', 2: 'GOOGL'})
+
+    def test_bar_matrix_left_aligns_rows(self):
+        """Each symbol's bars start in the first column and are padded after its last bar."""
+        self.assertEqual(self.bars.symbols, ['AAPL', 'MSFT', 'GOOGL'])
+        self.assertEqual(self.bars.lengths.tolist(), [780, 500, 780])
+        self.assertEqual(self.bars.close.shape, (3, 780))
+        np.testing.assert_array_equal(self.bars.close[1, :500], self.frames[1]['Close'].values)
+        self.assertTrue(np.isnan(self.bars.close[1, 500:]).all())
+
+    def test_signals_match_bot_rules(self):
+        """Buy and sell signals match the bot's rules evaluated bar by bar."""
+        buy, sell = signals(self.bars.close, self.bars.lengths, self.params)
+        for i, df in enumerate(self.frames):
+            expected_buy, expected_sell = reference_signals(df, self.params)
+            np.testing.assert_array_equal(buy[i, :len(df)], expected_buy)
+            np.testing.assert_array_equal(sell[i, :len(df)], expected_sell)
+        self.assertFalse(buy[1, 500:].any() or sell[1, 500:].any())
+
+    def test_trades_match_bar_by_bar_simulation(self):
+        """The vectorized simulation takes exactly the trades of a bar-by-bar one."""
+        trades, metrics = backtest_bars(self.bars, self.params)
+        buy, sell = signals(self.bars.close, self.bars.lengths, self.params)
+        reasons = set()
+        for i, df in enumerate(self.frames):
+            expected = reference_trades(df, buy[i, :len(df)], sell[i, :len(df)], self.params)
+            mine = trades['row'] == i
+            self.assertEqual(trades['entry_bar'][mine].tolist(), [trade[0] for trade in expected])
+            self.assertEqual(trades['exit_bar'][mine].tolist(), [trade[1] for trade in expected])
+            np.testing.assert_allclose(trades['entry_price'][mine], [trade[2] for trade in expected])
+            np.testing.assert_allclose(trades['exit_price'][mine], [trade[3] for trade in expected])
+            self.assertEqual(trades['reason'][mine].tolist(), [trade[4] for trade in expected])
+            reasons.update(trade[4] for trade in expected)
+
+            returns = np.array([trade[3] / trade[2] - 1 for trade in expected])
+            self.assertEqual(metrics[i]['trades'], len(expected))
+            self.assertAlmostEqual(metrics[i]['total_return_pct'], (np.prod(1 + returns) - 1) * 100)
+            self.assertEqual(metrics[i]['stop_losses'], sum(trade[4] == EXIT_STOP_LOSS for trade in expected))
+        self.assertTrue({EXIT_SIGNAL, EXIT_STOP_LOSS, EXIT_TAKE_PROFIT} <= reasons)
+
+    def test_stops_fill_at_their_price_or_a_gap(self):
+        """Stops fill at the stop price, or at the open when the price gapped through it."""
+        opens = np.array([[10.0, 10.0, 10.0, 9.5, 10.0, 10.0]])
+        bars = BarMatrix(['AAPL'], np.array([6]), None, opens, opens + 0.1, opens - 0.1, opens)
+        buy = np.array([[True, False, False, False, True, False]])
+        sell = np.zeros_like(buy)
+        params = StrategyParameters(stop_loss_percentage=2.0, take_profit_percentage=50.0)
+        trades = simulate(bars, buy, sell, params)
+        # Gapped through the 9.80 stop to open at 9.50; the second trade is still open after the last bar
+        self.assertEqual(trades['entry_bar'].tolist(), [1, 5])
+        self.assertEqual(trades['exit_bar'].tolist(), [3, 5])
+        self.assertEqual(trades['reason'].tolist(), [EXIT_STOP_LOSS, EXIT_END])
+        self.assertAlmostEqual(trades['exit_price'][0], 9.5)
+
+    def test_max_drawdown(self):
+        """Drawdown is measured from the peak of each symbol's compounded closed-trade equity."""
+        opens = np.array([[10.0, 10.0, 11.0, 11.0, 9.9, 9.9, 10.89, 10.89]])
+        bars = BarMatrix(['AAPL'], np.array([8]), None, opens, opens, opens, opens)
+        buy = np.array([[True, False, True, False, True, False, False, False]])
+        sell = np.array([[False, True, False, True, False, True, False, False]])
+        params = StrategyParameters(stop_loss_percentage=50.0, take_profit_percentage=50.0)
+        trades = simulate(bars, buy, sell, params)
+        metrics = performance_metrics(bars, trades, params)[0]
+        # +10%, -10%, +10%: equity 1.1, 0.99, 1.089
+        self.assertEqual(metrics['trades'], 3)
+        self.assertAlmostEqual(metrics['max_drawdown_pct'], 10.0)
+        self.assertAlmostEqual(metrics['total_return_pct'], 8.9)
+        self.assertAlmostEqual(metrics['win_rate'], 2 / 3)
+
+class TestRunBacktest(unittest.TestCase):
+    def setUp(self):
+        """Set up an in-memory database with two days of bars for four symbols."""
+        self.db = Database('sqlite://', create_schema=True)
+        self.frames = {}
+        for seed, symbol in enumerate(['AAPL', 'MSFT', 'GOOGL', 'AMZN']):
+            self.frames[symbol] = generate_intraday_data(periods=390, days=2, seed=seed)
+            self.db.upsert_time_intervals(symbol, self.frames[symbol])
+
+    def tearDown(self):
+        """Clean up after each test."""
+        self.db.close()
+
+    def test_batches_give_the_same_results(self):
+        """Results do not depend on how many symbols are simulated together."""
+        together = run_backtest(self.db, batch_size=10, save=False)
+        apart = run_backtest(self.db, batch_size=1, save=False)
+        self.assertEqual(set(together), {'AAPL', 'MSFT', 'GOOGL', 'AMZN'})
+        self.assertEqual(together, apart)
+        self.assertEqual(together['AAPL']['bars'], 14)
+        self.assertEqual(run_backtest(self.db, batch_size=10, save=False, timeframe='1m'),
+                         run_backtest(self.db, batch_size=1, save=False, timeframe='1m'))
+
+    def test_bars_are_resampled_to_the_timeframe(self):
+        """Symbols are tested on bars resampled from the 09:30 open, or on the stored bars for '1m'."""
+        params = StrategyParameters(ma_fast=2, ma_slow=4, rsi_period=3)
+        for timeframe, ticker_time, count in [('1h', 60, 14), ('15m', 15, 52), ('1m', 1, 780)]:
+            with self.subTest(timeframe=timeframe):
+                results = run_backtest(self.db, ['AAPL', 'MSFT'], params=params, save=False, timeframe=timeframe)
+                bars = resample_bars(BarSeries.from_dataframe(self.frames['MSFT']), ticker_time)
+                arrays = {
+                    'symbol_id': np.zeros(len(bars), dtype=np.int64),
+                    'start_time': bars.timestamp.view('datetime64[ns]'),
+                    'open': bars.open,
+                    'high': bars.high,
+                    'low': bars.low,
+                    'close': bars.close
+                }
+                _, expected = backtest_bars(bar_matrix(arrays, {0: 'MSFT'}), params)
+                self.assertEqual(results['MSFT']['bars'], count)
+                self.assertEqual(results['MSFT'], expected[0])
+
+    def test_selected_symbols_and_dates(self):
+        """Only the selected symbols and bars are tested."""
+        results = run_backtest(self.db, ['MSFT', 'AMZN', 'TSLA'], start_date=datetime(2024, 1, 3), save=False)
+        self.assertEqual(set(results), {'MSFT', 'AMZN'})
+        self.assertEqual(results['MSFT']['bars'], 7)
+        single = run_backtest(self.db, ['MSFT'], start_date=datetime(2024, 1, 3), save=False)
+        self.assertEqual(single['MSFT'], results['MSFT'])
+
+    def test_results_are_saved(self):
+        """Every symbol's metrics are saved with the strategy's parameters and the bars' time span."""
+        results = run_backtest(self.db, batch_size=3)
+        saved = self.db.get_analysis_results(strategy_name=STRATEGY_NAME)
+        self.assertEqual(len(saved), 4)
+        aapl = self.db.get_analysis_results('AAPL', STRATEGY_NAME)[0]
+        self.assertEqual(aapl.performance_metrics, results['AAPL'])
+        self.assertEqual(aapl.parameters, StrategyParameters()._asdict())
+        self.assertEqual(aapl.start_date, self.frames['AAPL'].index[0].to_pydatetime())
+        self.assertEqual(aapl.end_date, datetime(2024, 1, 3, 15, 30))
+
+if __name__ == '__main__':
+    unittest.main()
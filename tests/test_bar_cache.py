@@ -0,0 +1,54 @@
+"""
+Test file for the rolling bar cache.
+"""
+import unittest
+import numpy as np
+from bar_cache import BarCache, BarRing
+from bar_series import BarSeries
+from providers import StaticProvider
+from tests.utils import generate_intraday_data
+
+class TestBarRing(unittest.TestCase):
+    def setUp(self):
+        """Set up a session of bars."""
+        self.bars = BarSeries.from_dataframe(generate_intraday_data(periods=100))
+
+    def test_keeps_latest_bars_in_order(self):
+        """Appending past capacity drops the oldest bars."""
+        ring = BarRing(30)
+        ring.merge(self.bars[:20])
+        ring.merge(self.bars[15:50])
+        ring.merge(self.bars[50:75])
+        self.assertEqual(len(ring), 30)
+        np.testing.assert_array_equal(ring.series().timestamp, self.bars.timestamp[45:75])
+        np.testing.assert_array_equal(ring.series().close, self.bars.close[45:75])
+
+    def test_revises_latest_bar(self):
+        """A bar with the latest bar's start time replaces it instead of being appended."""
+        ring = BarRing(10)
+        ring.merge(self.bars[:5])
+        partial = self.bars[4:6].take([0, 1])
+        partial.close[0] = 1.0
+        self.assertEqual(ring.merge(partial), 1)
+        series = ring.series()
+        self.assertEqual(len(series), 6)
+        self.assertEqual(series.close[4], 1.0)
+
+class TestBarCache(unittest.TestCase):
+    def test_refresh_only_requests_latest_bars(self):
+        """After warming, refreshes ask for bars from the latest cached bar and stay bounded."""
+        data = generate_intraday_data(periods=390)
+        provider = StaticProvider({'AAPL': data.iloc[:300]})
+        cache = BarCache(provider, capacity=200)
+        cache.warm(['AAPL'])
+        self.assertEqual(provider.windows[-1], ('AAPL', None, None))
+
+        provider.frames['AAPL'] = data
+        df = cache.get_dataframe('AAPL')
+        self.assertEqual(provider.windows[-1][1], data.index[299].to_pydatetime())
+        self.assertEqual(len(df), 200)
+        np.testing.assert_array_equal(df['Close'].to_numpy(), data['Close'].to_numpy()[-200:])
+        self.assertEqual(len(provider.calls), 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+"""
+Test file for the BarSeries container.
+"""
+import unittest
+import numpy as np
+import pandas as pd
+from bar_series import BarSeries
+from database import Database
+from indicators import load_symbol_bars
+from tests.utils import generate_intraday_data
+
+class TestBarSeries(unittest.TestCase):
+    def setUp(self):
+        """Set up a session of 1-minute bars."""
+        self.data = generate_intraday_data(periods=390)
+        self.bars = BarSeries.from_dataframe(self.data)
+    
+    def test_dataframe_round_trip(self):
+        """Converting to a DataFrame gives back the original bars."""
+        frame = self.bars.to_dataframe()
+        pd.testing.assert_frame_equal(frame, self.data[frame.columns], check_names=False,
+                                      check_dtype=False, check_freq=False)
+        self.assertEqual(self.bars.timestamp.dtype, np.int64)
+        self.assertEqual(self.bars.volume.dtype, np.int64)
+    
+    def test_slices_are_views(self):
+        """Slicing shares memory with the parent series."""
+        window = self.bars[-60:]
+        self.assertEqual(len(window), 60)
+        self.assertTrue(np.shares_memory(window.close, self.bars.close))
+        self.assertTrue(np.shares_memory(window['start_time'], self.bars.timestamp))
+        self.assertEqual(window['close'][0], self.bars['close'][330])
+    
+    def test_take_and_append(self):
+        """Positional selection and appending keep every column aligned."""
+        picked = self.bars.take([5, 10])
+        np.testing.assert_array_equal(picked.id, [5, 10])
+        joined = self.bars[:100].append(self.bars[100:])
+        for column in BarSeries.COLUMNS:
+            np.testing.assert_array_equal(joined[column], self.bars[column])
+    
+    def test_from_rows_matches_loader(self):
+        """ORM rows and the column loader give the same series."""
+        db = Database('sqlite://', create_schema=True)
+        db.upsert_time_intervals('AAPL', self.data)
+        loaded = load_symbol_bars(db, 1)
+        from_rows = BarSeries.from_rows(db.get_time_intervals('AAPL'))
+        for column in BarSeries.COLUMNS:
+            np.testing.assert_array_equal(from_rows[column], loaded[column])
+        db.close()
+    
+    def test_mismatched_columns(self):
+        """Columns of different lengths are rejected."""
+        with self.assertRaises(ValueError):
+            BarSeries([1, 2], [1.0], [1.0], [1.0], [1.0], [1])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+"""
+Test file for the memory-mapped bar store.
+"""
+import tempfile
+import unittest
+import numpy as np
+from bar_series import BarSeries
+from bar_store import BarStore, sync_from_database
+from database import Database
+from indicators import load_symbol_bars
+from tests.utils import generate_intraday_data
+
+class TestBarStore(unittest.TestCase):
+    def setUp(self):
+        """Set up an empty store and two sessions of bars."""
+        self.directory = tempfile.TemporaryDirectory()
+        self.store = BarStore(self.directory.name)
+        self.data = generate_intraday_data(periods=390, days=2)
+    
+    def tearDown(self):
+        """Clean up after each test."""
+        self.directory.cleanup()
+    
+    def test_write_and_read_range(self):
+        """Bars are split into day files and read back by time range."""
+        self.assertEqual(self.store.write_dataframe('AAPL', self.data), 780)
+        self.assertEqual(self.store.days('AAPL'), ['2024-01-02', '2024-01-03'])
+        
+        bars = self.store.read('AAPL')
+        np.testing.assert_array_equal(bars.close, self.data['Close'].to_numpy())
+        
+        day = self.store.read('AAPL', start='2024-01-03 10:00', end='2024-01-03 11:00')
+        self.assertEqual(len(day), 60)
+        self.assertFalse(day.close.flags.writeable)  # a read-only view of the mapped file
+        self.assertEqual(day.start_time[0], np.datetime64('2024-01-03T10:00'))
+    
+    def test_rewrite_replaces_bars(self):
+        """Writing overlapping bars replaces them instead of duplicating."""
+        self.store.write_dataframe('AAPL', self.data)
+        changed = self.data.iloc[380:400].copy()
+        changed['Close'] = 1.0
+        self.store.write_dataframe('AAPL', changed)
+        
+        reopened = BarStore(self.directory.name)
+        bars = reopened.read('AAPL')
+        self.assertEqual(len(bars), 780)
+        self.assertTrue(np.all(bars.close[380:400] == 1.0))
+        self.assertTrue(np.all(np.diff(bars.timestamp) > 0))
+    
+    def test_sync_from_database(self):
+        """A sync copies the database bars, ids included."""
+        db = Database('sqlite://', create_schema=True)
+        db.upsert_time_intervals('AAPL', self.data)
+        db.upsert_time_intervals('MSFT', self.data.iloc[:50])
+        
+        written = sync_from_database(db, self.store, chunk_size=100)
+        self.assertEqual(written, {'AAPL': 780, 'MSFT': 50})
+        
+        expected = load_symbol_bars(db, 1)
+        stored = self.store.read('AAPL')
+        for column in BarSeries.COLUMNS:
+            np.testing.assert_array_equal(stored[column], expected[column])
+        db.close()
+    
+    def test_sync_selected_symbols_then_merge_ingested_bars(self):
+        """Only the selected symbols are synced, and ingested bars keep the synced ids."""
+        db = Database('sqlite://', create_schema=True)
+        db.upsert_time_intervals('AAPL', self.data)
+        db.upsert_time_intervals('MSFT', self.data.iloc[:50])
+        
+        self.assertEqual(sync_from_database(db, self.store, symbols=['MSFT'], chunk_size=20), {'MSFT': 50})
+        self.assertEqual(self.store.symbols(), ['MSFT'])
+        
+        changed = self.data.iloc[40:60].copy()
+        changed['Close'] = 1.0
+        self.store.write_dataframe('MSFT', changed)
+        bars = self.store.read('MSFT')
+        np.testing.assert_array_equal(bars.id[:50], [interval.id for interval in db.get_time_intervals('MSFT')])
+        np.testing.assert_array_equal(bars.id[50:], -1)
+        self.assertTrue(np.all(bars.close[40:] == 1.0))
+        db.close()
+
+if __name__ == '__main__':
+    unittest.main()
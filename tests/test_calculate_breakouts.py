@@ -0,0 +1,154 @@
+"""
+Test file for the volume breakout scanner.
+"""
+import os
+import tempfile
+import unittest
+from database import Database
+from calculate_breakouts import find_volume_breakouts, scan_breakouts_incremental, load_stored_breakouts
+from tests.utils import generate_intraday_data
+
+class TestFindVolumeBreakouts(unittest.TestCase):
+    def setUp(self):
+        """Set up an in-memory database with a few symbols."""
+        self.db = Database('sqlite://', create_schema=True)
+        for seed, symbol in enumerate(['AAPL', 'MSFT', 'NVDA']):
+            data = generate_intraday_data(periods=150, days=2, seed=seed)
+            self.db.upsert_time_intervals(symbol, data.drop(data.index[60:64]))
+    
+    def tearDown(self):
+        """Clean up after each test."""
+        self.db.close()
+    
+    def test_vectorized_matches_per_bar_scan(self):
+        """The vectorized scanner returns exactly the per-bar scanner's breakouts."""
+        for ticker_time, lookback_period, threshold in [(1, 10, 3.0), (5, 5, 2.0), (5, 12, 4.0)]:
+            with self.subTest(ticker_time=ticker_time, lookback_period=lookback_period, threshold=threshold):
+                expected = find_volume_breakouts(ticker_time, lookback_period, threshold,
+                                                 vectorized=False, db=self.db)
+                actual = find_volume_breakouts(ticker_time, lookback_period, threshold,
+                                               vectorized=True, db=self.db, bar_source='minute')
+                self.assertEqual(actual, expected)
+        
+        self.assertTrue(find_volume_breakouts(1, 10, 3.0, db=self.db), "Sample data should contain breakouts")
+    
+    def test_rollup_scan(self):
+        """Scanning rollup bars reports breakouts at rollup bar starts with aggregated volume."""
+        breakouts = find_volume_breakouts(5, 5, 1.5, db=self.db, bar_source='rollup')
+        self.assertTrue(breakouts)
+        for breakout in breakouts:
+            self.assertEqual(int(breakout['Time'][-2:]) % 5, 0)
+            rollup = [r for r in self.db.get_rollups(breakout['Symbol'], 5)
+                      if r.start_time.strftime('%Y-%m-%d %H:%M') == f"{breakout['Date']} {breakout['Time']}"]
+            self.assertEqual(breakout['Volume'], rollup[0].volume)
+    
+    def test_rollups_are_the_default_source(self):
+        """Timeframes kept in interval_rollups are scanned from them unless another source is asked for."""
+        self.assertEqual(find_volume_breakouts(5, 5, 1.5, db=self.db),
+                         find_volume_breakouts(5, 5, 1.5, db=self.db, bar_source='rollup'))
+        self.assertEqual(find_volume_breakouts(1, 10, 3.0, db=self.db),
+                         find_volume_breakouts(1, 10, 3.0, db=self.db, bar_source='minute'))
+        self.assertNotEqual(find_volume_breakouts(5, 5, 1.5, db=self.db),
+                            find_volume_breakouts(5, 5, 1.5, db=self.db, bar_source='minute'))
+    
+    def test_resample_scan_matches_rollup_scan(self):
+        """Bars resampled from the 09:30 open are the same bars as the rollups, hourly ones included."""
+        for ticker_time in (5, 60):
+            self.assertEqual(
+                find_volume_breakouts(ticker_time, 5, 1.5, db=self.db, bar_source='resample'),
+                find_volume_breakouts(ticker_time, 5, 1.5, db=self.db, bar_source='rollup')
+            )
+        self.assertTrue(find_volume_breakouts(7, 5, 1.5, db=self.db, bar_source='resample'))
+
+class TestParallelBreakouts(unittest.TestCase):
+    def setUp(self):
+        """Set up a file-backed SQLite database that worker processes can open."""
+        self.directory = tempfile.TemporaryDirectory()
+        self.db = Database(f"sqlite:///{os.path.join(self.directory.name, 'scan.db')}", create_schema=True)
+        for seed, symbol in enumerate(['AAPL', 'MSFT', 'NVDA', 'TSLA', 'V']):
+            self.db.upsert_time_intervals(symbol, generate_intraday_data(periods=200, seed=seed))
+    
+    def tearDown(self):
+        """Clean up after each test."""
+        self.db.close()
+        self.directory.cleanup()
+    
+    def test_workers_match_serial_scan(self):
+        """Sharding across processes returns the serial results in the same order."""
+        expected = find_volume_breakouts(1, 10, 3.0, db=self.db)
+        self.assertTrue(expected, "Sample data should contain breakouts")
+        self.assertEqual(find_volume_breakouts(1, 10, 3.0, db=self.db, workers=3), expected)
+    
+    def test_incremental_workers_match_full_scan(self):
+        """Parallel incremental scans store and return the full scan's breakouts."""
+        expected = find_volume_breakouts(1, 10, 3.0, db=self.db)
+        self.assertEqual(scan_breakouts_incremental(1, 10, 3.0, db=self.db, workers=2), expected)
+        self.assertEqual(load_stored_breakouts(1, 10, 3.0, db=self.db), expected)
+
+class TestIncrementalBreakouts(unittest.TestCase):
+    def setUp(self):
+        """Set up an in-memory database and a day of bars to ingest in batches."""
+        self.db = Database('sqlite://', create_schema=True)
+        self.data = generate_intraday_data(periods=300, days=1, seed=4)
+    
+    def tearDown(self):
+        """Clean up after each test."""
+        self.db.close()
+    
+    def test_incremental_runs_match_full_scan(self):
+        """Scanning after each ingested batch finds the same breakouts as one full scan."""
+        params = (1, 10, 3.0)
+        found = []
+        for start, end in [(0, 5), (5, 40), (40, 41), (41, 200), (200, 300)]:
+            self.db.upsert_time_intervals('AAPL', self.data.iloc[start:end])
+            found.extend(scan_breakouts_incremental(*params, db=self.db))
+        
+        expected = find_volume_breakouts(*params, db=self.db)
+        self.assertTrue(expected, "Sample data should contain breakouts")
+        self.assertEqual(found, expected)
+        self.assertEqual(load_stored_breakouts(*params, db=self.db), expected)
+        
+        # A run with no new bars finds nothing and stores nothing new
+        self.assertEqual(scan_breakouts_incremental(*params, db=self.db), [])
+        self.assertEqual(len(load_stored_breakouts(*params, db=self.db)), len(expected))
+
+    def test_bars_backfilled_behind_watermark_are_scanned(self):
+        """Bars stored before the last scanned bar, e.g. a filled gap, are scanned on the next run."""
+        params = (1, 10, 3.0)
+        gap = self.data.index[100:160]
+        self.db.upsert_time_intervals('AAPL', self.data.drop(gap))
+        scan_breakouts_incremental(*params, db=self.db)
+
+        self.db.upsert_time_intervals('AAPL', self.data.loc[gap])
+        found = scan_breakouts_incremental(*params, db=self.db)
+        expected = find_volume_breakouts(*params, db=self.db)
+        self.assertTrue([b for b in found if gap[0].strftime('%H:%M') <= b['Time'] <= gap[-1].strftime('%H:%M')],
+                        "Sample data should contain breakouts in the gap")
+        self.assertEqual(load_stored_breakouts(*params, db=self.db), expected)
+        self.assertEqual(scan_breakouts_incremental(*params, db=self.db), [])
+
+    def test_revised_bars_are_rescanned(self):
+        """Rewriting stored bars, e.g. the forming bar on each refresh, changes the stored breakouts."""
+        params = (1, 10, 3.0)
+        self.db.upsert_time_intervals('AAPL', self.data)
+        scanned = scan_breakouts_incremental(*params, db=self.db)
+        self.assertTrue(scanned, "Sample data should contain breakouts")
+
+        # The last bar grows into a breakout, and the first breakout's volume is revised away
+        revised = self.data.iloc[[-1]].copy()
+        revised['Volume'] *= 50
+        first = self.data.loc[[f"{scanned[0]['Date']} {scanned[0]['Time']}"]].copy()
+        first['Volume'] = 1
+        self.db.upsert_time_intervals('AAPL', revised)
+        self.db.upsert_time_intervals('AAPL', first)
+
+        found = scan_breakouts_incremental(*params, db=self.db)
+        stored = load_stored_breakouts(*params, db=self.db)
+        self.assertEqual(stored, find_volume_breakouts(*params, db=self.db))
+        self.assertIn(revised.index[-1].strftime('%H:%M'), [b['Time'] for b in found])
+        self.assertNotIn(scanned[0]['Time'], [b['Time'] for b in stored])
+        self.assertFalse([b for b in found if b in scanned], "Unchanged breakouts are not reported again")
+        self.assertEqual(scan_breakouts_incremental(*params, db=self.db), [])
+
+if __name__ == '__main__':
+    unittest.main()
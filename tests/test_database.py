@@ -0,0 +1,244 @@
+"""
+Test file for the Database bulk upsert path.
+"""
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+import pandas as pd
+from sqlalchemy import inspect, text
+from database import Database, IntervalRollup, ROLLUP_TIMEFRAMES, Symbol, TimeInterval, dispose_engines, get_engine, init_schema, interval_columns
+from tests.utils import generate_intraday_data
+
+class TestUpsertTimeIntervals(unittest.TestCase):
+    def setUp(self):
+        """Set up an in-memory database."""
+        self.db = Database('sqlite://', create_schema=True)
+        self.data = generate_intraday_data(periods=390, days=2)
+    
+    def tearDown(self):
+        """Clean up after each test."""
+        self.db.close()
+    
+    def test_insert_then_update_counts(self):
+        """Re-upserting overlapping bars updates instead of duplicating."""
+        counts = self.db.upsert_time_intervals('AAPL', self.data, chunk_size=100)
+        self.assertEqual(counts, {'inserted': 780, 'updated': 0})
+        
+        changed = self.data.iloc[-50:].copy()
+        changed['Close'] = 1.0
+        extra = generate_intraday_data(start='2024-01-04 09:30', periods=10)
+        counts = self.db.upsert_time_intervals('AAPL', pd.concat([changed, extra]), chunk_size=100)
+        self.assertEqual(counts, {'inserted': 10, 'updated': 50})
+        
+        self.assertEqual(self.db.session.query(TimeInterval).count(), 790)
+        last = self.db.get_time_intervals('AAPL')[779]
+        self.assertEqual(last.close, 1.0)
+    
+    def test_matches_row_by_row_save(self):
+        """Bulk upsert stores the same rows as save_time_interval."""
+        self.db.save_time_interval('MSFT', self.data.iloc[:30])
+        self.db.upsert_time_intervals('AAPL', self.data.iloc[:30])
+        
+        legacy = self.db.get_time_intervals('MSFT')
+        bulk = self.db.get_time_intervals('AAPL')
+        self.assertEqual(len(legacy), len(bulk))
+        for a, b in zip(legacy, bulk):
+            self.assertEqual(
+                (a.start_time, a.end_time, a.open, a.high, a.low, a.close, a.volume),
+                (b.start_time, b.end_time, b.open, b.high, b.low, b.close, b.volume)
+            )
+    
+    def test_tz_aware_frames_are_stored_as_exchange_time(self):
+        """Bars indexed in any time zone are stored at their New York wall-clock time by every write path."""
+        utc = self.data.iloc[:30].tz_localize('America/New_York').tz_convert('UTC')
+        self.db.upsert_time_intervals('AAPL', utc)
+        self.db.save_time_interval('MSFT', utc)
+        self.db.upsert_time_interval_batch([('GOOGL', None, interval_columns(utc))])
+        
+        expected = list(self.data.index[:30].to_pydatetime())
+        for symbol in ['AAPL', 'MSFT', 'GOOGL']:
+            intervals = self.db.get_time_intervals(symbol)
+            self.assertEqual([interval.start_time for interval in intervals], expected)
+            self.assertEqual(intervals[0].end_time, expected[1])
+        self.assertEqual(self.db.get_rollups('AAPL', 15)[0].start_time, expected[0])
+
+class TestIntervalRollups(unittest.TestCase):
+    def setUp(self):
+        """Set up an in-memory database."""
+        self.db = Database('sqlite://', create_schema=True)
+        self.data = generate_intraday_data(periods=200, days=2, seed=2)
+    
+    def tearDown(self):
+        """Clean up after each test."""
+        self.db.close()
+    
+    def expected_rollups(self, ticker_time):
+        """Aggregate the sample data with pandas as the reference, in buckets aligned to the 09:30 open."""
+        return self.data.resample(f'{ticker_time}min', offset='30min').agg({
+            'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'
+        }).dropna()
+    
+    def test_rollups_maintained_across_batches(self):
+        """Rollups written batch by batch, with overlapping updates, match a full aggregation."""
+        self.db.upsert_time_intervals('AAPL', self.data.iloc[:137])
+        self.db.save_time_interval('AAPL', self.data.iloc[130:150])
+        self.db.upsert_time_intervals('AAPL', self.data.iloc[150:])
+        
+        for ticker_time in ROLLUP_TIMEFRAMES:
+            expected = self.expected_rollups(ticker_time)
+            rollups = self.db.get_rollups('AAPL', ticker_time)
+            self.assertEqual([r.start_time for r in rollups], list(expected.index.to_pydatetime()))
+            for rollup, row in zip(rollups, expected.itertuples()):
+                self.assertEqual(
+                    (rollup.open, rollup.high, rollup.low, rollup.close, rollup.volume),
+                    (row.Open, row.High, row.Low, row.Close, row.Volume)
+                )
+    
+    def test_rebuild_from_history(self):
+        """update_rollups without a range rebuilds the whole history."""
+        self.db.upsert_time_intervals('AAPL', self.data)
+        self.db.session.query(IntervalRollup).delete()
+        self.db.session.commit()
+        
+        symbol_id = self.db.session.query(TimeInterval.symbol_id).first()[0]
+        written = self.db.update_rollups(symbol_id)
+        self.assertEqual(written, sum(len(self.expected_rollups(t)) for t in ROLLUP_TIMEFRAMES))
+    
+    def test_batch_reports_rollup_failures(self):
+        """A batch whose rollups fail to update keeps its bars and reports the failure per symbol."""
+        def fail(*args):
+            raise RuntimeError("rollups unavailable")
+        self.db.update_rollups = fail
+        
+        counts = self.db.upsert_time_interval_batch([('AAPL', None, interval_columns(self.data))])
+        self.assertEqual(counts['AAPL']['inserted'], len(self.data))
+        self.assertEqual(counts['AAPL']['rollup_error'], "rollups unavailable")
+        self.assertEqual(self.db.session.query(TimeInterval).count(), len(self.data))
+
+class TestStreamTimeIntervals(unittest.TestCase):
+    def setUp(self):
+        """Set up an in-memory database with two symbols."""
+        self.db = Database('sqlite://', create_schema=True)
+        self.data = generate_intraday_data(periods=390, days=2)
+        self.db.upsert_time_intervals('AAPL', self.data)
+        self.db.upsert_time_intervals('MSFT', self.data.iloc[:100])
+    
+    def tearDown(self):
+        """Clean up after each test."""
+        self.db.close()
+    
+    def test_chunks_cover_every_bar_in_order(self):
+        """Chunks have the requested size and match the ORM read."""
+        chunks = list(self.db.stream_time_intervals('AAPL', chunk_size=128))
+        self.assertEqual([len(chunk['id']) for chunk in chunks], [128] * 6 + [12])
+        
+        ids = [id for chunk in chunks for id in chunk['id'].tolist()]
+        closes = [close for chunk in chunks for close in chunk['close'].tolist()]
+        intervals = self.db.get_time_intervals('AAPL')
+        self.assertEqual(ids, [interval.id for interval in intervals])
+        self.assertEqual(closes, [interval.close for interval in intervals])
+    
+    def test_frames_for_all_symbols(self):
+        """DataFrame chunks span every symbol, ordered by symbol then time."""
+        frame = pd.concat(self.db.stream_time_intervals(chunk_size=200, as_frame=True))
+        self.assertEqual(len(frame), 880)
+        self.assertEqual(frame['symbol_id'].tolist(), [1] * 780 + [2] * 100)
+        pd.testing.assert_series_equal(
+            frame['Close'].iloc[:780], self.data['Close'], check_names=False, check_index=False
+        )
+        self.assertTrue(frame.index[:780].equals(self.data.index.tz_localize(None)))
+    
+    def test_symbols_filter(self):
+        """Only the requested symbols are streamed; unknown ones are ignored."""
+        chunks = list(self.db.stream_time_intervals(symbols=['MSFT', 'TSLA'], chunk_size=64))
+        self.assertEqual(sum(len(chunk['id']) for chunk in chunks), 100)
+        self.assertTrue(all((chunk['symbol_id'] == 2).all() for chunk in chunks))
+
+class TestEngineRegistry(unittest.TestCase):
+    def setUp(self):
+        """Set up a file-backed database URL in a temporary directory."""
+        self.directory = tempfile.TemporaryDirectory()
+        self.url = f"sqlite:///{os.path.join(self.directory.name, 'registry.db')}"
+    
+    def tearDown(self):
+        """Clean up after each test."""
+        dispose_engines()
+        self.directory.cleanup()
+    
+    def test_databases_share_one_engine_per_url(self):
+        """Databases on the same URL reuse one engine; in-memory URLs stay private."""
+        first, second = Database(self.url), Database(self.url)
+        self.assertIs(first.engine, second.engine)
+        self.assertIs(get_engine(self.url), first.engine)
+        self.assertIsNot(get_engine('sqlite://'), get_engine('sqlite://'))
+        first.close()
+        second.close()
+    
+    def test_schema_is_created_by_init_only(self):
+        """Opening a Database no longer creates tables."""
+        db = Database(self.url)
+        self.assertNotIn('symbols', inspect(db.engine).get_table_names())
+        init_schema(self.url)
+        self.assertIn('symbols', inspect(db.engine).get_table_names())
+        db.close()
+    
+    def test_session_scope_commits_or_rolls_back(self):
+        """A unit of work is committed on success and discarded on error."""
+        db = Database(self.url, create_schema=True)
+        with db.session_scope() as session:
+            session.add(Symbol(symbol='AAPL'))
+        
+        with self.assertRaises(RuntimeError):
+            with db.session_scope() as session:
+                session.add(Symbol(symbol='MSFT'))
+                session.flush()
+                raise RuntimeError("abort")
+        
+        self.assertEqual([row.symbol for row in db.session.query(Symbol)], ['AAPL'])
+        db.close()
+    
+    def test_init_schema_adds_new_columns(self):
+        """A symbols table from before metadata caching gains metadata_fetched_at."""
+        with get_engine(self.url).begin() as connection:
+            connection.execute(text(
+                "CREATE TABLE symbols (id INTEGER PRIMARY KEY, symbol VARCHAR(10) UNIQUE NOT NULL, "
+                "company_name VARCHAR(255), is_active BOOLEAN, created_at DATETIME, updated_at DATETIME)"
+            ))
+        init_schema(self.url)
+        columns = {column['name'] for column in inspect(get_engine(self.url)).get_columns('symbols')}
+        self.assertIn('metadata_fetched_at', columns)
+
+class TestSymbolMetadata(unittest.TestCase):
+    def setUp(self):
+        """Set up an in-memory database."""
+        self.db = Database('sqlite://', create_schema=True)
+    
+    def tearDown(self):
+        """Clean up after each test."""
+        self.db.close()
+    
+    def test_upsert_symbols_keeps_metadata_without_name(self):
+        """Upserting without a name creates the symbol but never clears a stored name."""
+        ids = self.db.upsert_symbols({'AAPL': 'Apple Inc.', 'MSFT': None})
+        self.assertEqual(set(ids), {'AAPL', 'MSFT'})
+        self.db.upsert_symbols({'AAPL': None, 'MSFT': 'Microsoft Corporation'})
+        
+        symbols = {row.symbol: row for row in self.db.session.query(Symbol)}
+        self.assertEqual(symbols['AAPL'].company_name, 'Apple Inc.')
+        self.assertEqual(symbols['MSFT'].company_name, 'Microsoft Corporation')
+        self.assertEqual(ids['AAPL'], symbols['AAPL'].id)
+        self.assertIsNotNone(symbols['AAPL'].metadata_fetched_at)
+    
+    def test_stale_symbols_respect_ttl(self):
+        """New symbols and symbols fetched longer than ttl ago are stale."""
+        self.db.upsert_symbols({'AAPL': 'Apple Inc.', 'MSFT': 'Microsoft Corporation', 'TSLA': None})
+        msft = self.db.session.query(Symbol).filter_by(symbol='MSFT').one()
+        msft.metadata_fetched_at = datetime.utcnow() - timedelta(days=30)
+        self.db.session.commit()
+        
+        stale = self.db.get_stale_symbols(['AAPL', 'MSFT', 'TSLA', 'NVDA'], timedelta(days=7))
+        self.assertEqual(stale, {'MSFT', 'TSLA', 'NVDA'})
+
+if __name__ == '__main__':
+    unittest.main()
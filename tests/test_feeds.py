@@ -0,0 +1,126 @@
+"""
+Test file for bar-close feeds and the event-driven trigger, run offline on replayed bars.
+"""
+import threading
+import time
+import unittest
+from datetime import datetime
+from bar_cache import BarCache
+from database import Database
+from feeds import BarCloseTrigger, BarFeed, ReplayFeed, TimeframeFeed
+from providers import StaticProvider
+from resample import timeframe_minutes
+from tests.utils import generate_intraday_data
+
+class TestReplayFeed(unittest.TestCase):
+    def setUp(self):
+        """Set up an in-memory database with 30 bars of two symbols."""
+        self.db = Database('sqlite://', create_schema=True)
+        self.db.upsert_time_intervals('AAPL', generate_intraday_data(periods=30, seed=1))
+        self.db.upsert_time_intervals('MSFT', generate_intraday_data(periods=30, seed=2))
+
+    def tearDown(self):
+        """Clean up after each test."""
+        self.db.close()
+
+    def test_events_arrive_in_close_order(self):
+        """Bars of all symbols are replayed by close time, closing one minute after they start."""
+        events = []
+        ReplayFeed(self.db).run(['MSFT', 'AAPL'], events.append)
+        self.assertEqual(len(events), 60)
+        self.assertEqual([event.symbol for event in events[:4]], ['MSFT', 'AAPL', 'MSFT', 'AAPL'])
+        self.assertEqual(events[0].start_time, datetime(2024, 1, 2, 9, 30))
+        self.assertEqual(events[2].close_ts - events[0].close_ts, 60)
+        # 09:31 New York time is 14:31 UTC in January
+        self.assertEqual(datetime.utcfromtimestamp(events[0].close_ts), datetime(2024, 1, 2, 14, 31))
+
+    def test_speed_paces_replay_and_stop_ends_it(self):
+        """At 600x, a minute of bars takes a tenth of a second; stop() ends the replay early."""
+        feed = ReplayFeed(self.db, end_date=datetime(2024, 1, 2, 9, 33), speed=600)
+        start = time.monotonic()
+        events = []
+        feed.run(['AAPL'], events.append)
+        self.assertEqual(len(events), 3)
+        self.assertGreaterEqual(time.monotonic() - start, 0.18)
+
+        feed = ReplayFeed(self.db, speed=60)
+        threading.Timer(0.1, feed.stop).start()
+        start = time.monotonic()
+        feed.run(['AAPL'], lambda event: None)
+        self.assertLess(time.monotonic() - start, 1.0)
+
+    def test_trigger_evaluates_every_close(self):
+        """Each close is evaluated on the symbol's growing history and its latency recorded."""
+        calls = []
+
+        def evaluate(symbol, df, deadline):
+            calls.append((symbol, len(df)))
+            return 'buy' if df['Close'].iloc[-1] > df['Close'].iloc[0] else None
+
+        cache = BarCache(StaticProvider({}), capacity=20)
+        trigger = BarCloseTrigger(ReplayFeed(self.db, speed=6000), evaluate, cache)
+        trigger.run(['AAPL', 'MSFT'])
+
+        summary = trigger.latency_summary()
+        self.assertEqual(summary['count'] + summary['skipped'], 60)
+        self.assertEqual(summary['errors'], 0)
+        self.assertLess(summary['max'], 60)
+        self.assertEqual(max(length for _, length in calls), 20)
+        self.assertEqual(set(trigger.results), {'AAPL', 'MSFT'})
+
+class TestTimeframeFeed(unittest.TestCase):
+    def setUp(self):
+        """Set up a full session of AAPL and a session of MSFT missing the last minute of its first hour."""
+        self.db = Database('sqlite://', create_schema=True)
+        self.aapl = generate_intraday_data(periods=390, seed=1)
+        msft = generate_intraday_data(periods=390, seed=2)
+        self.db.upsert_time_intervals('AAPL', self.aapl)
+        self.db.upsert_time_intervals('MSFT', msft.drop(msft.index[59]))
+
+    def tearDown(self):
+        """Clean up after each test."""
+        self.db.close()
+
+    def test_hourly_bars_from_the_open(self):
+        """Hourly bars start at 09:30, aggregate their minutes and close at the end of the hour or session."""
+        events = []
+        TimeframeFeed(ReplayFeed(self.db), 60).run(['AAPL', 'MSFT'], events.append)
+        aapl = [event for event in events if event.symbol == 'AAPL']
+        msft = [event for event in events if event.symbol == 'MSFT']
+        self.assertEqual([event.start_time.strftime('%H:%M') for event in aapl],
+                         ['09:30', '10:30', '11:30', '12:30', '13:30', '14:30', '15:30'])
+        self.assertEqual(len(msft), 7)
+
+        expected = self.aapl.iloc[60:120]
+        self.assertEqual(aapl[1][2:7], (expected['Open'].iloc[0], expected['High'].max(), expected['Low'].min(),
+                                        expected['Close'].iloc[-1], expected['Volume'].sum()))
+        # 10:30 New York time is 15:30 UTC in January; the session's last bar closes at 16:00
+        self.assertEqual(datetime.utcfromtimestamp(aapl[0].close_ts), datetime(2024, 1, 2, 15, 30))
+        self.assertEqual(datetime.utcfromtimestamp(aapl[-1].close_ts), datetime(2024, 1, 2, 21, 0))
+        # Without its 10:29 bar, MSFT's first hour is delivered with the next bar but still closes at 10:30
+        self.assertEqual(msft[0].close_ts, aapl[0].close_ts)
+
+    def test_trigger_evaluates_once_per_bar(self):
+        """The trigger only evaluates when a timeframe bar closes, on the history of timeframe bars."""
+        calls = []
+
+        def evaluate(symbol, df, deadline):
+            calls.append(df.index[-1].strftime('%H:%M'))
+
+        trigger = BarCloseTrigger(TimeframeFeed(ReplayFeed(self.db), 30), evaluate,
+                                  BarCache(StaticProvider({}), capacity=20))
+        trigger.run(['AAPL'])
+        self.assertEqual(len(calls) + trigger.latency_summary()['skipped'], 13)
+        self.assertEqual(calls[0], '09:30')
+        self.assertTrue(all(time[-2:] in ('00', '30') for time in calls))
+
+    def test_feeds_must_implement_run_and_stop(self):
+        with self.assertRaises(TypeError):
+            BarFeed()
+        self.assertEqual(timeframe_minutes('1h'), 60)
+        self.assertEqual(timeframe_minutes('15m'), 15)
+        with self.assertRaises(ValueError):
+            timeframe_minutes('1d')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+"""
+Test file for the vectorized IndicatorEngine.
+"""
+import unittest
+import math
+from database import Database, Symbol
+from indicators import IndicatorEngine, load_rollup_bars
+from tests.utils import TechnicalAnalysis, generate_intraday_data
+
+class TestIndicatorEngine(unittest.TestCase):
+    def setUp(self):
+        """Set up an in-memory database with two sessions of AAPL bars."""
+        self.db = Database('sqlite://', create_schema=True)
+        data = generate_intraday_data(periods=120, days=2, seed=1)
+        # Drop a few bars so some windows straddle a gap
+        data = data.drop(data.index[[40, 41, 42, 77]])
+        self.db.upsert_time_intervals('AAPL', data)
+        
+        symbol_id = self.db.session.query(Symbol.id).filter(Symbol.symbol == 'AAPL').scalar()
+        self.engine = IndicatorEngine.from_database(self.db, symbol_id)
+        self.ta = TechnicalAnalysis(self.db, use_rollups=False)
+        # Every third interval keeps the per-id reference calls affordable
+        self.sample_ids = self.engine.ids[::3].tolist()
+    
+    def tearDown(self):
+        """Clean up after each test."""
+        self.db.close()
+    
+    def assert_matches(self, series, reference):
+        """Compare engine output against the per-id TechnicalAnalysis method."""
+        for timeinterval_id in self.sample_ids:
+            expected = reference(timeinterval_id)
+            actual = series.loc[timeinterval_id]
+            if expected is None:
+                self.assertTrue(math.isnan(actual), f"id {timeinterval_id}: expected None, got {actual}")
+            else:
+                self.assertAlmostEqual(actual, expected, delta=1e-9 * max(1.0, abs(expected)),
+                                       msg=f"id {timeinterval_id}")
+    
+    def test_matches_technical_analysis(self):
+        """Every indicator matches the per-id implementation across periods and timeframes."""
+        for ticker_time in [1, 5, 7]:
+            for period in [5, 20]:
+                for metric in ['C', 'V']:
+                    args = (metric, period, ticker_time)
+                    with self.subTest(metric=metric, period=period, ticker_time=ticker_time):
+                        self.assert_matches(self.engine.sma(*args),
+                                            lambda i: self.ta.calculate_sma(*args, i))
+                        self.assert_matches(self.engine.ema(*args),
+                                            lambda i: self.ta.calculate_ema(*args, i))
+                        self.assert_matches(self.engine.adjusted_sma(*args),
+                                            lambda i: self.ta.calculate_adjusted_sma(*args, i))
+                        self.assert_matches(self.engine.stdv(*args),
+                                            lambda i: self.ta.calculate_stdv(*args, i))
+
+    def test_rollup_bars_match_technical_analysis(self):
+        """On rollup bars the engine matches TechnicalAnalysis reading interval_rollups."""
+        symbol_id = self.db.session.query(Symbol.id).filter(Symbol.symbol == 'AAPL').scalar()
+        ta = TechnicalAnalysis(self.db, use_rollups=True)
+        engine = IndicatorEngine(load_rollup_bars(self.db, symbol_id, 5))
+        
+        # Look up the 1-minute interval at each rollup bar's start for the per-id API
+        minute_ids = dict(zip(self.engine.bars['start_time'], self.engine.ids.tolist()))
+        checked = 0
+        for rollup_id, start_time in zip(engine.ids, engine.bars['start_time']):
+            if start_time not in minute_ids:
+                continue
+            for metric in ['C', 'V']:
+                for name, method in [('sma', ta.calculate_sma), ('adjusted_sma', ta.calculate_adjusted_sma)]:
+                    expected = method(metric, 5, 5, minute_ids[start_time])
+                    actual = getattr(engine, name)(metric, 5, 5).loc[rollup_id]
+                    if expected is None:
+                        self.assertTrue(math.isnan(actual))
+                    else:
+                        checked += 1
+                        self.assertAlmostEqual(actual, expected, delta=1e-9 * max(1.0, abs(expected)))
+        self.assertGreater(checked, 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+"""
+Test file for the staged ingest pipeline.
+"""
+import os
+import tempfile
+import unittest
+from database import Database, Symbol, TimeInterval, dispose_engines, init_schema
+from ingest_pipeline import IngestPipeline
+from providers import StaticProvider
+from tests.utils import generate_intraday_data
+
+class TestIngestPipeline(unittest.TestCase):
+    def setUp(self):
+        """Set up a file-backed database and a provider for a dozen symbols."""
+        self.directory = tempfile.TemporaryDirectory()
+        self.url = f"sqlite:///{os.path.join(self.directory.name, 'ingest.db')}"
+        init_schema(self.url)
+        self.symbols = [f'SYM{i}' for i in range(12)]
+        self.frames = {symbol: generate_intraday_data(periods=30, seed=i) for i, symbol in enumerate(self.symbols)}
+    
+    def tearDown(self):
+        """Clean up after each test."""
+        dispose_engines()
+        self.directory.cleanup()
+    
+    def test_ingests_in_batches(self):
+        """Every symbol is written, several per transaction, and stages report their counts."""
+        provider = StaticProvider(self.frames, company_names={'SYM0': 'Zero'}, latency=0.02, failures={'SYM3': 1})
+        pipeline = IngestPipeline(provider, self.url, fetch_workers=4, batch_symbols=5,
+                                  batch_timeout=0.5, queue_size=2, backoff=0)
+        results = pipeline.run(self.symbols + ['MISSING'])
+        
+        self.assertEqual(results['SYM0'], {'inserted': 30, 'updated': 0})
+        self.assertEqual(results['MISSING'], {'error': 'No data found'})
+        self.assertLess(pipeline.batches, len(self.symbols))
+        
+        stats = {stage['stage']: stage for stage in pipeline.stats()}
+        self.assertEqual(stats['fetch']['items'], 13)
+        self.assertEqual(stats['normalize']['rows'], 30 * 12)
+        self.assertEqual(stats['write']['items'], 12)
+        self.assertEqual(stats['write']['queue_depth'], 0)
+        
+        db = Database(self.url)
+        self.assertEqual(db.session.query(TimeInterval).count(), 30 * 12)
+        self.assertEqual(db.session.query(Symbol).filter_by(symbol='SYM0').one().company_name, 'Zero')
+        db.close()
+    
+    def test_failing_writer_fails_its_symbols(self):
+        """A writer that cannot start marks every symbol as failed instead of stalling the run."""
+        class FailingWriterPipeline(IngestPipeline):
+            def _write(self):
+                raise RuntimeError("database unavailable")
+        
+        pipeline = FailingWriterPipeline(StaticProvider(self.frames), self.url, queue_size=2, batch_symbols=3)
+        results = pipeline.run(self.symbols + ['MISSING'])
+        self.assertEqual(results['MISSING'], {'error': 'No data found'})
+        for symbol in self.symbols:
+            self.assertEqual(results[symbol], {'error': 'Write failed: database unavailable'})
+    
+    def test_rerun_updates(self):
+        """Ingesting the same bars again updates them in place."""
+        provider = StaticProvider(self.frames)
+        IngestPipeline(provider, self.url, writers=2).run(self.symbols)
+        results = IngestPipeline(provider, self.url, writers=2).run(self.symbols)
+        self.assertEqual(results['SYM5'], {'inserted': 0, 'updated': 30})
+
+if __name__ == '__main__':
+    unittest.main()
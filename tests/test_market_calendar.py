@@ -0,0 +1,81 @@
+"""
+Test file for the trading calendar, gap detection and incremental fetching.
+"""
+import unittest
+from datetime import date, datetime
+import numpy as np
+from data_fetcher import DataFetcher, plan_fetch_windows
+from database import Database, TimeInterval
+from market_calendar import NYSECalendar, find_gaps
+from providers import StaticProvider
+from tests.utils import generate_intraday_data
+
+class TestMarketCalendar(unittest.TestCase):
+    def test_nyse_trading_days(self):
+        """2024 had 252 NYSE sessions, skipping Good Friday and observed holidays."""
+        calendar = NYSECalendar()
+        self.assertEqual(len(calendar.sessions(date(2024, 1, 1), date(2024, 12, 31))), 252)
+        self.assertFalse(calendar.is_trading_day(date(2024, 3, 29)))
+        self.assertFalse(calendar.is_trading_day(date(2021, 12, 24)))  # Christmas on a Saturday
+        self.assertTrue(calendar.is_trading_day(date(2021, 12, 31)))  # New Year's Day 2022 is not observed
+
+    def test_find_gaps(self):
+        """Missing minutes inside sessions are reported, nights and weekends are not."""
+        calendar = NYSECalendar()
+        minutes = calendar.trading_minutes(datetime(2024, 1, 5, 9, 30), datetime(2024, 1, 9, 16, 0))
+        self.assertEqual(len(minutes), 3 * 390)
+        stored = np.delete(minutes, np.r_[10:20, 100:102, 800:900])
+        gaps = find_gaps(stored, calendar, datetime(2024, 1, 5), datetime(2024, 1, 10), min_gap_minutes=5)
+        self.assertEqual(gaps, [
+            (datetime(2024, 1, 5, 9, 40), datetime(2024, 1, 5, 9, 50)),
+            (datetime(2024, 1, 9, 9, 50), datetime(2024, 1, 9, 11, 30))
+        ])
+
+class TestIncrementalFetch(unittest.TestCase):
+    def setUp(self):
+        """Set up two stored sessions with a hole, and a provider with three full sessions."""
+        self.db = Database('sqlite://', create_schema=True)
+        self.data = generate_intraday_data(start='2024-01-02 09:30', periods=390, days=3)
+        stored = self.data.iloc[:780].drop(self.data.index[200:230])
+        self.db.upsert_time_intervals('AAPL', stored)
+        self.now = datetime(2024, 1, 4, 16, 0)
+
+    def tearDown(self):
+        """Clean up after each test."""
+        self.db.close()
+
+    def test_plan_covers_gap_and_tail(self):
+        """The plan asks for the hourly buckets around the hole and the bars after the latest stored one only."""
+        windows = plan_fetch_windows(self.db, ['AAPL', 'MSFT'], now=self.now)
+        self.assertEqual(windows, {'AAPL': [
+            (datetime(2024, 1, 2, 12, 30), datetime(2024, 1, 2, 13, 30)),
+            (datetime(2024, 1, 3, 16, 0), self.now)
+        ]})
+        
+        thirty_minutes = plan_fetch_windows(self.db, ['AAPL'], now=self.now, bucket_minutes=30)
+        self.assertEqual(thirty_minutes['AAPL'][0], (datetime(2024, 1, 2, 12, 30), datetime(2024, 1, 2, 13, 30)))
+        self.assertEqual(plan_fetch_windows(self.db, ['AAPL'], now=self.now, bucket_minutes=10)['AAPL'][0],
+                         (datetime(2024, 1, 2, 12, 50), datetime(2024, 1, 2, 13, 20)))
+    
+    def test_plan_starts_at_first_stored_bar(self):
+        """Minutes before the first stored bar were never fetched, so they are not planned as a gap."""
+        db = Database('sqlite://', create_schema=True)
+        db.upsert_time_intervals('AAPL', self.data.iloc[40:390])
+        self.assertEqual(plan_fetch_windows(db, ['AAPL'], now=datetime(2024, 1, 2, 16, 0)), {'AAPL': []})
+        db.close()
+
+    def test_incremental_fetch_writes_missing_bars(self):
+        """An incremental fetch completes the history without re-fetching stored bars."""
+        calendar = NYSECalendar()
+        calendar.now = lambda: self.now
+        provider = StaticProvider({'AAPL': self.data})
+        fetcher = DataFetcher(provider=provider, db=self.db, calendar=calendar)
+        
+        fetched = fetcher.fetch_multiple_symbols(['AAPL'], max_workers=1, incremental=True)
+        self.assertEqual(len(fetched['AAPL']), 60 + 390)
+        self.assertEqual(len(provider.windows), 2)
+        self.assertEqual(self.db.session.query(TimeInterval).count(), 3 * 390)
+        self.assertEqual(plan_fetch_windows(self.db, ['AAPL'], calendar), {'AAPL': []})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+"""
+Test file for latency histograms, counters and metrics export.
+"""
+import json
+import os
+import tempfile
+import unittest
+import urllib.request
+from metrics import LatencyHistogram, MetricsRegistry
+
+class TestLatencyHistogram(unittest.TestCase):
+    def test_percentiles_within_precision(self):
+        """Percentiles land within the bucket precision of the true values."""
+        histogram = LatencyHistogram(precision=0.01)
+        for millisecond in range(1, 1001):
+            histogram.record(millisecond / 1000)
+        snapshot = histogram.snapshot()
+        self.assertEqual(snapshot['count'], 1000)
+        self.assertAlmostEqual(snapshot['p50'], 0.5, delta=0.5 * 0.011)
+        self.assertAlmostEqual(snapshot['p99'], 0.99, delta=0.99 * 0.011)
+        self.assertEqual(snapshot['max'], 1.0)
+
+class TestMetricsRegistry(unittest.TestCase):
+    def test_disabled_registry_records_nothing(self):
+        """Timers, counts and timed functions do nothing while disabled."""
+        registry = MetricsRegistry(enabled=False)
+
+        @registry.timed('stage_seconds', stage='work')
+        def work():
+            return 42
+
+        with registry.timer('stage_seconds', stage='fetch', symbol='AAPL'):
+            pass
+        registry.count('signals_total', side='buy')
+        self.assertEqual(work(), 42)
+        self.assertEqual(registry.histograms, {})
+        self.assertEqual(registry.counters, {})
+
+    def test_exports_per_label_metrics(self):
+        """Each label set is exported separately in Prometheus text and JSON."""
+        registry = MetricsRegistry(enabled=True)
+        for symbol in ['AAPL', 'AAPL', 'MSFT']:
+            with registry.timer('stage_seconds', stage='fetch', symbol=symbol):
+                pass
+        registry.count('signals_total', side='buy', symbol='AAPL')
+
+        text = registry.to_prometheus()
+        self.assertIn('# TYPE stonksbot_stage_seconds summary', text)
+        self.assertIn('stonksbot_stage_seconds_count{stage="fetch",symbol="AAPL"} 2', text)
+        self.assertIn('stonksbot_stage_seconds{stage="fetch",symbol="MSFT",quantile="0.99"}', text)
+        self.assertIn('stonksbot_signals_total{side="buy",symbol="AAPL"} 1.0', text)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'metrics.json')
+            registry.write_json(path)
+            with open(path) as file:
+                data = json.load(file)
+        self.assertEqual([h['labels']['symbol'] for h in data['histograms']], ['AAPL', 'MSFT'])
+        self.assertEqual(data['counters'][0]['value'], 1.0)
+
+    def test_prometheus_endpoint(self):
+        """The HTTP endpoint serves the text export."""
+        registry = MetricsRegistry(enabled=True)
+        registry.observe('cycle_seconds', 1.5)
+        server = registry.serve_prometheus(0, host='127.0.0.1')
+        try:
+            url = f'http://127.0.0.1:{server.server_address[1]}/metrics'
+            with urllib.request.urlopen(url, timeout=5) as response:
+                self.assertIn('stonksbot_cycle_seconds_count 1', response.read().decode())
+        finally:
+            server.shutdown()
+            server.server_close()
+
+if __name__ == '__main__':
+    unittest.main()
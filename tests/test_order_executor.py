@@ -0,0 +1,51 @@
+"""
+Test file for asynchronous order submission against the fake broker.
+"""
+import time
+import unittest
+from order_executor import FakeBroker, OrderExecutor
+from position_book import PositionBook
+
+class TestOrderExecutor(unittest.TestCase):
+    def test_submit_does_not_wait_for_broker(self):
+        """Orders for many symbols are queued at once and submitted concurrently."""
+        broker = FakeBroker(latency=0.1)
+        book = PositionBook(broker)
+        executor = OrderExecutor(broker, workers=4, position_book=book, backoff=0)
+        start = time.monotonic()
+        ids = [executor.submit(symbol, 'buy', 1) for symbol in ['AAPL', 'MSFT', 'GOOGL', 'AMZN']]
+        self.assertLess(time.monotonic() - start, 0.05)
+        self.assertTrue(executor.wait_idle(timeout=2))
+        self.assertLess(time.monotonic() - start, 0.3)
+        self.assertTrue(all(ids))
+        self.assertEqual(executor.latency.count, 4)
+        self.assertGreaterEqual(executor.latency.snapshot()['p50'], 0.09)
+        self.assertTrue(book.has_open_order('AAPL'))
+        executor.close()
+
+    def test_in_flight_orders_suppress_duplicates(self):
+        """A second order for a symbol is dropped while the first is in flight."""
+        broker = FakeBroker(latency=0.1)
+        executor = OrderExecutor(broker, workers=2, backoff=0)
+        self.assertIsNotNone(executor.submit('AAPL', 'buy', 1))
+        self.assertIsNone(executor.submit('AAPL', 'buy', 1))
+        executor.wait_idle(timeout=2)
+        self.assertIsNotNone(executor.submit('AAPL', 'sell', 1))
+        executor.close()
+        self.assertEqual(executor.counts['suppressed'], 1)
+        self.assertEqual(len(broker.orders), 2)
+
+    def test_retries_reuse_client_order_id(self):
+        """A lost response is retried with the same id and never opens a second order."""
+        broker = FakeBroker(failures=1, lose_responses=1)
+        executor = OrderExecutor(broker, workers=1, backoff=0)
+        client_order_id = executor.submit('AAPL', 'buy', 1)
+        executor.close()
+        # The failed attempt never reached the broker; the lost one is found by its client order id
+        self.assertEqual(broker.attempts, 2)
+        self.assertEqual([order.client_order_id for order in broker.orders], [client_order_id])
+        self.assertEqual(broker.positions, {'AAPL': 1.0})
+        self.assertEqual(executor.counts['acknowledged'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
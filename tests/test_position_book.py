@@ -0,0 +1,77 @@
+"""
+Test file for the bulk-refreshed position book.
+"""
+import unittest
+from types import SimpleNamespace
+from position_book import PositionBook
+
+class FakeAPI:
+    """Counts bulk calls and serves fixed positions and orders."""
+
+    def __init__(self, positions, orders):
+        self.positions = positions
+        self.orders = orders
+        self.calls = []
+        self.fail = False
+
+    def list_positions(self):
+        self.calls.append('list_positions')
+        if self.fail:
+            raise ConnectionError("API unavailable")
+        return self.positions
+
+    def list_orders(self, status='open'):
+        self.calls.append('list_orders')
+        return self.orders
+
+class TestPositionBook(unittest.TestCase):
+    def setUp(self):
+        """Set up an account holding AAPL with an open order for MSFT."""
+        self.api = FakeAPI(
+            [SimpleNamespace(symbol='AAPL', qty='10', avg_entry_price='150.0')],
+            [SimpleNamespace(id='o1', symbol='MSFT', side='buy', qty='5')]
+        )
+        self.book = PositionBook(self.api, max_age=60)
+
+    def test_refresh_answers_from_memory(self):
+        """One refresh makes two calls, whatever the number of symbols asked about."""
+        self.assertTrue(self.book.is_stale)
+        self.book.refresh()
+        self.assertEqual(self.book.get('AAPL'), {'qty': 10.0, 'avg_entry_price': 150.0})
+        self.assertFalse(self.book.has_position('MSFT'))
+        self.assertTrue(self.book.has_open_order('MSFT'))
+        self.assertFalse(self.book.has_open_order('AAPL'))
+        self.assertEqual(self.api.calls, ['list_positions', 'list_orders'])
+        self.assertFalse(self.book.is_stale)
+
+    def test_failed_refresh_keeps_book_and_age(self):
+        """A failing refresh raises and leaves the last good book in place."""
+        self.book.refresh()
+        refreshed_at = self.book.refreshed_at
+        self.api.fail = True
+        with self.assertRaises(ConnectionError):
+            self.book.refresh()
+        self.assertEqual(self.book.refreshed_at, refreshed_at)
+        self.assertTrue(self.book.has_position('AAPL'))
+
+    def test_orders_recorded_during_a_refresh_are_kept(self):
+        """An order acknowledged while the API calls are in flight survives the refresh."""
+        late = SimpleNamespace(id='o2', symbol='AAPL', side='sell', qty='10')
+        list_orders = self.api.list_orders
+        def list_orders_then_record(status='open'):
+            orders = list_orders(status)
+            self.book.record_order(late)
+            return orders
+        self.api.list_orders = list_orders_then_record
+
+        self.book.refresh()
+        self.assertEqual(self.book.open_orders('AAPL'), [late])
+        self.assertTrue(self.book.has_open_order('MSFT'))
+
+        # A later refresh trusts the API: the order has filled and is no longer open
+        self.api.list_orders = list_orders
+        self.book.refresh()
+        self.assertFalse(self.book.has_open_order('AAPL'))
+
+if __name__ == '__main__':
+    unittest.main()
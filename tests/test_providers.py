@@ -0,0 +1,66 @@
+"""
+Test file for data providers and concurrent ingestion.
+"""
+import time
+import unittest
+from data_fetcher import DataFetcher
+from database import Database, Symbol, TimeInterval
+from providers import RateLimiter, StaticProvider, fetch_symbols
+from tests.utils import generate_intraday_data
+
+class TestProviders(unittest.TestCase):
+    def setUp(self):
+        """Set up a provider serving a session of bars for a few symbols."""
+        self.symbols = ['AAPL', 'MSFT', 'GOOGL', 'AMZN', 'META', 'TSLA']
+        self.frames = {symbol: generate_intraday_data(periods=60, seed=i) for i, symbol in enumerate(self.symbols)}
+    
+    def test_rate_limiter_spaces_requests(self):
+        """After the burst, requests are spaced at the configured rate."""
+        limiter = RateLimiter(rate=20, burst=2)
+        start = time.monotonic()
+        for _ in range(6):
+            limiter.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 0.18)
+    
+    def test_retries_transient_failures(self):
+        """A fetch that fails fewer times than max_retries still succeeds."""
+        provider = StaticProvider(self.frames, failures={'AAPL': 2, 'MSFT': 5})
+        results = {result.symbol: result for result in fetch_symbols(
+            provider, ['AAPL', 'MSFT'], max_retries=3, backoff=0
+        )}
+        self.assertIsNone(results['AAPL'].error)
+        self.assertEqual(len(results['AAPL'].data), 60)
+        self.assertIn('Simulated failure', results['MSFT'].error)
+        self.assertEqual(provider.calls.count('MSFT'), 4)
+    
+    def test_fetcher_ingests_concurrently(self):
+        """Fetches overlap, and every symbol is written once on the calling thread."""
+        provider = StaticProvider(self.frames, company_names={'AAPL': 'Apple Inc.'}, latency=0.2)
+        db = Database('sqlite://', create_schema=True)
+        fetcher = DataFetcher(provider=provider, db=db)
+        
+        start = time.monotonic()
+        results = fetcher.fetch_multiple_symbols(self.symbols + ['NONE'], max_workers=7)
+        elapsed = time.monotonic() - start
+        
+        self.assertLess(elapsed, 0.2 * len(self.symbols) / 2)
+        self.assertEqual(list(results), self.symbols + ['NONE'])
+        self.assertEqual(db.session.query(TimeInterval).count(), 60 * len(self.symbols))
+        self.assertEqual(db.session.query(Symbol).filter_by(symbol='AAPL').one().company_name, 'Apple Inc.')
+        fetcher.close()
+    
+    def test_metadata_is_fetched_once_per_ttl(self):
+        """A second ingest within the TTL skips company name lookups."""
+        provider = StaticProvider(self.frames, company_names={'AAPL': 'Apple Inc.'})
+        db = Database('sqlite://', create_schema=True)
+        fetcher = DataFetcher(provider=provider, db=db)
+        
+        fetcher.fetch_multiple_symbols(self.symbols)
+        self.assertEqual(sorted(provider.metadata_calls), sorted(self.symbols))
+        fetcher.fetch_multiple_symbols(self.symbols)
+        self.assertEqual(len(provider.metadata_calls), len(self.symbols))
+        self.assertEqual(db.session.query(Symbol).filter_by(symbol='AAPL').one().company_name, 'Apple Inc.')
+        fetcher.close()
+
+if __name__ == '__main__':
+    unittest.main()
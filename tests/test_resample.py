@@ -0,0 +1,51 @@
+"""
+Test file for the in-memory OHLCV resampler.
+"""
+import unittest
+import numpy as np
+import pandas as pd
+from bar_series import BarSeries
+from resample import resample_bars
+from tests.utils import generate_intraday_data
+
+class TestResampleBars(unittest.TestCase):
+    def setUp(self):
+        """Set up two sessions of 1-minute bars, with a gap in the first."""
+        data = generate_intraday_data(periods=390, days=2, seed=3)
+        self.data = data.drop(data.index[100:110])
+        self.bars = BarSeries.from_dataframe(self.data)
+    
+    def expected(self, ticker_time):
+        """Aggregate each session with pandas, counting buckets from 09:30."""
+        frames = []
+        for day, session in self.data.groupby(self.data.index.date):
+            frames.append(session.resample(
+                f'{ticker_time}min', origin=pd.Timestamp(day) + pd.Timedelta(hours=9, minutes=30)
+            ).agg({'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'}).dropna())
+        return pd.concat(frames)
+    
+    def test_matches_pandas_resample(self):
+        """Non-standard timeframes match a per-session pandas resample."""
+        for ticker_time in [3, 7, 45]:
+            with self.subTest(ticker_time=ticker_time):
+                result = resample_bars(self.bars, ticker_time)
+                expected = self.expected(ticker_time)
+                np.testing.assert_array_equal(result['start_time'], expected.index.values)
+                np.testing.assert_array_equal(result['open'], expected['Open'].to_numpy())
+                np.testing.assert_array_equal(result['high'], expected['High'].to_numpy())
+                np.testing.assert_array_equal(result['low'], expected['Low'].to_numpy())
+                np.testing.assert_array_equal(result['close'], expected['Close'].to_numpy())
+                np.testing.assert_array_equal(result['volume'], expected['Volume'].to_numpy())
+    
+    def test_ids_point_at_first_bar(self):
+        """Each aggregated bar carries the id of its first 1-minute bar."""
+        result = resample_bars(self.bars, 7)
+        np.testing.assert_array_equal(self.bars['start_time'][result['id']] >= result['start_time'], True)
+        self.assertEqual(result['id'][0], 0)
+    
+    def test_empty_input(self):
+        """Resampling no bars returns empty arrays."""
+        self.assertEqual(len(resample_bars(self.bars[:0], 5)), 0)
+
+if __name__ == '__main__':
+    unittest.main()
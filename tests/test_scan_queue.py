@@ -0,0 +1,79 @@
+"""
+Test file for the distributed scan job queue, using SQLite's conditional-update fallback.
+"""
+import os
+import tempfile
+import threading
+import unittest
+from database import Database, ScanJob
+from calculate_breakouts import find_volume_breakouts, load_stored_breakouts
+from scan_queue import enqueue_scan_jobs, claim_job, complete_job, heartbeat, reclaim_stale_jobs, run_worker
+from tests.utils import generate_intraday_data
+
+class TestScanQueue(unittest.TestCase):
+    def setUp(self):
+        """Set up a file-backed SQLite database shared by the workers."""
+        self.directory = tempfile.TemporaryDirectory()
+        self.url = f"sqlite:///{os.path.join(self.directory.name, 'queue.db')}"
+        self.db = Database(self.url, create_schema=True)
+        for seed, symbol in enumerate(['AAPL', 'MSFT', 'NVDA']):
+            self.db.upsert_time_intervals(symbol, generate_intraday_data(periods=120, days=3, seed=seed))
+    
+    def tearDown(self):
+        """Clean up after each test."""
+        self.db.close()
+        self.directory.cleanup()
+    
+    def run_workers(self, count):
+        """Run several workers in parallel until the queue is drained."""
+        completed = []
+        threads = [
+            threading.Thread(target=lambda i=i: completed.append(
+                run_worker(self.url, f"worker-{i}", stop_when_empty=True)
+            ))
+            for i in range(count)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return sum(completed)
+    
+    def test_workers_drain_symbol_day_jobs(self):
+        """Per-symbol-day jobs processed by several workers store the full scan's breakouts."""
+        self.assertEqual(enqueue_scan_jobs(self.db, 1, 10, 3.0, per_day=True), 9)
+        # Queuing again while jobs are pending adds nothing
+        self.assertEqual(enqueue_scan_jobs(self.db, 1, 10, 3.0, per_day=True), 0)
+        
+        self.assertEqual(self.run_workers(3), 9)
+        expected = find_volume_breakouts(1, 10, 3.0, db=self.db)
+        self.assertTrue(expected, "Sample data should contain breakouts")
+        self.assertEqual(load_stored_breakouts(1, 10, 3.0, db=self.db), expected)
+    
+    def test_symbol_jobs_are_idempotent(self):
+        """Running the symbol jobs a second time stores no duplicate breakouts."""
+        for _ in range(2):
+            self.assertEqual(enqueue_scan_jobs(self.db, 1, 10, 3.0), 3)
+            self.assertEqual(self.run_workers(2), 3)
+        
+        expected = find_volume_breakouts(1, 10, 3.0, db=self.db)
+        self.assertEqual(load_stored_breakouts(1, 10, 3.0, db=self.db), expected)
+    
+    def test_stale_lease_is_reclaimed(self):
+        """A job whose lease expired goes back to the queue and its old owner loses it."""
+        enqueue_scan_jobs(self.db, 1, 10, 3.0)
+        job = claim_job(self.db, 'slow-worker', lease_seconds=-1)
+        self.assertEqual(job.status, 'running')
+        
+        self.assertEqual(reclaim_stale_jobs(self.db), 1)
+        reclaimed = claim_job(self.db, 'fast-worker')
+        self.assertEqual(reclaimed.id, job.id)
+        self.assertEqual(reclaimed.attempts, 2)
+        
+        self.assertFalse(heartbeat(self.db, job.id, 'slow-worker'))
+        self.assertFalse(complete_job(self.db, job.id, 'slow-worker'))
+        self.assertTrue(complete_job(self.db, job.id, 'fast-worker'))
+        self.assertEqual(self.db.session.get(ScanJob, job.id).status, 'done')
+
+if __name__ == '__main__':
+    unittest.main()
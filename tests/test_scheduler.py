@@ -0,0 +1,128 @@
+"""
+Test file for the sharded ingestion scheduler.
+"""
+import os
+import tempfile
+import time
+import unittest
+from datetime import datetime
+from database import Database, Symbol, TimeInterval, dispose_engines, init_schema
+from market_calendar import NYSECalendar
+from providers import SharedRateLimiter, StaticProvider
+from scheduler import ShardWorker, load_universe, next_refresh, shard_of
+from tests.utils import generate_intraday_data
+
+class FixedCalendar(NYSECalendar):
+    """NYSE calendar whose clock is stopped at a given time."""
+
+    def __init__(self, now):
+        self.fixed_now = now
+
+    def now(self):
+        return self.fixed_now
+
+class TestScheduling(unittest.TestCase):
+    def test_shards_partition_the_universe(self):
+        """Every symbol lands in exactly one shard, the same one every time."""
+        symbols = [f'SYM{i}' for i in range(200)]
+        shards = [[symbol for symbol in symbols if shard_of(symbol, 4) == shard] for shard in range(4)]
+        self.assertEqual(sorted(sum(shards, [])), sorted(symbols))
+        self.assertTrue(all(shards))
+        self.assertEqual(shard_of('AAPL', 4), shard_of('AAPL', 4))
+
+    def test_refreshes_follow_bar_closes_in_sessions(self):
+        """Refreshes run just after bar closes, and skip nights, weekends and holidays."""
+        calendar = NYSECalendar()
+        self.assertEqual(next_refresh(calendar, datetime(2024, 1, 2, 10, 2, 30), 5, 5),
+                         datetime(2024, 1, 2, 10, 5, 5))
+        self.assertEqual(next_refresh(calendar, datetime(2024, 1, 2, 10, 5, 5), 5, 5),
+                         datetime(2024, 1, 2, 10, 10, 5))
+        self.assertEqual(next_refresh(calendar, datetime(2024, 1, 2, 8, 0), 1, 5),
+                         datetime(2024, 1, 2, 9, 31, 5))
+        self.assertEqual(next_refresh(calendar, datetime(2024, 1, 2, 15, 59, 30), 1, 5),
+                         datetime(2024, 1, 2, 16, 0, 5))
+        # Friday evening before Martin Luther King Jr. Day
+        self.assertEqual(next_refresh(calendar, datetime(2024, 1, 12, 17, 0), 1, 5),
+                         datetime(2024, 1, 16, 9, 31, 5))
+
+    def test_shared_rate_limiter_spaces_requests(self):
+        """The shared bucket enforces the same rate as the per-process one."""
+        limiter = SharedRateLimiter(rate=20, burst=2)
+        start = time.monotonic()
+        for _ in range(6):
+            limiter.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 0.18)
+
+class TestShardWorker(unittest.TestCase):
+    def setUp(self):
+        """Set up a file-backed universe of six symbols, one of them inactive."""
+        self.directory = tempfile.TemporaryDirectory()
+        self.url = f"sqlite:///{os.path.join(self.directory.name, 'scheduler.db')}"
+        init_schema(self.url)
+        self.symbols = ['AAPL', 'MSFT', 'GOOGL', 'AMZN', 'META', 'TSLA']
+        self.db = Database(self.url)
+        self.db.upsert_symbols({symbol: None for symbol in self.symbols})
+        self.db.session.query(Symbol).filter_by(symbol='TSLA').update({'is_active': False})
+        self.db.session.commit()
+        self.frames = {symbol: generate_intraday_data(periods=390, seed=i) for i, symbol in enumerate(self.symbols)}
+
+    def tearDown(self):
+        """Clean up after each test."""
+        self.db.close()
+        dispose_engines()
+        self.directory.cleanup()
+
+    def test_cycle_fetches_only_its_shard(self):
+        """A cycle ingests the shard's symbols and reports their lag."""
+        calendar = FixedCalendar(datetime(2024, 1, 2, 16, 0, 5))
+        provider = StaticProvider(self.frames)
+        shard = shard_of('AAPL', 2)
+        worker = ShardWorker(shard, 2, provider=provider, db_url=self.url, calendar=calendar)
+
+        metrics = worker.run_cycle(scheduled=datetime(2024, 1, 2, 16, 0, 5))
+        expected = load_universe(self.db, shard, 2)
+        self.assertIn('AAPL', expected)
+        self.assertNotIn('TSLA', load_universe(self.db))
+        self.assertEqual(sorted(set(provider.calls)), expected)
+        self.assertEqual(metrics['symbols'], len(expected))
+        self.assertEqual(metrics['missing'], 0)
+        self.assertLess(metrics['lag_max_seconds'], 60)
+        self.assertEqual(self.db.session.query(TimeInterval).count(), 390 * len(expected))
+
+    def test_gaps_are_backfilled_on_a_slower_cadence(self):
+        """Bar cycles only fetch after the latest bars; gaps are filled every few cycles and each session."""
+        calendar = FixedCalendar(datetime(2024, 1, 2, 16, 0, 5))
+        shard = shard_of('AAPL', 2)
+        worker = ShardWorker(shard, 2, provider=StaticProvider(self.frames), db_url=self.url, calendar=calendar,
+                             backfill_cycles=3)
+        worker.run_cycle()
+        hole = self.db.session.query(TimeInterval).filter(TimeInterval.start_time.between(
+            datetime(2024, 1, 2, 11, 0), datetime(2024, 1, 2, 11, 29)))
+        stored = self.db.session.query(TimeInterval).count()
+        hole.delete(synchronize_session=False)
+        self.db.session.commit()
+
+        for _ in range(2):
+            worker.run_cycle()
+            self.assertLess(self.db.session.query(TimeInterval).count(), stored)
+        metrics = worker.run_cycle()
+        self.assertEqual(self.db.session.query(TimeInterval).count(), stored)
+        self.assertEqual((metrics['cycles'], metrics['backfills']), (4, 2))
+
+        calendar.fixed_now = datetime(2024, 1, 3, 9, 31, 5)
+        self.assertEqual(worker.run_cycle()['backfills'], 3)
+
+    def test_lag_of_bars_fetched_in_utc(self):
+        """Bars a provider returns in UTC are stored and measured at exchange time."""
+        calendar = FixedCalendar(datetime(2024, 1, 2, 16, 0, 5))
+        frames = {symbol: frame.tz_localize('America/New_York').tz_convert('UTC') for symbol, frame in self.frames.items()}
+        worker = ShardWorker(0, 1, provider=StaticProvider(frames), db_url=self.url, calendar=calendar)
+
+        for _ in range(2):
+            metrics = worker.run_cycle()
+            self.assertEqual(metrics['missing'], 0)
+            self.assertLess(metrics['lag_max_seconds'], 60)
+        self.assertEqual(self.db.get_latest_start_times(['AAPL']), {'AAPL': datetime(2024, 1, 2, 15, 59)})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+"""
+Test file for the incremental streaming indicators.
+"""
+import unittest
+import numpy as np
+import pandas as pd
+from streaming_indicators import BarIndicators, EMA, RSI, RollingAdjustedSMA, RollingSMA, RollingVariance
+
+def _stream(indicator, values):
+    """Feed values one at a time and collect the outputs, None as NaN."""
+    return np.array([np.nan if v is None else v for v in map(indicator.update, values)])
+
+def _pandas_rsi(close, period):
+    """RSI exactly as TradingBot.calculate_indicators computes it."""
+    delta = close.diff()
+    gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
+    return 100 - (100 / (1 + gain / loss))
+
+class TestStreamingIndicators(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        self.close = pd.Series(100 + np.cumsum(rng.normal(0, 1, 500)))
+
+    def test_rolling_sma_matches_pandas(self):
+        expected = self.close.rolling(20).mean().to_numpy()
+        np.testing.assert_allclose(_stream(RollingSMA(20), self.close), expected, equal_nan=True)
+
+    def test_rolling_variance_matches_pandas(self):
+        indicator = RollingVariance(20)
+        stds = []
+        for value in self.close:
+            indicator.update(value)
+            stds.append(np.nan if indicator.std is None else indicator.std)
+        expected = self.close.rolling(20).std(ddof=0).to_numpy()
+        np.testing.assert_allclose(stds, expected, equal_nan=True, rtol=1e-7)
+
+    def test_adjusted_sma_matches_pandas(self):
+        rolling = self.close.rolling(20)
+        expected = ((rolling.sum() - rolling.max() - rolling.min()) / 18).to_numpy()
+        np.testing.assert_allclose(_stream(RollingAdjustedSMA(20), self.close), expected, equal_nan=True)
+
+    def test_adjusted_sma_rejects_short_period(self):
+        with self.assertRaises(ValueError):
+            RollingAdjustedSMA(2)
+
+    def test_rsi_matches_bot_formula(self):
+        expected = _pandas_rsi(self.close, 14).to_numpy()
+        np.testing.assert_allclose(_stream(RSI(14), self.close), expected, equal_nan=True)
+
+    def test_ema_is_seeded_with_sma(self):
+        values = _stream(EMA(10), self.close)
+        self.assertTrue(np.isnan(values[:9]).all())
+        self.assertAlmostEqual(values[9], self.close[:10].mean())
+        self.assertAlmostEqual(values[10], self.close[10] * 2 / 11 + values[9] * 9 / 11)
+
+    def test_snapshot_and_restore(self):
+        indicator = RollingAdjustedSMA(5)
+        for value in self.close[:10]:
+            indicator.update(value)
+        state = indicator.snapshot()
+        first = indicator.update(1000.0)
+        indicator.restore(state)
+        self.assertEqual(indicator.update(1000.0), first)
+
+    def test_undo_reverts_the_last_update(self):
+        """Undoing the last update restores every indicator's previous state, so revised bars give the streamed values."""
+        factories = {'SMA': lambda: RollingSMA(5), 'EMA': lambda: EMA(5), 'RSI': lambda: RSI(5),
+                     'Wilder RSI': lambda: RSI(5, wilder=True), 'variance': lambda: RollingVariance(5),
+                     'adjusted SMA': lambda: RollingAdjustedSMA(5)}
+        for name, factory in factories.items():
+            with self.subTest(indicator=name):
+                indicator = factory()
+                revised = []
+                for value in self.close[:40]:
+                    for partial in (value + 50, value - 50):
+                        indicator.update(partial)
+                        indicator.undo()
+                    revised.append(indicator.update(value))
+                np.testing.assert_allclose(np.array(revised, dtype=float),
+                                           _stream(factory(), self.close[:40]), equal_nan=True)
+
+    def test_bar_revision(self):
+        index = pd.date_range('2024-01-02 09:30', periods=len(self.close), freq='min')
+        indicators = BarIndicators(5, 20, 14)
+        for timestamp, value in zip(index[:-1], self.close[:-1]):
+            indicators.update(timestamp, value)
+
+        # The forming bar is updated several times before it closes
+        for partial in (self.close.iloc[-1] - 3, self.close.iloc[-1] + 5):
+            indicators.update(index[-1], partial)
+        row = indicators.update(index[-1], self.close.iloc[-1])
+
+        self.assertAlmostEqual(row['MA_fast'], self.close.rolling(5).mean().iloc[-1])
+        self.assertAlmostEqual(row['MA_slow'], self.close.rolling(20).mean().iloc[-1])
+        self.assertAlmostEqual(row['RSI'], _pandas_rsi(self.close, 14).iloc[-1])
+        self.assertEqual([r['timestamp'] for r in indicators.latest_rows()], list(index[-2:]))
+
+        with self.assertRaises(ValueError):
+            indicators.update(index[-3], 100.0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -10,7 +10,7 @@ class TestTechnicalAnalysis(unittest.TestCase):
     def setUp(self):
         """Set up test environment."""
         self.db = Database()
-        self.ta = TechnicalAnalysis()
+        self.ta = TechnicalAnalysis(use_rollups=False)
     
     def tearDown(self):
         """Clean up after each test."""
@@ -3,6 +3,6 @@ Test utilities package for StonksBot.
 This package contains reusable test methods and utilities for testing the StonksBot application.
 """
 
-from .test_utils import TechnicalAnalysis, setup_test_environment, teardown_test_environment
+from .test_utils import TechnicalAnalysis, generate_intraday_data, setup_test_environment, teardown_test_environment
 
-__all__ = ['TechnicalAnalysis', 'setup_test_environment', 'teardown_test_environment'] 
\ No newline at end of file
+__all__ = ['TechnicalAnalysis', 'generate_intraday_data', 'setup_test_environment', 'teardown_test_environment'] 
\ No newline at end of file
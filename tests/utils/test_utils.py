@@ -3,20 +3,58 @@ Utility functions for testing the StonksBot application.
 This module contains reusable test methods that can be imported and used across different test files.
 """
 from typing import List, Union, Literal
-from database import Database, TimeInterval
+from database import Database, IntervalRollup, ROLLUP_TIMEFRAMES, TimeInterval
 from datetime import datetime, timedelta
 from sqlalchemy import and_, extract
+import numpy as np
+import pandas as pd
 
 class TechnicalAnalysis:
-    def __init__(self):
-        """Initialize the TechnicalAnalysis class with a database connection."""
-        self.db = Database()
+    def __init__(self, db: Database = None, use_rollups: bool = True):
+        """
+        Initialize the TechnicalAnalysis class with a database connection.
+        
+        Args:
+            db (Database): Database to read from, a new connection is opened if not given
+            use_rollups (bool): Read aggregated bars from interval_rollups for timeframes in
+                ROLLUP_TIMEFRAMES instead of sampling 1-minute bars at multiples of ticker_time
+                (default: True)
+        """
+        self._owns_db = db is None
+        self.db = db if db is not None else Database()
+        self.use_rollups = use_rollups
     
     def __del__(self):
         """Clean up database connection when the object is destroyed."""
-        if hasattr(self, 'db'):
+        if hasattr(self, 'db') and self._owns_db:
             self.db.close()
     
+    def _query_intervals(self, current_interval, ticker_time, start_time, descending, limit=None):
+        """Query the bars of a ticker_time series between start_time and the current interval."""
+        if self.use_rollups and ticker_time in ROLLUP_TIMEFRAMES:
+            model = IntervalRollup
+            query = self.db.session.query(IntervalRollup).filter(
+                IntervalRollup.ticker_time == ticker_time
+            )
+        else:
+            model = TimeInterval
+            # Filter for specific minute intervals using extract
+            query = self.db.session.query(TimeInterval).filter(
+                extract('minute', TimeInterval.start_time) % ticker_time == 0
+            )
+        
+        query = query.filter(
+            and_(
+                model.symbol_id == current_interval.symbol_id,
+                model.start_time >= start_time,
+                model.start_time <= current_interval.start_time
+            )
+        ).order_by(model.start_time.desc() if descending else model.start_time.asc())
+        
+        if limit is not None:
+            query = query.limit(limit)
+        return query.all()
+    
     def calculate_sma(
         self,
         type: Literal['O', 'H', 'L', 'C', 'V'],
@@ -56,15 +94,7 @@ class TechnicalAnalysis:
         start_time = current_interval.start_time - timedelta(minutes=ticker_time * period)
         
         # Query the required time intervals
-        intervals = self.db.session.query(TimeInterval).filter(
-            and_(
-                TimeInterval.symbol_id == current_interval.symbol_id,
-                TimeInterval.start_time >= start_time,
-                TimeInterval.start_time <= current_interval.start_time,
-                # Filter for specific minute intervals using extract
-                extract('minute', TimeInterval.start_time) % ticker_time == 0
-            )
-        ).order_by(TimeInterval.start_time.desc()).limit(period).all()
+        intervals = self._query_intervals(current_interval, ticker_time, start_time, descending=True, limit=period)
         
         if len(intervals) < period:
             return None
@@ -131,14 +161,7 @@ class TechnicalAnalysis:
         start_time = current_interval.start_time - timedelta(minutes=ticker_time * period * 2)
         
         # Interogăm intervalele de timp necesare
-        intervals = self.db.session.query(TimeInterval).filter(
-            and_(
-                TimeInterval.symbol_id == current_interval.symbol_id,
-                TimeInterval.start_time >= start_time,
-                TimeInterval.start_time <= current_interval.start_time,
-                extract('minute', TimeInterval.start_time) % ticker_time == 0
-            )
-        ).order_by(TimeInterval.start_time.asc()).all()
+        intervals = self._query_intervals(current_interval, ticker_time, start_time, descending=False)
         
         if len(intervals) < period:
             return None
@@ -211,14 +234,7 @@ class TechnicalAnalysis:
         start_time = current_interval.start_time - timedelta(minutes=ticker_time * period)
         
         # Query the required time intervals
-        intervals = self.db.session.query(TimeInterval).filter(
-            and_(
-                TimeInterval.symbol_id == current_interval.symbol_id,
-                TimeInterval.start_time >= start_time,
-                TimeInterval.start_time <= current_interval.start_time,
-                extract('minute', TimeInterval.start_time) % ticker_time == 0
-            )
-        ).order_by(TimeInterval.start_time.desc()).limit(period).all()
+        intervals = self._query_intervals(current_interval, ticker_time, start_time, descending=True, limit=period)
         
         if len(intervals) < period:
             return None
@@ -291,14 +307,7 @@ class TechnicalAnalysis:
         start_time = current_interval.start_time - timedelta(minutes=ticker_time * period)
         
         # Query the required time intervals
-        intervals = self.db.session.query(TimeInterval).filter(
-            and_(
-                TimeInterval.symbol_id == current_interval.symbol_id,
-                TimeInterval.start_time >= start_time,
-                TimeInterval.start_time <= current_interval.start_time,
-                extract('minute', TimeInterval.start_time) % ticker_time == 0
-            )
-        ).order_by(TimeInterval.start_time.desc()).limit(period).all()
+        intervals = self._query_intervals(current_interval, ticker_time, start_time, descending=True, limit=period)
         
         if len(intervals) < period:
             return None
@@ -328,6 +337,46 @@ class TechnicalAnalysis:
         
         return stdv
 
+def generate_intraday_data(
+    start: str = '2024-01-02 09:30',
+    periods: int = 390,
+    days: int = 1,
+    seed: int = 0
+) -> pd.DataFrame:
+    """
+    Generate a yfinance-style DataFrame of 1-minute bars for offline tests.
+    
+    Args:
+        start (str): First bar of the first session
+        periods (int): Number of 1-minute bars per session
+        days (int): Number of consecutive daily sessions
+        seed (int): Random seed so tests are reproducible
+        
+    Returns:
+        pd.DataFrame: Open/High/Low/Close/Volume columns indexed by bar start time
+    """
+    rng = np.random.default_rng(seed)
+    first = pd.Timestamp(start)
+    index = pd.DatetimeIndex(np.concatenate([
+        pd.date_range(first + pd.Timedelta(days=day), periods=periods, freq='1min').values
+        for day in range(days)
+    ]))
+    
+    close = 100 + np.cumsum(rng.normal(0, 0.2, len(index)))
+    open_ = close + rng.normal(0, 0.05, len(index))
+    volume = rng.integers(1_000, 50_000, len(index))
+    # Sprinkle in a few volume spikes so breakout scans have something to find
+    spikes = rng.choice(len(index), size=max(1, len(index) // 100), replace=False)
+    volume[spikes] *= 40
+    
+    return pd.DataFrame({
+        'Open': open_,
+        'High': np.maximum(open_, close) + 0.1,
+        'Low': np.minimum(open_, close) - 0.1,
+        'Close': close,
+        'Volume': volume
+    }, index=index)
+
 def setup_test_environment():
     """
     Set up the test environment with necessary configurations.
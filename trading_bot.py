@@ -1,12 +1,22 @@
 import os
+import sys
 import time
-import yfinance as yf
+from concurrent.futures import ThreadPoolExecutor, wait
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 import alpaca_trade_api as tradeapi
 from config import *
+from bar_cache import BarCache
+from bar_series import BarSeries
+from feeds import AlpacaBarFeed, BarCloseTrigger, TimeframeFeed
+from market_calendar import exchange_wall_clock
+from metrics import METRICS
+from order_executor import OrderExecutor
+from position_book import PositionBook
+from resample import timeframe_minutes
+from streaming_indicators import BarIndicators
 
 # Load environment variables
 load_dotenv()
@@ -21,9 +31,26 @@ api = tradeapi.REST(
 
 class TradingBot:
     def __init__(self):
-        self.positions = {}
+        self.positions = PositionBook(api)  # Authoritative positions and open orders, refreshed once per cycle
+        self.orders = OrderExecutor(api, position_book=self.positions)
+        self.indicators = {}  # symbol -> BarIndicators kept across loops
+        self.bar_cache = BarCache(capacity=BAR_CACHE_SIZE, period=BAR_CACHE_WARMUP_PERIOD, interval=TIMEFRAME)
+        self.executor = ThreadPoolExecutor(max_workers=EVALUATION_WORKERS, thread_name_prefix='evaluate')
+        self.in_flight = {}  # symbol -> Future of an evaluation that has not finished yet
+        self.start_metrics()
         self.check_trading_environment()
 
+    def start_metrics(self):
+        """Export the stage timings over Prometheus and/or a JSON file, if metrics are enabled in config"""
+        METRICS.register(self.orders.latency, 'order_ack_latency_seconds')
+        if not METRICS.enabled:
+            return
+        if METRICS_PROMETHEUS_PORT:
+            METRICS.serve_prometheus(METRICS_PROMETHEUS_PORT)
+            print(f"Serving metrics on http://localhost:{METRICS_PROMETHEUS_PORT}/metrics")
+        if METRICS_JSON_PATH:
+            METRICS.start_json_flusher(METRICS_JSON_PATH, METRICS_FLUSH_SECONDS)
+
     def check_trading_environment(self):
         """Check if the market is open and the API connection is working"""
         try:
@@ -35,18 +62,25 @@ class TradingBot:
             print(f"Error connecting to Alpaca API: {e}")
             exit(1)
 
-    def get_historical_data(self, symbol, period='1mo', interval='1h'):
-        """Fetch historical data for technical analysis"""
-        try:
-            stock = yf.Ticker(symbol)
-            df = stock.history(period=period, interval=interval)
-            return df
-        except Exception as e:
-            print(f"Error fetching data for {symbol}: {e}")
-            return None
+    def get_latest_data(self, symbol):
+        """
+        Get the symbol's cached bar history, refreshed with only the bars since the latest cached one
+        
+        The first call for a symbol fetches BAR_CACHE_WARMUP_PERIOD of history.
+        """
+        return self.bar_cache.get_dataframe(symbol)
 
-    def calculate_indicators(self, df):
-        """Calculate technical indicators"""
+    def calculate_indicators(self, df, symbol=None):
+        """
+        Calculate technical indicators
+        
+        With a symbol, indicator state is kept across calls and only bars at or after the
+        last one seen are folded in, so the cost per call does not grow with history.
+        Only the latest rows needed by the signal checks are filled in; the rest are NaN.
+        """
+        if symbol is not None:
+            return self.update_indicators(symbol, df)
+        
         # Calculate Moving Averages
         df['MA_fast'] = df['Close'].rolling(window=MOVING_AVERAGE_FAST).mean()
         df['MA_slow'] = df['Close'].rolling(window=MOVING_AVERAGE_SLOW).mean()
@@ -60,6 +94,30 @@ class TradingBot:
 
         return df
 
+    def update_indicators(self, symbol, df):
+        """Fold new bars into the symbol's incremental indicators and fill the latest rows of df"""
+        state = self.indicators.get(symbol)
+        if state is None:
+            state = BarIndicators(MOVING_AVERAGE_FAST, MOVING_AVERAGE_SLOW, RSI_PERIOD)
+            self.indicators[symbol] = state
+
+        bars = BarSeries.from_dataframe(df)
+        first = 0 if state.last_timestamp is None else np.searchsorted(bars.timestamp, state.last_timestamp)
+        for timestamp, close in zip(bars.timestamp[first:].tolist(), bars.close[first:].tolist()):
+            state.update(timestamp, close)
+
+        df['MA_fast'] = np.nan
+        df['MA_slow'] = np.nan
+        df['RSI'] = np.nan
+        wall_clock = exchange_wall_clock(df.index)
+        columns = [df.columns.get_loc(column) for column in ['MA_fast', 'MA_slow', 'RSI']]
+        for row in state.latest_rows():
+            position = wall_clock.get_indexer([pd.Timestamp(row['timestamp'])])[0]
+            if position >= 0:
+                df.iloc[position, columns] = [row['MA_fast'], row['MA_slow'], row['RSI']]
+
+        return df
+
     def check_buy_signal(self, df):
         """Check if we should buy based on our strategy"""
         if len(df) < MOVING_AVERAGE_SLOW:
@@ -92,33 +150,168 @@ class TradingBot:
 
         return ma_crossover or rsi_overbought
 
-    def execute_trade(self, symbol, side):
-        """Execute a trade order"""
+    def execute_trade(self, symbol, side, signal_time=None):
+        """
+        Queue a trade order without waiting for the broker
+        
+        The order executor submits it, records it in the position book once acknowledged,
+        and measures the latency from signal_time (time.monotonic() of the signal).
+        
+        Returns:
+            str: The order's client order id, or None if the symbol already has an order in flight
+        """
+        return self.orders.submit(symbol, side, QUANTITY, signal_time)
+
+    def evaluate_symbol(self, symbol, cycle_deadline, df=None):
+        """
+        Fetch a symbol's latest bars, check its signals and trade on them
+        
+        With df, those bars are evaluated instead of fetching, as in event mode.
+        The signal is dropped instead of traded if the evaluation took longer than
+        SYMBOL_TIMEOUT_SECONDS or ran past the cycle deadline, since its data is stale by then.
+        
+        Returns:
+            str: 'buy' or 'sell' if an order was queued, 'stale' if the signal was dropped, else None
+        """
+        deadline = min(time.monotonic() + SYMBOL_TIMEOUT_SECONDS, cycle_deadline)
+
+        # Get the latest bars and calculate indicators
+        if df is None:
+            with METRICS.timer('stage_seconds', stage='fetch', symbol=symbol):
+                df = self.get_latest_data(symbol)
+            if df is None:
+                return None
+
+        with METRICS.timer('stage_seconds', stage='indicators', symbol=symbol):
+            df = self.calculate_indicators(df, symbol)
+
+        with METRICS.timer('stage_seconds', stage='positions', symbol=symbol):
+            # An order already working for the symbol decides its position, so wait for it
+            if self.positions.has_open_order(symbol):
+                return None
+            holding = self.positions.has_position(symbol)
+
+        # Check signals
+        with METRICS.timer('stage_seconds', stage='signal', symbol=symbol):
+            if not holding:  # No position, look for buy signals
+                side = 'buy' if self.check_buy_signal(df) else None
+            else:  # Have position, look for sell signals
+                side = 'sell' if self.check_sell_signal(df) else None
+        if side is None:
+            return None
+
+        signal_time = time.monotonic()
+        METRICS.count('signals_total', side=side, symbol=symbol)
+        if signal_time > deadline:
+            print(f"Dropping stale {side} signal for {symbol}: evaluation timed out")
+            return 'stale'
+        with METRICS.timer('stage_seconds', stage='order', symbol=symbol):
+            queued = self.execute_trade(symbol, side, signal_time)
+        if queued is None:
+            return None
+        return side
+
+    def run_cycle(self, symbols=None):
+        """
+        Evaluate every symbol concurrently and wait for them until the cycle deadline
+        
+        Positions and open orders are refreshed in bulk first; if that fails for longer
+        than POSITION_BOOK_MAX_AGE_SECONDS, no symbol is evaluated.
+        
+        A symbol that fails is reported without affecting the others. A symbol whose
+        evaluation from an earlier cycle is still running is skipped, so one hung ticker
+        never holds more than one worker.
+        
+        Returns:
+            dict: symbol -> result of evaluate_symbol, 'error', 'timeout' or 'stale'
+        """
+        symbols = SYMBOLS if symbols is None else symbols
+
+        # One bulk refresh of positions and orders per cycle; never trade on a stale book
         try:
-            if side == 'buy':
-                api.submit_order(
-                    symbol=symbol,
-                    qty=QUANTITY,
-                    side='buy',
-                    type='market',
-                    time_in_force='gtc'
-                )
-                print(f"Bought {QUANTITY} shares of {symbol}")
-            else:
-                api.submit_order(
-                    symbol=symbol,
-                    qty=QUANTITY,
-                    side='sell',
-                    type='market',
-                    time_in_force='gtc'
-                )
-                print(f"Sold {QUANTITY} shares of {symbol}")
+            with METRICS.timer('stage_seconds', stage='position_refresh'):
+                self.positions.refresh()
         except Exception as e:
-            print(f"Error executing {side} order for {symbol}: {e}")
+            print(f"Error refreshing positions ({self.positions.age:.0f}s old): {e}")
+        if self.positions.is_stale:
+            print("Position book is stale, skipping this cycle")
+            return {symbol: 'stale' for symbol in symbols}
+
+        started = time.monotonic()
+        cycle_deadline = started + CYCLE_DEADLINE_SECONDS
+        futures = {}
+        results = {}
+        for symbol in symbols:
+            running = self.in_flight.get(symbol)
+            if running is not None and not running.done():
+                results[symbol] = 'timeout'
+                continue
+            futures[symbol] = self.in_flight[symbol] = self.executor.submit(
+                self.evaluate_symbol, symbol, cycle_deadline
+            )
+
+        wait(futures.values(), timeout=max(cycle_deadline - time.monotonic(), 0))
+        for symbol, future in futures.items():
+            if not future.done():
+                print(f"Evaluation of {symbol} missed the cycle deadline")
+                results[symbol] = 'timeout'
+                continue
+            del self.in_flight[symbol]
+            try:
+                results[symbol] = future.result()
+            except Exception as e:
+                print(f"Error evaluating {symbol}: {e}")
+                results[symbol] = 'error'
+
+        METRICS.observe('cycle_seconds', time.monotonic() - started)
+        for result in results.values():
+            METRICS.count('evaluations_total', result=result or 'no_signal')
+        return {symbol: results[symbol] for symbol in symbols}
+
+    def evaluate_on_close(self, symbol, df, deadline):
+        """Event mode: evaluate a symbol whose bar just closed, refreshing positions at most once per cycle interval"""
+        try:
+            self.positions.refresh_if_older(CYCLE_INTERVAL_SECONDS)
+        except Exception as e:
+            print(f"Error refreshing positions ({self.positions.age:.0f}s old): {e}")
+        if self.positions.is_stale:
+            print(f"Position book is stale, not evaluating {symbol}")
+            return 'stale'
+        return self.evaluate_symbol(symbol, deadline, df)
+
+    def run_event_driven(self, feed=None, warm=True):
+        """
+        Evaluate each symbol as soon as its TIMEFRAME bar closes on feed, instead of polling every minute
+        
+        The feed's 1-minute bars are aggregated into TIMEFRAME bars aligned to the session
+        open, so the strategy runs on the same bars as in polling mode, once per closed
+        bar. Their history is warmed once from the data provider and extended by the
+        aggregated bars. Prints the latency from bar close to the end of evaluation when
+        the feed stops.
+        
+        Parameters:
+        - feed: BarFeed of 1-minute bars to listen to (default: Alpaca's live bar stream)
+        - warm: Fetch each symbol's recent history before the first bar arrives
+        """
+        feed = TimeframeFeed(feed or AlpacaBarFeed(), timeframe_minutes(TIMEFRAME))
+        if warm:
+            self.bar_cache.warm(SYMBOLS)
+        trigger = BarCloseTrigger(feed, self.evaluate_on_close, self.bar_cache, self.executor)
+        METRICS.register(trigger.latency, 'bar_close_latency_seconds')
+        try:
+            trigger.run(SYMBOLS)
+        except KeyboardInterrupt:
+            feed.stop()
+        finally:
+            print(f"Bar close to signal latency: {trigger.latency_summary()}")
+        return trigger
 
     def run(self):
         """Main bot loop"""
+        # Download the history window once; every loop after this only fetches the latest bars
+        self.bar_cache.warm(SYMBOLS)
         while True:
+            started = time.monotonic()
             try:
                 # Check if market is open
                 clock = api.get_clock()
@@ -127,36 +320,17 @@ class TradingBot:
                     time.sleep(60)
                     continue
 
-                for symbol in SYMBOLS:
-                    # Get historical data and calculate indicators
-                    df = self.get_historical_data(symbol)
-                    if df is None:
-                        continue
-
-                    df = self.calculate_indicators(df)
-
-                    # Get current position
-                    position = None
-                    try:
-                        position = api.get_position(symbol)
-                    except:
-                        pass
-
-                    # Check signals and execute trades
-                    if position is None:  # No position, look for buy signals
-                        if self.check_buy_signal(df):
-                            self.execute_trade(symbol, 'buy')
-                    else:  # Have position, look for sell signals
-                        if self.check_sell_signal(df):
-                            self.execute_trade(symbol, 'sell')
-
-                # Sleep before next iteration
-                time.sleep(60)  # Check every minute
+                self.run_cycle()
 
             except Exception as e:
                 print(f"Error in main loop: {e}")
-                time.sleep(60)
+
+            # Start the next cycle CYCLE_INTERVAL_SECONDS after this one started
+            time.sleep(max(CYCLE_INTERVAL_SECONDS - (time.monotonic() - started), 0))
 
 if __name__ == "__main__":
     bot = TradingBot()
-    bot.run() 
\ No newline at end of file
+    if '--events' in sys.argv:
+        bot.run_event_driven()
+    else:
+        bot.run() 
\ No newline at end of file